@@ -0,0 +1,139 @@
+"""Latency benchmark of `chunk_pdf` and `chunk_code_text` by page or line length.
+
+Run with `python benchmarks/chunking.py`, which compares the offset-based chunkers
+against the previous implementations that re-sliced a buffer per chunk, also
+checking both give identical chunks. The buffer holds the rest of the current page
+or line, so the previous implementations are quadratic in page or line length,
+e.g. for PDFs with huge pages or minified code.
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+import numpy as np
+
+from paperqa.readers import chunk_code_text, chunk_pdf
+from paperqa.types import Doc, ParsedMetadata, ParsedText, Text
+
+DOC = Doc(docname="bench", citation="Bench, 2025", dockey="bench")
+
+
+def chunk_pdf_buffered(
+    parsed_text: ParsedText, doc: Doc, chunk_chars: int, overlap: int
+) -> list[Text]:
+    """Previous `chunk_pdf`, quadratic in page length."""
+    pages: list[str] = []
+    texts: list[Text] = []
+    split = ""
+    for page_num, page_text in parsed_text.content.items():  # type: ignore[union-attr]
+        split += page_text
+        pages.append(page_num)
+        while len(split) > chunk_chars:
+            pg = "-".join([pages[0], pages[-1]])
+            texts.append(
+                Text(
+                    text=split[:chunk_chars], name=f"{doc.docname} pages {pg}", doc=doc
+                )
+            )
+            split = split[chunk_chars - overlap :]
+            pages = [page_num]
+    if len(split) > overlap or not texts:
+        pg = "-".join([pages[0], pages[-1]])
+        texts.append(
+            Text(text=split[:chunk_chars], name=f"{doc.docname} pages {pg}", doc=doc)
+        )
+    return texts
+
+
+def chunk_code_text_buffered(
+    parsed_text: ParsedText, doc: Doc, chunk_chars: int, overlap: int
+) -> list[Text]:
+    """Previous `chunk_code_text`, quadratic in line length."""
+    split = ""
+    texts: list[Text] = []
+    last_line = 0
+    for i, line in enumerate(parsed_text.content):
+        split += line
+        while len(split) > chunk_chars:
+            texts.append(
+                Text(
+                    text=split[:chunk_chars],
+                    name=f"{doc.docname} lines {last_line}-{i}",
+                    doc=doc,
+                )
+            )
+            split = split[chunk_chars - overlap :]
+            last_line = i
+    if len(split) > overlap or not texts:
+        texts.append(
+            Text(
+                text=split[:chunk_chars],
+                name=f"{doc.docname} lines {last_line}-{i}",
+                doc=doc,
+            )
+        )
+    return texts
+
+
+def time_chunker(
+    chunker: Callable[[ParsedText, Doc, int, int], list[Text]],
+    parsed_text: ParsedText,
+    chunk_chars: int,
+    overlap: int,
+    repeats: int,
+) -> tuple[list[Text], float]:
+    """Get the chunks and median latency (ms) of the chunker."""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        texts = chunker(parsed_text, DOC, chunk_chars, overlap)
+        latencies.append(1e3 * (time.perf_counter() - start))
+    return texts, float(np.median(latencies))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chars", type=int, default=10_000_000)
+    parser.add_argument(
+        "--page-chars", type=int, nargs="+", default=[3000, 100_000, 1_280_000]
+    )
+    parser.add_argument("--chunk-chars", type=int, default=5000)
+    parser.add_argument("--overlap", type=int, default=250)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(seed=42)
+    alphabet = np.array(list("abcdefghijklmnopqrstuvwxyz "))
+    text = "".join(rng.choice(alphabet, size=args.chars))
+    metadata = ParsedMetadata(parsing_libraries=[], total_parsed_text_length=len(text))
+    print(f"{'chunker':>16} {'page chars':>12} {'buffered ms':>12} {'offsets ms':>11}")
+    for page_chars in args.page_chars:
+        pages = [text[i : i + page_chars] for i in range(0, len(text), page_chars)]
+        pdf = ParsedText(
+            content={str(i + 1): page for i, page in enumerate(pages)},
+            metadata=metadata,
+        )
+        code = ParsedText(content=[f"{line}\n" for line in pages], metadata=metadata)
+        for name, buffered, offsets, parsed_text in (
+            ("chunk_pdf", chunk_pdf_buffered, chunk_pdf, pdf),
+            ("chunk_code_text", chunk_code_text_buffered, chunk_code_text, code),
+        ):
+            expected, buffered_ms = time_chunker(
+                buffered, parsed_text, args.chunk_chars, args.overlap, args.repeats
+            )
+            actual, offsets_ms = time_chunker(
+                offsets, parsed_text, args.chunk_chars, args.overlap, args.repeats
+            )
+            if [(t.name, t.text) for t in actual] != [
+                (t.name, t.text) for t in expected
+            ]:
+                raise AssertionError(f"{name} chunks differ for {page_chars} chars.")
+            print(
+                f"{name:>16} {page_chars:>12,} {buffered_ms:>12.1f}"
+                f" {offsets_ms:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
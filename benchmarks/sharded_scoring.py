@@ -0,0 +1,90 @@
+"""Latency benchmark of `NumpyVectorStore` similarity search by shard count.
+
+Run with `python benchmarks/sharded_scoring.py`, the largest default of 5M rows
+takes several GB of memory, mostly for the `Text` objects. For shards to not
+oversubscribe the cores, limit BLAS to one thread, e.g. with
+`OPENBLAS_NUM_THREADS=1`.
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from paperqa.llms import EmbeddingModel, NumpyVectorStore
+from paperqa.types import Doc, Text
+
+CHUNK_SIZE = 100_000
+
+
+class QueryEmbeds(EmbeddingModel):
+    """Embed queries from a fixed lookup, so only the search gets timed."""
+
+    name: str = "query_embed"
+    query_embeddings: dict[str, list[float]]
+
+    async def embed_documents(self, texts):
+        return [self.query_embeddings[t] for t in texts]
+
+
+async def build_store(
+    rows: int, dim: int, rng: np.random.Generator
+) -> NumpyVectorStore:
+    """Build a store with random embeddings, in chunks to bound peak memory."""
+    store = NumpyVectorStore()
+    doc = Doc(docname="stub", citation="stub", dockey="stub")
+    for start in range(0, rows, CHUNK_SIZE):
+        chunk = rng.standard_normal((min(CHUNK_SIZE, rows - start), dim))
+        texts = [
+            Text(text=str(start + i), name=str(start + i), doc=doc, embedding=row)
+            for i, row in enumerate(chunk.tolist())
+        ]
+        await store.add_texts_and_embeddings(texts)
+        # The store keeps its own matrix, so drop the lists to save memory
+        for text in texts:
+            text.embedding = None
+    return store
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[1_000_000, 2_000_000, 5_000_000]
+    )
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(seed=42)
+    embedding_model = QueryEmbeds(
+        query_embeddings={
+            f"query {i}": rng.standard_normal(args.dim).tolist()
+            for i in range(args.queries)
+        }
+    )
+    queries = list(embedding_model.query_embeddings)
+    print(f"{'rows':>12} {'shards':>6} {'median ms':>10} {'min ms':>10}")
+    for rows in args.rows:
+        store = await build_store(rows, args.dim, rng)
+        for n_shards in args.shards:
+            store.n_shards = n_shards
+            # Warm up, also filling the query embedding cache
+            await store.batch_similarity_search(queries, args.k, embedding_model)
+            latencies = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                await store.batch_similarity_search(queries, args.k, embedding_model)
+                latencies.append(1e3 * (time.perf_counter() - start))
+            print(
+                f"{rows:>12,} {n_shards:>6} {np.median(latencies):>10.1f}"
+                f" {min(latencies):>10.1f}"
+            )
+        del store
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
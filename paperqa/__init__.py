@@ -16,8 +16,12 @@ from paperqa.agents import ask
 from paperqa.agents.main import agent_query
 from paperqa.docs import Docs, PQASession, print_callback
 from paperqa.llms import (
+    EmbeddingCache,
+    IVFVectorStore,
+    MmapVectorStore,
     NumpyVectorStore,
     QdrantVectorStore,
+    QueryEmbeddingCache,
     VectorStore,
 )
 from paperqa.settings import Settings, get_settings
@@ -36,15 +40,19 @@ __all__ = [
     "Doc",
     "DocDetails",
     "Docs",
+    "EmbeddingCache",
     "EmbeddingModel",
     "HybridEmbeddingModel",
+    "IVFVectorStore",
     "LLMModel",
     "LLMResult",
     "LiteLLMEmbeddingModel",
     "LiteLLMModel",
+    "MmapVectorStore",
     "NumpyVectorStore",
     "PQASession",
     "QdrantVectorStore",
+    "QueryEmbeddingCache",
     "SentenceTransformerEmbeddingModel",
     "Settings",
     "SparseEmbeddingModel",
@@ -59,7 +59,7 @@ async def agent_query(
     **runner_kwargs,
 ) -> AnswerResponse:
     if docs is None:
-        docs = Docs()
+        docs = Docs(texts_index=settings.get_texts_index())
 
     answers_index = SearchIndex(
         fields=[*SearchIndex.REQUIRED_FIELDS, "question"],
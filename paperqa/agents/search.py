@@ -523,7 +523,7 @@ async def process_file(
                 file_location, manifest, manifest_fallback_location
             )
 
-            tmp_docs = Docs()
+            tmp_docs = Docs(texts_index=settings.get_texts_index())
             try:
                 await tmp_docs.aadd(
                     path=abs_file_path,
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
@@ -7,13 +8,15 @@ import re
 import tempfile
 import urllib.request
 import warnings
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Iterable, Mapping, Sequence
 from datetime import datetime
 from io import BytesIO
+from itertools import islice
 from pathlib import Path
-from typing import Any, BinaryIO, cast
+from typing import Any, BinaryIO, cast, overload
 from uuid import UUID, uuid4
 
+import anyio
 from aviary.core import Message
 from lmi import (
     Embeddable,
@@ -34,16 +37,21 @@ from pydantic import (
 from paperqa.clients import DEFAULT_CLIENTS, DocMetadataClient
 from paperqa.core import llm_parse_json, map_fxn_summary
 from paperqa.llms import (
+    BM25Index,
+    EmbeddingCache,
     NumpyVectorStore,
     VectorStore,
+    embed_documents,
+    reciprocal_rank_fusion,
 )
 from paperqa.paths import PAPERQA_DIR
 from paperqa.prompts import CANNOT_ANSWER_PHRASE
-from paperqa.readers import read_doc
-from paperqa.settings import MaybeSettings, get_settings
-from paperqa.types import Doc, DocDetails, DocKey, PQASession, Text
+from paperqa.readers import chunk_parsed_text, parse_doc, peek_first_chunk
+from paperqa.settings import MaybeSettings, ParsingSettings, get_settings
+from paperqa.types import Doc, DocDetails, DocKey, ParsedText, PQASession, Text
 from paperqa.utils import (
     citation_to_docname,
+    extract_doi,
     get_loop,
     maybe_is_html,
     maybe_is_pdf,
@@ -54,6 +62,32 @@ from paperqa.utils import (
 
 logger = logging.getLogger(__name__)
 
+# Pages (or characters for text without pages) searched for a DOI
+FIRST_PAGES_SEARCHED_FOR_DOI = 2
+FIRST_CHARS_SEARCHED_FOR_DOI = 6000
+
+
+def _get_first_pages(parsed_text: ParsedText) -> str:
+    if isinstance(parsed_text.content, dict):
+        return "\n\n".join(
+            islice(parsed_text.content.values(), FIRST_PAGES_SEARCHED_FOR_DOI)
+        )
+    return parsed_text.reduce_content()[:FIRST_CHARS_SEARCHED_FOR_DOI]
+
+
+def _find_doi(document_metadata: Mapping[str, str], first_pages: str) -> str | None:
+    """Find a DOI, preferring the document's embedded metadata to its first pages."""
+    for text in (*document_metadata.values(), first_pages):
+        if doi := extract_doi(text):
+            # Trailing punctuation is likely from the surrounding sentence
+            return doi.removeprefix("https://doi.org/").rstrip(".,;")
+    return None
+
+
+def _squash(text: str) -> str:
+    # Ignore case, whitespace, punctuation, and hyphenation from line wrapping
+    return re.sub(r"[\W_]+", "", text).lower()
+
 
 # this is just to reduce None checks/type checks
 async def empty_callback(result: LLMResult) -> None:
@@ -79,6 +113,13 @@ class Docs(BaseModel):
         default=PAPERQA_DIR, description="Path to save index", validate_default=True
     )
     deleted_dockeys: set[DocKey] = Field(default_factory=set)
+    # Texts added since the texts index was last built, or None if unknown,
+    # where the next build has to check every text against the texts index
+    _pending_texts: list[Text] | None = None
+    # Keyword index over the texts for fusion with dense retrieval, only built
+    # (from every text) once fusion is used, then caught up on the pending texts
+    _lexical_index: BM25Index | None = None
+    _pending_lexical_texts: list[Text] = []
 
     def __eq__(self, other) -> bool:
         if (
@@ -102,6 +143,26 @@ class Docs(BaseModel):
             # NOTE: ignoring deleted_dockeys
         )
 
+    def __getstate__(self) -> dict[Any, Any]:
+        state = super().__getstate__()
+        # The keyword index gets lazily rebuilt, so don't bloat pickles with it
+        state["__pydantic_private__"] = (state["__pydantic_private__"] or {}) | {
+            "_lexical_index": None,
+            "_pending_lexical_texts": [],
+        }
+        return state
+
+    def __setstate__(self, state: dict[Any, Any]) -> None:
+        # Docs pickled by older versions lack private attributes added since,
+        # or have an eagerly built keyword index field
+        state["__dict__"].pop("texts_lexical_index", None)
+        state.get("__pydantic_fields_set__", set()).discard("texts_lexical_index")
+        private = state.get("__pydantic_private__") or {}
+        for name, private_attr in self.__private_attributes__.items():
+            private.setdefault(name, private_attr.get_default())
+        state["__pydantic_private__"] = private
+        super().__setstate__(state)
+
     @field_validator("index_path")
     @classmethod
     def handle_default(cls, value: Path | None, info: ValidationInfo) -> Path | None:
@@ -114,6 +175,9 @@ class Docs(BaseModel):
         self.docs = {}
         self.docnames = set()
         self.texts_index.clear()
+        self._pending_texts = []
+        self._lexical_index = None
+        self._pending_lexical_texts = []
 
     def _get_unique_name(self, docname: str) -> str:
         """Create a unique name given proposed name."""
@@ -282,7 +346,7 @@ class Docs(BaseModel):
             )
         )
 
-    async def aadd(  # noqa: PLR0912
+    async def aadd(
         self,
         path: str | Path,
         citation: str | None = None,
@@ -301,47 +365,414 @@ class Docs(BaseModel):
         parse_config = all_settings.parsing
         if dockey is None:
             # md5 sum of file contents (not path!)
-            dockey = md5sum(path)
+            dockey = await asyncio.to_thread(md5sum, path)
         if llm_model is None:
             llm_model = all_settings.get_llm()
+        # Parse once, reusing the parsed text for the citation peek and the chunking
+        parsed_text = await parse_doc(
+            path,
+            page_size_limit=parse_config.page_size_limit,
+            pdf_parsing_pool=parse_config.get_pdf_parsing_pool(),
+        )
+        doc: Doc | None = None
+        looked_up_doi: str | None = None
         if citation is None:
-            # Peek first chunk
-            texts = await read_doc(
+            # Try a DOI before spending LLM calls on inferring the citation
+            doc, looked_up_doi = await self._aupgrade_doc_from_doi(
                 path,
-                Doc(docname="", citation="", dockey=dockey),  # Fake doc
-                chunk_chars=parse_config.chunk_size,
-                overlap=parse_config.overlap,
-                page_size_limit=parse_config.page_size_limit,
+                dockey=dockey,
+                parsed_text=parsed_text,
+                title=title,
+                doi=doi,
+                authors=authors,
+                parse_config=parse_config,
+                llm_model=llm_model,
+                **kwargs,
             )
-            if not texts:
-                raise ValueError(f"Could not read document {path}. Is it empty?")
-            result = await llm_model.call_single(
-                messages=[
-                    Message(
-                        content=parse_config.citation_prompt.format(text=texts[0].text)
+        if doc is not None:
+            doc.docname = self._get_unique_name(
+                doc.docname if docname is None else docname
+            )
+        else:
+            if citation is None:
+                citation = await self._ainfer_citation(
+                    path,
+                    peek_first_chunk(
+                        parsed_text,
+                        path,
+                        dockey,
+                        chunk_chars=parse_config.chunk_size,
+                        overlap=parse_config.overlap,
                     ),
-                ],
+                    parse_config,
+                    llm_model,
+                )
+
+            docname = citation_to_docname(citation) if docname is None else docname
+            docname = self._get_unique_name(docname)
+
+            doc = await self._aupgrade_doc(
+                Doc(docname=docname, citation=citation, dockey=dockey),
+                title=title,
+                doi=doi,
+                authors=authors,
+                parse_config=parse_config,
+                llm_model=llm_model,
+                skip_doi=looked_up_doi,
+                **kwargs,
             )
-            citation = cast("str", result.text)
-            if (
-                len(citation) < 3  # noqa: PLR2004
-                or "Unknown" in citation
-                or "insufficient" in citation
-            ):
-                citation = f"Unknown, {os.path.basename(path)}, {datetime.now().year}"
 
-        docname = citation_to_docname(citation) if docname is None else docname
-        docname = self._get_unique_name(docname)
+        texts, _ = chunk_parsed_text(
+            parsed_text,
+            path,
+            doc,
+            chunk_chars=parse_config.chunk_size,
+            overlap=parse_config.overlap,
+        )
+        self._check_texts(texts, path, parse_config)
+        if await self.aadd_texts(texts, doc, all_settings, embedding_model):
+            # Adding can rename the doc, if another doc took its name meanwhile
+            return doc.docname
+        return None
+
+    async def aadd_many(
+        self,
+        paths: Iterable[str | Path],
+        settings: MaybeSettings = None,
+        llm_model: LLMModel | None = None,
+        embedding_model: EmbeddingModel | None = None,
+        parse_concurrency: int = 4,
+        metadata_concurrency: int = 8,
+        embedding_concurrency: int = 2,
+        embedding_batch_size: int | None = None,
+        queue_size: int = 16,
+        **kwargs,
+    ) -> list[str | None]:
+        """
+        Add many documents to the collection, pipelining their ingestion.
+
+        Each document passes through three stages, connected by bounded queues:
+        parsing (CPU bound), citation inference and metadata lookup (network bound),
+        and embedding (network bound). Each stage has its own concurrency limit, and
+        the embedding stage batches chunks across documents to fill embedding requests.
+
+        Args:
+            paths: Paths of the documents to add.
+            settings: Optional settings to use.
+            llm_model: Optional LLM used for citation inference.
+            embedding_model: Optional embedding model, by default the settings'
+                embedding model is used unless deferring embedding.
+            parse_concurrency: Number of documents to parse concurrently.
+            metadata_concurrency: Number of documents to infer metadata concurrently.
+            embedding_concurrency: Number of concurrent embedding requests.
+            embedding_batch_size: Number of chunks to gather for each embedding
+                request, default is the embedding model's batch size.
+            queue_size: Maximum number of documents waiting between two stages.
+            kwargs: Keyword arguments for the metadata client.
 
-        doc = Doc(docname=docname, citation=citation, dockey=dockey)
+        Returns:
+            Docnames aligned with the input paths, with None for documents that were
+                not added because they failed, were already present, or were filtered.
+        """
+        all_settings = get_settings(settings)
+        parse_config = all_settings.parsing
+        if llm_model is None:
+            llm_model = all_settings.get_llm()
+        if not parse_config.defer_embedding and not embedding_model:
+            embedding_model = all_settings.get_embedding_model()
+        if embedding_batch_size is None:
+            embedding_batch_size = (
+                embedding_model.config.get("batch_size", 16) if embedding_model else 1
+            )
 
+        paths = list(paths)
+        docnames: list[str | None] = [None] * len(paths)
+        pending_paths = iter(enumerate(paths))
+        seen_dockeys: set[DocKey] = set()
+        parsed: asyncio.Queue[tuple[int, DocKey, ParsedText] | None] = asyncio.Queue(
+            maxsize=queue_size
+        )
+        chunked: asyncio.Queue[tuple[int, Doc, list[Text]] | None] = asyncio.Queue(
+            maxsize=queue_size
+        )
+        embedding_semaphore = asyncio.Semaphore(embedding_concurrency)
+        embedding_cache = all_settings.get_embedding_cache()
+
+        async def parse_worker() -> None:
+            # Workers share one iterator, so each path is taken exactly once
+            for i, path in pending_paths:
+                try:
+                    # md5 sum of file contents (not path!)
+                    dockey = await asyncio.to_thread(md5sum, path)
+                    # Skip documents already added, or duplicated in the paths
+                    if dockey in self.docs or dockey in seen_dockeys:
+                        continue
+                    seen_dockeys.add(dockey)
+                    parsed_text = await parse_doc(
+                        path,
+                        page_size_limit=parse_config.page_size_limit,
+                        pdf_parsing_pool=parse_config.get_pdf_parsing_pool(),
+                    )
+                except Exception:
+                    logger.exception(f"Failed to parse {path}, skipping it.")
+                    continue
+                await parsed.put((i, dockey, parsed_text))
+
+        async def metadata_worker() -> None:
+            while (item := await parsed.get()) is not None:
+                i, dockey, parsed_text = item
+                path = paths[i]
+                try:
+                    doc_details, looked_up_doi = await self._aupgrade_doc_from_doi(
+                        path,
+                        dockey=dockey,
+                        parsed_text=parsed_text,
+                        title=None,
+                        doi=None,
+                        authors=None,
+                        parse_config=parse_config,
+                        llm_model=llm_model,
+                        **kwargs,
+                    )
+                    doc = doc_details or await self._ainfer_doc(
+                        path,
+                        dockey,
+                        parsed_text,
+                        parse_config,
+                        llm_model,
+                        skip_doi=looked_up_doi,
+                        **kwargs,
+                    )
+                    texts, _ = chunk_parsed_text(
+                        parsed_text,
+                        path,
+                        doc,
+                        chunk_chars=parse_config.chunk_size,
+                        overlap=parse_config.overlap,
+                    )
+                    self._check_texts(texts, path, parse_config)
+                except Exception:
+                    logger.exception(f"Failed to chunk {path}, skipping it.")
+                    continue
+                # Filter before embedding, so filtered documents aren't embedded
+                if all(
+                    doc.matches_filter_criteria(doc_filter)
+                    for doc_filter in parse_config.doc_filters or []
+                ):
+                    await chunked.put((i, doc, texts))
+
+        async def add_batch(batch: list[tuple[int, Doc, list[Text]]]) -> None:
+            # The embedding stage acquired this batch's slot before starting it
+            try:
+                texts = [t for _, _, doc_texts in batch for t in doc_texts]
+                if embedding_model and texts:
+                    try:
+                        embeddings = await embed_documents(
+                            embedding_model, [t.text for t in texts], embedding_cache
+                        )
+                    except Exception:
+                        logger.exception(
+                            f"Failed to embed {len(batch)} documents, skipping them."
+                        )
+                        return
+                    for t, t_embedding in zip(texts, embeddings, strict=True):
+                        t.embedding = t_embedding
+                for i, doc, doc_texts in batch:
+                    # Adding also dedupes docnames picked concurrently
+                    if await self.aadd_texts(doc_texts, doc, all_settings):
+                        docnames[i] = doc.docname
+            finally:
+                embedding_semaphore.release()
+
+        async def embedding_stage() -> None:
+            batch: list[tuple[int, Doc, list[Text]]] = []
+            n_texts = 0
+            async with anyio.create_task_group() as tg:
+                while (item := await chunked.get()) is not None:
+                    batch.append(item)
+                    n_texts += len(item[2])
+                    if n_texts >= embedding_batch_size:
+                        # Wait for a free slot before taking more chunks, so slow
+                        # embedding backs up the queue instead of piling up batches
+                        await embedding_semaphore.acquire()
+                        tg.start_soon(add_batch, batch)
+                        batch, n_texts = [], 0
+                if batch:
+                    await embedding_semaphore.acquire()
+                    tg.start_soon(add_batch, batch)
+
+        async def parse_stage() -> None:
+            async with anyio.create_task_group() as tg:
+                for _ in range(parse_concurrency):
+                    tg.start_soon(parse_worker)
+            for _ in range(metadata_concurrency):
+                await parsed.put(None)
+
+        async def metadata_stage() -> None:
+            async with anyio.create_task_group() as tg:
+                for _ in range(metadata_concurrency):
+                    tg.start_soon(metadata_worker)
+            await chunked.put(None)
+
+        # If a stage fails, the others get cancelled instead of blocking forever
+        # on a full queue that no one is consuming
+        try:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(parse_stage)
+                tg.start_soon(metadata_stage)
+                tg.start_soon(embedding_stage)
+        except ExceptionGroup as exc_group:
+            # Surface the first error, as the stages got cancelled because of it
+            exc: Exception = exc_group
+            while isinstance(exc, ExceptionGroup):
+                exc = exc.exceptions[0]
+            raise exc from exc_group
+        return docnames
+
+    async def _ainfer_doc(
+        self,
+        path: str | Path,
+        dockey: DocKey,
+        parsed_text: ParsedText,
+        parse_config: ParsingSettings,
+        llm_model: LLMModel,
+        skip_doi: str | None = None,
+        **kwargs,
+    ) -> Doc:
+        """Infer a citation from the first chunk, then try to upgrade to DocDetails."""
+        citation = await self._ainfer_citation(
+            path,
+            peek_first_chunk(
+                parsed_text,
+                path,
+                dockey,
+                chunk_chars=parse_config.chunk_size,
+                overlap=parse_config.overlap,
+            ),
+            parse_config,
+            llm_model,
+        )
+        docname = self._get_unique_name(citation_to_docname(citation))
+        return await self._aupgrade_doc(
+            Doc(docname=docname, citation=citation, dockey=dockey),
+            title=None,
+            doi=None,
+            authors=None,
+            parse_config=parse_config,
+            llm_model=llm_model,
+            skip_doi=skip_doi,
+            **kwargs,
+        )
+
+    @classmethod
+    async def _aupgrade_doc_from_doi(
+        cls,
+        path: str | Path,
+        dockey: DocKey,
+        parsed_text: ParsedText,
+        title: str | None,
+        doi: str | None,
+        authors: list[str] | None,
+        parse_config: ParsingSettings,
+        llm_model: LLMModel,
+        **kwargs,
+    ) -> tuple[DocDetails | None, str | None]:
+        """Try to get a document's metadata details from a DOI, without LLM calls.
+
+        The DOI is either passed in (e.g. from a manifest), or found in the document's
+        embedded metadata or first pages. As a DOI found in the text could be a cited
+        work's DOI, the title in its metadata must also appear in the first pages.
+
+        Returns:
+            Two-tuple of the upgraded document, or None if no DOI or metadata details
+                were found, and the DOI looked up, or None if there was no lookup.
+        """
+        if not (parse_config.use_doc_details and parse_config.metadata_fast_path):
+            return None, None
+        first_pages = _get_first_pages(parsed_text)
+        doi_was_found = doi is None
+        if doi_was_found:
+            doi = _find_doi(parsed_text.metadata.document_metadata, first_pages)
+            if doi is None:
+                return None, None
+        # Placeholder citation, only the dockey is kept when upgrading,
+        # so the citation and docname come from the metadata details
+        citation = f"Unknown, {os.path.basename(path)}, {datetime.now().year}"
+        doc = await cls._aupgrade_doc(
+            Doc(
+                docname=citation_to_docname(citation),
+                citation=citation,
+                dockey=dockey,
+                fields_to_overwrite_from_metadata={"dockey", "doc_id"},
+            ),
+            title=title,
+            doi=doi,
+            authors=authors,
+            parse_config=parse_config,
+            llm_model=llm_model,
+            **kwargs,
+        )
+        if not isinstance(doc, DocDetails) or not doc.other.get("client_source"):
+            return None, doi  # No metadata details were found
+        # Merging in the DOI re-derived the dockey from it, as does any assignment
+        # while it's a field to overwrite, so stop overwriting it and restore ours
+        doc.fields_to_overwrite_from_metadata -= {"dockey", "doc_id"}
+        doc.dockey = dockey
+        if doi_was_found and not (
+            doc.title and _squash(doc.title) in _squash(first_pages)
+        ):
+            logger.debug(
+                f"Ignoring DOI {doi} found in {path}, as its title {doc.title!r} isn't"
+                " in the first pages."
+            )
+            return None, doi
+        return doc, doi
+
+    @staticmethod
+    async def _ainfer_citation(
+        path: str | Path,
+        first_chunk: str,
+        parse_config: ParsingSettings,
+        llm_model: LLMModel,
+    ) -> str:
+        """Infer a citation from a document's first chunk, with a fallback citation."""
+        result = await llm_model.call_single(
+            messages=[
+                Message(content=parse_config.citation_prompt.format(text=first_chunk)),
+            ],
+        )
+        citation = cast("str", result.text)
+        if (
+            len(citation) < 3  # noqa: PLR2004
+            or "Unknown" in citation
+            or "insufficient" in citation
+        ):
+            citation = f"Unknown, {os.path.basename(path)}, {datetime.now().year}"
+        return citation
+
+    @staticmethod
+    async def _aupgrade_doc(
+        doc: Doc,
+        title: str | None,
+        doi: str | None,
+        authors: list[str] | None,
+        parse_config: ParsingSettings,
+        llm_model: LLMModel,
+        skip_doi: str | None = None,
+        **kwargs,
+    ) -> Doc:
+        """Try to upgrade a Doc to DocDetails, otherwise return the input Doc.
+
+        A DOI matching skip_doi (e.g. one the metadata fast path already looked up)
+        isn't looked up again.
+        """
         # try to extract DOI / title from the citation
         if (doi is title is None) and parse_config.use_doc_details:
             # TODO: specify a JSON schema here when many LLM providers support this
             messages = [
                 Message(
                     content=parse_config.structured_citation_prompt.format(
-                        citation=citation
+                        citation=doc.citation
                     ),
                 ),
             ]
@@ -373,6 +804,8 @@ class Docs(BaseModel):
                     f" {clean_text}, consider using a manifest file or specifying a"
                     " different citation prompt."
                 )
+        if doi is not None and doi == skip_doi:
+            doi = None
         # see if we can upgrade to DocDetails
         # if not, we can progress with a normal Doc
         # if "fields_to_overwrite_from_metadata" is used:
@@ -397,14 +830,12 @@ class Docs(BaseModel):
             doc = await metadata_client.upgrade_doc_to_doc_details(
                 doc, **(query_kwargs | kwargs)
             )
+        return doc
 
-        texts = await read_doc(
-            path,
-            doc,
-            chunk_chars=parse_config.chunk_size,
-            overlap=parse_config.overlap,
-            page_size_limit=parse_config.page_size_limit,
-        )
+    @staticmethod
+    def _check_texts(
+        texts: list[Text], path: str | Path, parse_config: ParsingSettings
+    ) -> None:
         # loose check to see if document was loaded
         if (
             not texts
@@ -420,9 +851,6 @@ class Docs(BaseModel):
                 f"This does not look like a text document: {path}. Pass disable_check"
                 " to ignore this error."
             )
-        if await self.aadd_texts(texts, doc, all_settings, embedding_model):
-            return docname
-        return None
 
     def add_texts(
         self,
@@ -478,7 +906,11 @@ class Docs(BaseModel):
         if embedding_model and texts[0].embedding is None:
             for t, t_embedding in zip(
                 texts,
-                await embedding_model.embed_documents(texts=[t.text for t in texts]),
+                await embed_documents(
+                    embedding_model,
+                    [t.text for t in texts],
+                    all_settings.get_embedding_cache(),
+                ),
                 strict=True,
             ):
                 t.embedding = t_embedding
@@ -494,6 +926,10 @@ class Docs(BaseModel):
         if doc.docname and doc.dockey:
             self.docs[doc.dockey] = doc
             self.texts += texts
+            if self._pending_texts is not None:
+                self._pending_texts += texts
+            if self._lexical_index is not None:
+                self._pending_lexical_texts += texts
             self.docnames.add(doc.docname)
             return True
         return False
@@ -516,22 +952,60 @@ class Docs(BaseModel):
                 self.docnames.remove(doc.docname)
                 dockey = doc.dockey
         del self.docs[dockey]
-        self.deleted_dockeys.add(dockey)
         self.texts = list(filter(lambda x: x.doc.dockey != dockey, self.texts))
-
-    async def _build_texts_index(self, embedding_model: EmbeddingModel) -> None:
-        texts = [t for t in self.texts if t not in self.texts_index]
-        # For any embeddings we are supposed to lazily embed, embed them now
-        to_embed = [t for t in texts if t.embedding is None]
+        if self._pending_texts is not None:
+            self._pending_texts = [
+                t for t in self._pending_texts if t.doc.dockey != dockey
+            ]
+        if self._lexical_index is not None:
+            self._pending_lexical_texts = [
+                t for t in self._pending_lexical_texts if t.doc.dockey != dockey
+            ]
+            self._lexical_index.delete_documents({dockey})
+        try:
+            self.texts_index.delete_documents({dockey})
+        except NotImplementedError:
+            # Fall back on over-fetching and filtering in retrieve_texts
+            self.deleted_dockeys.add(dockey)
+
+    async def _build_texts_index(
+        self,
+        embedding_model: EmbeddingModel,
+        embedding_cache: EmbeddingCache | None = None,
+    ) -> None:
+        """Add the pending texts to the texts index, embedding them if needed."""
+        pending = self.texts if self._pending_texts is None else self._pending_texts
+        if not pending:
+            return
+        texts = [t for t in pending if t not in self.texts_index]
+        # For any embeddings we are supposed to lazily embed, embed them now,
+        # in one batch across documents, and only once per distinct text
+        to_embed = list(dict.fromkeys(t.text for t in texts if t.embedding is None))
         if to_embed:
-            for t, t_embedding in zip(
-                to_embed,
-                await embedding_model.embed_documents(texts=[t.text for t in to_embed]),
-                strict=True,
-            ):
-                t.embedding = t_embedding
+            embeddings = dict(
+                zip(
+                    to_embed,
+                    await embed_documents(embedding_model, to_embed, embedding_cache),
+                    strict=True,
+                )
+            )
+            for t in texts:
+                if t.embedding is None:
+                    t.embedding = embeddings[t.text]
         await self.texts_index.add_texts_and_embeddings(texts)
-
+        self._pending_texts = []
+
+    def _get_lexical_index(self) -> BM25Index:
+        """Get the keyword index, building it or adding the pending texts to it."""
+        if self._lexical_index is None:
+            self._lexical_index = BM25Index()
+            self._pending_lexical_texts = list(self.texts)
+        if self._pending_lexical_texts:
+            self._lexical_index.add_texts(self._pending_lexical_texts)
+            self._pending_lexical_texts = []
+        return self._lexical_index
+
+    @overload
     async def retrieve_texts(
         self,
         query: str,
@@ -539,31 +1013,86 @@ class Docs(BaseModel):
         settings: MaybeSettings = None,
         embedding_model: EmbeddingModel | None = None,
         partitioning_fn: Callable[[Embeddable], int] | None = None,
-    ) -> list[Text]:
-        """Perform MMR search with the input query on the internal index."""
+        filter_criteria: Mapping[str, Any] | None = None,
+    ) -> list[Text]: ...
+
+    @overload
+    async def retrieve_texts(
+        self,
+        query: list[str],
+        k: int,
+        settings: MaybeSettings = None,
+        embedding_model: EmbeddingModel | None = None,
+        partitioning_fn: Callable[[Embeddable], int] | None = None,
+        filter_criteria: Mapping[str, Any] | None = None,
+    ) -> list[list[Text]]: ...
+
+    async def retrieve_texts(
+        self,
+        query: str | list[str],
+        k: int,
+        settings: MaybeSettings = None,
+        embedding_model: EmbeddingModel | None = None,
+        partitioning_fn: Callable[[Embeddable], int] | None = None,
+        filter_criteria: Mapping[str, Any] | None = None,
+    ) -> list[Text] | list[list[Text]]:
+        """Perform MMR search with the input query on the internal index.
+
+        Passing a list of queries embeds and scores them in one batch, returning a
+        list of matches per query. If configured, the matches are fused with BM25
+        keyword matches by reciprocal rank fusion. Filter criteria (defaulting to
+        the settings' `answer.evidence_retrieval_filter`) restrict the matches to
+        the texts of matching documents, e.g. {'year>=': 2020}.
+        """
         settings = get_settings(settings)
         if embedding_model is None:
             embedding_model = settings.get_embedding_model()
+        if filter_criteria is None:
+            filter_criteria = settings.answer.evidence_retrieval_filter
 
         # TODO: should probably happen elsewhere
         self.texts_index.mmr_lambda = settings.texts_index_mmr_lambda
 
-        await self._build_texts_index(embedding_model)
+        await self._build_texts_index(embedding_model, settings.get_embedding_cache())
         _k = k + len(self.deleted_dockeys)
-        matches: list[Text] = cast(
-            "list[Text]",
-            (
-                await self.texts_index.max_marginal_relevance_search(
-                    query,
-                    k=_k,
-                    fetch_k=2 * _k,
-                    embedding_model=embedding_model,
-                    partitioning_fn=partitioning_fn,
-                )
-            )[0],
+        queries = [query] if isinstance(query, str) else query
+        results = await self.texts_index.batch_max_marginal_relevance_search(
+            queries,
+            k=_k,
+            fetch_k=2 * _k,
+            embedding_model=embedding_model,
+            partitioning_fn=partitioning_fn,
+            filter_criteria=filter_criteria,
         )
-        matches = [m for m in matches if m.doc.dockey not in self.deleted_dockeys]
-        return matches[:k]
+        rankings = [cast("list[Text]", matches) for matches, _ in results]
+        if settings.answer.evidence_retrieval_lexical_fusion:
+            lexical_index = self._get_lexical_index()
+            rankings = [
+                cast(
+                    "list[Text]",
+                    reciprocal_rank_fusion(
+                        [dense_matches, lexical_index.search(q, _k)[0]],
+                        k=settings.answer.evidence_retrieval_rrf_k,
+                    ),
+                )
+                for q, dense_matches in zip(queries, rankings, strict=True)
+            ]
+        if filter_criteria:
+            # Keyword matches aren't filtered by the texts index
+            matching_dockeys = {
+                doc.dockey
+                for doc in {m.doc.dockey: m.doc for ms in rankings for m in ms}.values()
+                if doc.matches_filter_criteria(filter_criteria)
+            }
+            rankings = [
+                [m for m in matches if m.doc.dockey in matching_dockeys]
+                for matches in rankings
+            ]
+        all_matches = [
+            [m for m in matches if m.doc.dockey not in self.deleted_dockeys][:k]
+            for matches in rankings
+        ]
+        return all_matches[0] if isinstance(query, str) else all_matches
 
     def get_evidence(
         self,
@@ -640,6 +1169,13 @@ class Docs(BaseModel):
                 embedding_model,
                 partitioning_fn=partitioning_fn,
             )
+        elif answer_config.evidence_retrieval_filter:
+            matching_dockeys = {
+                dockey
+                for dockey, doc in self.docs.items()
+                if doc.matches_filter_criteria(answer_config.evidence_retrieval_filter)
+            }
+            matches = [t for t in self.texts if t.doc.dockey in matching_dockeys]
         else:
             matches = self.texts
 
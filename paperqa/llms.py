@@ -1,16 +1,31 @@
 import asyncio
-import itertools
+import json
 import logging
+import operator
+import os
+import re
+import sqlite3
 import threading
+import time
 import uuid
+import warnings
 from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
 from collections.abc import (
     Callable,
+    Collection,
     Iterable,
+    Iterator,
+    Mapping,
     Sequence,
     Sized,
 )
-from typing import TYPE_CHECKING, Any, cast
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import cache
+from itertools import starmap
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, Any, ClassVar, Literal, cast
 
 import numpy as np
 from lmi import (
@@ -22,15 +37,18 @@ from lmi import (
     SentenceTransformerEmbeddingModel,
     SparseEmbeddingModel,
 )
+from lmi.utils import gather_with_concurrency
 from pydantic import (
     BaseModel,
     ConfigDict,
     Field,
+    TypeAdapter,
     model_validator,
 )
 from typing_extensions import override
 
-from paperqa.types import Doc, Text
+from paperqa.types import Doc, DocDetails, DocKey, Text, parse_filter_key
+from paperqa.utils import hexdigest
 
 if TYPE_CHECKING:
     from qdrant_client.http.models import Record
@@ -46,12 +64,338 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+_DOC_ADAPTER: TypeAdapter[Doc | DocDetails] = TypeAdapter(
+    Annotated[Doc | DocDetails, Field(union_mode="left_to_right")]
+)
+
 
 def cosine_similarity(a, b):
-    norm_product = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    norm_product = np.outer(np.linalg.norm(a, axis=1), np.linalg.norm(b, axis=1))
     return a @ b.T / norm_product
 
 
+def normalize_rows(a: np.ndarray) -> np.ndarray:
+    """L2-normalize the rows of a 2D array as float32, leaving all-zero rows as-is."""
+    a = a.astype(np.float32, copy=False)
+    norms = np.linalg.norm(a, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return a / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Get the indices of the k largest scores, sorted by descending score.
+
+    Uses an O(N) partition to find the top k, so only those k get sorted.
+    """
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = (
+        np.argpartition(-scores, k - 1)[:k]
+        if k < len(scores)
+        else np.arange(len(scores))
+    )
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def quantize_int8(a: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Scalar quantize rows to int8 codes with one float32 scale per row.
+
+    A row is approximately recovered as `codes[i] * scales[i]`.
+    """
+    scales = np.abs(a).max(axis=1, initial=0.0).astype(np.float32) / 127
+    scales[scales == 0] = 1.0
+    codes = np.rint(a / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def partitioned_top_k_indices(
+    scores: np.ndarray, partitions: np.ndarray, k: int
+) -> np.ndarray:
+    """Get the k best indices, interleaving each partition's ranking by descending score.
+
+    The first index is the best of the lowest partition label, then the best of the
+    next partition label, and so on, before moving onto every partition's second best.
+    """
+    # Group by partition (ascending), descending score within each partition
+    by_partition = np.lexsort((-scores, partitions))
+    sorted_partitions = partitions[by_partition]
+    group_starts = np.flatnonzero(
+        np.r_[True, sorted_partitions[1:] != sorted_partitions[:-1]]
+    )
+    group_sizes = np.diff(np.r_[group_starts, len(sorted_partitions)])
+    ranks = np.arange(len(sorted_partitions)) - np.repeat(group_starts, group_sizes)
+    # Interleave the partitions' top k: every partition's best, then second, ...
+    keep = ranks < k
+    interleaved = np.lexsort((sorted_partitions[keep], ranks[keep]))[:k]
+    return by_partition[keep][interleaved]
+
+
+@cache
+def get_shard_executor(max_workers: int) -> ThreadPoolExecutor:
+    """Get a thread pool for scoring shards, shared across stores and queries."""
+    return ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="paperqa-shard"
+    )
+
+
+def same_partitioning(
+    partitioning_fn: Callable[[Embeddable], int] | None,
+    other_fn: Callable[[Embeddable], int] | None,
+) -> bool:
+    """Check if two partitioning functions are known to label texts the same way.
+
+    Beyond identity, functions match on an equal `partition_key` attribute. Set one
+    on a partitioning function recreated per query (e.g. a lambda) to keep cached
+    labels, and change it whenever the labels would change.
+    """
+    if partitioning_fn is other_fn:
+        return True
+    key = getattr(partitioning_fn, "partition_key", None)
+    return key is not None and key == getattr(other_fn, "partition_key", None)
+
+
+def embedding_model_key(embedding_model: EmbeddingModel) -> str:
+    """Make a key identifying the embeddings of an embedding model, for caching.
+
+    Beyond the name, this covers the dimensions (sent as the 'dimensions' argument)
+    and the config (including request keyword arguments). They're hashed, so secrets
+    like API keys are not persisted.
+    """
+    settings = {"ndim": embedding_model.ndim, "config": embedding_model.config}
+    digest = hexdigest(json.dumps(settings, sort_keys=True, default=str))
+    return f"{embedding_model.name}:{digest}"
+
+
+class QueryEmbeddingCache(BaseModel):
+    """Bounded LRU cache of query embeddings, optionally persisted to a file.
+
+    Entries are keyed on (embedding model key, embedding mode, query text), so
+    repeated questions (e.g. an agent retrying a search) skip the embedding request.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    max_size: int = Field(
+        default=1024,
+        ge=0,
+        description="Maximum number of query embeddings to keep, 0 disables caching.",
+    )
+    path: Path | None = Field(
+        default=None,
+        description=(
+            "Optional JSON lines file to persist embeddings to, letting the cache be"
+            " shared across processes. Entries are appended on each cache miss."
+        ),
+    )
+    hits: int = 0
+    misses: int = 0
+
+    _entries: OrderedDict[tuple[str, str, str], list[float]] | None = None
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _get_entries(self) -> OrderedDict[tuple[str, str, str], list[float]]:
+        if self._entries is None:
+            self._entries = OrderedDict()
+            if self.path is not None and self.path.exists():
+                with self.path.open(encoding="utf-8") as f:
+                    lines = f.readlines()
+                for line in lines:
+                    try:
+                        row = json.loads(line)
+                        key = row["model"], row["mode"], row["query"]
+                        embedding = row["embedding"]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        # Skip lines truncated or interleaved by concurrent appends
+                        continue
+                    self._insert(key, embedding)
+                if len(lines) > 2 * max(len(self._entries), 1):
+                    # Compact away evicted or duplicated entries
+                    self._write_all()
+        return self._entries
+
+    def _insert(self, key: tuple[str, str, str], embedding: list[float]) -> None:
+        entries = cast("OrderedDict", self._entries)
+        entries[key] = embedding
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def _write_all(self) -> None:
+        path = cast("Path", self.path)
+        with path.open("w", encoding="utf-8") as f:
+            f.writelines(starmap(self._serialize, self._get_entries().items()))
+
+    @staticmethod
+    def _serialize(key: tuple[str, str, str], embedding: list[float]) -> str:
+        model, mode, query = key
+        row = {"model": model, "mode": mode, "query": query, "embedding": embedding}
+        return json.dumps(row) + "\n"
+
+    def get(self, key: tuple[str, str, str]) -> list[float] | None:
+        """Get a cached embedding, marking it as most recently used."""
+        entries = self._get_entries()
+        if key not in entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entries.move_to_end(key)
+        return entries[key]
+
+    def put(self, key: tuple[str, str, str], embedding: list[float]) -> None:
+        if self.max_size == 0:
+            return
+        self._get_entries()
+        self._insert(key, embedding)
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(self._serialize(key, embedding))
+
+    def clear(self) -> None:
+        self._entries = OrderedDict()
+        self.hits = self.misses = 0
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class EmbeddingCache(BaseModel):
+    """Size-bounded cache of document embeddings, persisted to a SQLite database.
+
+    Entries are content addressed, keyed on (embedding model key, hash of the text),
+    so re-indexing the same text under another path or after settings changes that
+    don't affect chunking skips the embedding request.
+    Hit and miss counts are persisted alongside, so statistics span processes.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    path: Path = Field(description="SQLite database file of the cache.")
+    max_size_bytes: int = Field(
+        default=2**30,
+        ge=0,
+        description=(
+            "Maximum total size of the cached embeddings, beyond which the least"
+            " recently used embeddings are evicted."
+        ),
+    )
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.executescript(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, embedding"
+            " BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL);"
+            " CREATE INDEX IF NOT EXISTS embeddings_last_used ON"
+            " embeddings(last_used);"
+            " CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER"
+            " NOT NULL);"
+            " INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0);"
+        )
+        return connection
+
+    @staticmethod
+    def make_keys(embedding_model: EmbeddingModel, texts: Iterable[str]) -> list[str]:
+        """Make the cache keys of texts embedded by the input embedding model."""
+        model_key = embedding_model_key(embedding_model)
+        return [f"{model_key}:{hexdigest(t)}" for t in texts]
+
+    def get_many(self, keys: Sequence[str]) -> list[list[float] | None]:
+        """Get cached embeddings (or None if missing), marking them as recently used."""
+        with closing(self._connect()) as connection, connection:
+            # Pass keys as one JSON array to not hit SQLite's limit on query variables
+            embeddings = {
+                key: np.frombuffer(blob, dtype=np.float64).tolist()
+                for key, blob in connection.execute(
+                    "SELECT key, embedding FROM embeddings WHERE key IN (SELECT value"
+                    " FROM json_each(?))",
+                    (json.dumps(list(keys)),),
+                )
+            }
+            connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                ((time.time(), key) for key in embeddings),
+            )
+            hits = sum(key in embeddings for key in keys)
+            connection.executemany(
+                "UPDATE stats SET value = value + ? WHERE name = ?",
+                ((hits, "hits"), (len(keys) - hits, "misses")),
+            )
+        return [embeddings.get(key) for key in keys]
+
+    def put_many(self, keys: Sequence[str], embeddings: Sequence[list[float]]) -> None:
+        """Cache embeddings, evicting the least recently used beyond the size limit."""
+        blobs = [np.asarray(e, dtype=np.float64).tobytes() for e in embeddings]
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                (
+                    (key, blob, len(blob), now)
+                    for key, blob in zip(keys, blobs, strict=True)
+                ),
+            )
+            (total_size,) = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+            if total_size > self.max_size_bytes:
+                # Evict from the least recently used, keeping a running total size
+                connection.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM (SELECT key,"
+                    " SUM(size) OVER (ORDER BY last_used DESC, key) AS kept FROM"
+                    " embeddings) WHERE kept > ?)",
+                    (self.max_size_bytes,),
+                )
+
+    async def aembed_documents(
+        self, embedding_model: EmbeddingModel, texts: Sequence[str]
+    ) -> list[list[float]]:
+        """Embed texts, only sending the texts missing from the cache to the model."""
+        keys = self.make_keys(embedding_model, texts)
+        embeddings = await asyncio.to_thread(self.get_many, keys)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            new_embeddings = await embedding_model.embed_documents(
+                texts=[texts[i] for i in missing]
+            )
+            await asyncio.to_thread(
+                self.put_many, [keys[i] for i in missing], new_embeddings
+            )
+            for i, embedding in zip(missing, new_embeddings, strict=True):
+                embeddings[i] = embedding
+        return cast("list[list[float]]", embeddings)
+
+    def stats(self) -> dict[str, float]:
+        """Get the cache's entry count, size in bytes, hits, misses, and hit rate."""
+        with closing(self._connect()) as connection:
+            stats: dict[str, float] = dict(
+                connection.execute("SELECT name, value FROM stats").fetchall()
+            )
+            stats["entries"], stats["size_bytes"] = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+async def embed_documents(
+    embedding_model: EmbeddingModel,
+    texts: Sequence[str],
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[list[float]]:
+    """Embed texts with the embedding model, going through the cache if present."""
+    if embedding_cache is None:
+        return await embedding_model.embed_documents(texts=list(texts))
+    return await embedding_cache.aembed_documents(embedding_model, texts)
+
+
 class VectorStore(BaseModel, ABC):
     """Interface for vector store - very similar to LangChain's VectorStore to be compatible."""
 
@@ -64,6 +408,10 @@ class VectorStore(BaseModel, ABC):
         description="MMR lambda value, a value above 1 disables MMR search.",
     )
     texts_hashes: set[int] = Field(default_factory=set)
+    query_embedding_cache: QueryEmbeddingCache = Field(
+        default_factory=QueryEmbeddingCache,
+        description="Cache of query embeddings, to avoid re-embedding repeat queries.",
+    )
 
     def __contains__(self, item) -> bool:
         return hash(item) in self.texts_hashes
@@ -71,6 +419,18 @@ class VectorStore(BaseModel, ABC):
     def __len__(self) -> int:
         return len(self.texts_hashes)
 
+    def __setstate__(self, state: dict[Any, Any]) -> None:
+        # Stores pickled by older versions lack the fields and private attributes
+        # added since, such as the query embedding cache, so give them defaults
+        for name, field in type(self).model_fields.items():
+            if name not in state["__dict__"] and not field.is_required():
+                state["__dict__"][name] = field.get_default(call_default_factory=True)
+        private = state.get("__pydantic_private__") or {}
+        for name, private_attr in self.__private_attributes__.items():
+            private.setdefault(name, private_attr.get_default())
+        state["__pydantic_private__"] = private
+        super().__setstate__(state)
+
     @abstractmethod
     async def add_texts_and_embeddings(self, texts: Iterable[Embeddable]) -> None:
         """Add texts and their embeddings to the store."""
@@ -86,6 +446,59 @@ class VectorStore(BaseModel, ABC):
     def clear(self) -> None:
         self.texts_hashes = set()
 
+    def delete_documents(self, dockeys: Collection[DocKey]) -> None:
+        """Delete the texts of the input documents, excluding them from searches.
+
+        Args:
+            dockeys: keys of the documents whose texts should be deleted.
+        """
+        raise NotImplementedError(
+            "delete_documents is not implemented for this VectorStore."
+        )
+
+    async def _embed_queries(
+        self, queries: Sequence[str], embedding_model: EmbeddingModel
+    ) -> np.ndarray:
+        """Embed all queries in one request, giving a (queries, dim) array.
+
+        Queries found in the query embedding cache are not sent to the model.
+        """
+        model_key = embedding_model_key(embedding_model)
+        keys = [(model_key, EmbeddingModes.QUERY.value, q) for q in queries]
+        embeddings = {k: self.query_embedding_cache.get(k) for k in keys}
+        missing = [k for k, embedding in embeddings.items() if embedding is None]
+        if missing:
+            # this will only affect models that embedding prompts
+            embedding_model.set_mode(EmbeddingModes.QUERY)
+            new_embeddings = await embedding_model.embed_documents(
+                [query for _, _, query in missing]
+            )
+            embedding_model.set_mode(EmbeddingModes.DOCUMENT)
+            for k, embedding in zip(missing, new_embeddings, strict=True):
+                embeddings[k] = embedding
+                self.query_embedding_cache.put(k, embedding)
+        return np.array([embeddings[k] for k in keys])
+
+    async def batch_similarity_search(
+        self, queries: Sequence[str], k: int, embedding_model: EmbeddingModel
+    ) -> list[tuple[Sequence[Embeddable], list[float]]]:
+        """Perform similarity search for many queries.
+
+        This default runs each query's similarity search concurrently, stores that can
+        embed and score all the queries at once should override it.
+
+        Args:
+            queries: query strings
+            k: Number of results to return per query
+            embedding_model: model used to embed the queries
+
+        Returns:
+            List, aligned with the queries, of tuples of Embeddables and scores.
+        """
+        return await asyncio.gather(
+            *(self.similarity_search(q, k, embedding_model) for q in queries)
+        )
+
     async def partitioned_similarity_search(
         self,
         query: str,
@@ -108,6 +521,66 @@ class VectorStore(BaseModel, ABC):
             "partitioned_similarity_search is not implemented for this VectorStore."
         )
 
+    async def batch_filtered_similarity_search(
+        self,
+        queries: Sequence[str],
+        k: int,
+        embedding_model: EmbeddingModel,
+        filter_criteria: Mapping[str, Any],
+        partitioning_fn: Callable[[Embeddable], int] | None = None,
+    ) -> list[tuple[Sequence[Embeddable], list[float]]]:
+        """Perform similarity search for many queries over the matching documents.
+
+        This default over-fetches and drops the texts of documents not matching the
+        filter criteria, growing the fetch until there are k matches or the store is
+        exhausted. Stores that can filter before scoring should override it.
+
+        Args:
+            queries: query strings
+            k: Number of results to return per query
+            embedding_model: model used to embed the queries
+            filter_criteria: criteria that the texts' documents must match, see
+                `Doc.matches_filter_criteria`.
+            partitioning_fn: optional function to partition the documents into
+                different groups.
+
+        Returns:
+            List, aligned with the queries, of tuples of Embeddables and scores.
+        """
+        matches_cache: dict[DocKey, bool] = {}
+
+        def matches(text: Embeddable) -> bool:
+            doc = cast("Text", text).doc
+            if doc.dockey not in matches_cache:
+                matches_cache[doc.dockey] = doc.matches_filter_criteria(filter_criteria)
+            return matches_cache[doc.dockey]
+
+        fetch_k = k
+        while True:
+            if partitioning_fn is None:
+                results = await self.batch_similarity_search(
+                    queries, fetch_k, embedding_model
+                )
+            else:
+                results = await asyncio.gather(
+                    *(
+                        self.partitioned_similarity_search(
+                            q, fetch_k, embedding_model, partitioning_fn
+                        )
+                        for q in queries
+                    )
+                )
+            filtered = [
+                (
+                    [t for t in texts if matches(t)],
+                    [s for t, s in zip(texts, scores, strict=True) if matches(t)],
+                )
+                for texts, scores in results
+            ]
+            if fetch_k >= len(self) or all(len(t) >= k for t, _ in filtered):
+                return [(texts[:k], scores[:k]) for texts, scores in filtered]
+            fetch_k *= 4
+
     async def max_marginal_relevance_search(
         self,
         query: str,
@@ -115,6 +588,7 @@ class VectorStore(BaseModel, ABC):
         fetch_k: int,
         embedding_model: EmbeddingModel,
         partitioning_fn: Callable[[Embeddable], int] | None = None,
+        filter_criteria: Mapping[str, Any] | None = None,
     ) -> tuple[Sequence[Embeddable], list[float]]:
         """Vectorized implementation of Maximal Marginal Relevance (MMR) search.
 
@@ -125,6 +599,8 @@ class VectorStore(BaseModel, ABC):
             embedding_model: model used to embed the query
             partitioning_fn: optional function to partition the documents into
                 different groups, performing MMR within each group.
+            filter_criteria: optional criteria restricting the search to the texts
+                of matching documents, see `Doc.matches_filter_criteria`.
 
         Returns:
             List of tuples (doc, score) of length k.
@@ -132,7 +608,11 @@ class VectorStore(BaseModel, ABC):
         if fetch_k < k:
             raise ValueError("fetch_k must be greater or equal to k")
 
-        if partitioning_fn is None:
+        if filter_criteria:
+            ((texts, scores),) = await self.batch_filtered_similarity_search(
+                [query], fetch_k, embedding_model, filter_criteria, partitioning_fn
+            )
+        elif partitioning_fn is None:
             texts, scores = await self.similarity_search(
                 query, fetch_k, embedding_model
             )
@@ -141,29 +621,92 @@ class VectorStore(BaseModel, ABC):
                 query, fetch_k, embedding_model, partitioning_fn
             )
 
+        return self._rerank_by_mmr(texts, scores, k)
+
+    async def batch_max_marginal_relevance_search(
+        self,
+        queries: Sequence[str],
+        k: int,
+        fetch_k: int,
+        embedding_model: EmbeddingModel,
+        partitioning_fn: Callable[[Embeddable], int] | None = None,
+        filter_criteria: Mapping[str, Any] | None = None,
+    ) -> list[tuple[Sequence[Embeddable], list[float]]]:
+        """Maximal Marginal Relevance (MMR) search for many queries.
+
+        Without a partitioning function, the queries' similarity searches are batched.
+
+        Args:
+            queries: query strings.
+            k: Number of results to return per query.
+            fetch_k: Number of results to fetch from the vector store per query.
+            embedding_model: model used to embed the queries
+            partitioning_fn: optional function to partition the documents into
+                different groups, performing MMR within each group.
+            filter_criteria: optional criteria restricting the search to the texts
+                of matching documents, see `Doc.matches_filter_criteria`.
+
+        Returns:
+            List, aligned with the queries, of tuples of Embeddables and scores.
+        """
+        if fetch_k < k:
+            raise ValueError("fetch_k must be greater or equal to k")
+        if not queries:
+            return []
+
+        if filter_criteria:
+            results = await self.batch_filtered_similarity_search(
+                queries, fetch_k, embedding_model, filter_criteria, partitioning_fn
+            )
+        elif partitioning_fn is None:
+            results = await self.batch_similarity_search(
+                queries, fetch_k, embedding_model
+            )
+        else:
+            results = await asyncio.gather(
+                *(
+                    self.partitioned_similarity_search(
+                        q, fetch_k, embedding_model, partitioning_fn
+                    )
+                    for q in queries
+                )
+            )
+        return [self._rerank_by_mmr(texts, scores, k) for texts, scores in results]
+
+    def _rerank_by_mmr(
+        self, texts: Sequence[Embeddable], scores: list[float], k: int
+    ) -> tuple[Sequence[Embeddable], list[float]]:
         if len(texts) <= k or self.mmr_lambda >= 1.0:
             return texts, scores
 
-        embeddings = np.array([t.embedding for t in texts])
+        embeddings = np.array([t.embedding for t in texts], dtype=np.float64)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings /= norms
         np_scores = np.array(scores)
-        similarity_matrix = cosine_similarity(embeddings, embeddings)
 
+        # Track each text's max similarity to the selected texts, updated with one
+        # row per selection, instead of materializing the full similarity matrix
         selected_indices = [0]
-        remaining_indices = list(range(1, len(texts)))
+        is_selected = np.zeros(len(texts), dtype=bool)
+        is_selected[0] = True
+        max_sim_to_selected = embeddings @ embeddings[0]
 
         while len(selected_indices) < k:
-            selected_similarities = similarity_matrix[:, selected_indices]
-            max_sim_to_selected = selected_similarities.max(axis=1)
-
             mmr_scores = (
                 self.mmr_lambda * np_scores
                 - (1 - self.mmr_lambda) * max_sim_to_selected
             )
-            mmr_scores[selected_indices] = -np.inf  # Exclude already selected documents
+            mmr_scores[is_selected] = -np.inf  # Exclude already selected documents
 
-            max_mmr_index = mmr_scores.argmax()
+            max_mmr_index = int(mmr_scores.argmax())
             selected_indices.append(max_mmr_index)
-            remaining_indices.remove(max_mmr_index)
+            is_selected[max_mmr_index] = True
+            np.maximum(
+                max_sim_to_selected,
+                embeddings @ embeddings[max_mmr_index],
+                out=max_sim_to_selected,
+            )
 
         return [texts[i] for i in selected_indices], [
             scores[i] for i in selected_indices
@@ -172,8 +715,106 @@ class VectorStore(BaseModel, ABC):
 
 class NumpyVectorStore(VectorStore):
     texts: list[Embeddable] = Field(default_factory=list)
-    _embeddings_matrix: np.ndarray | None = None
-    _texts_filter: np.ndarray | None = None
+    compaction_threshold: float = Field(
+        default=0.25,
+        ge=0.0,
+        le=1.0,
+        description=(
+            "Fraction of deleted rows above which deleting documents also compacts"
+            " the store, physically removing the deleted rows. Compaction runs"
+            " synchronously within that delete_documents call."
+        ),
+    )
+    n_shards: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "Number of row shards scored concurrently in a thread pool by similarity"
+            " searches, each keeping its top k before a merge. Worthwhile for"
+            " millions of rows, ideally with a single-threaded BLAS per shard."
+        ),
+    )
+    reduced_dim: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Optional dimension the embeddings get reduced to, for storage and"
+            " scoring, following dim_reduction."
+        ),
+    )
+    dim_reduction: Literal["truncate", "pca"] = Field(
+        default="truncate",
+        description=(
+            "How embeddings are reduced to reduced_dim, 'truncate' keeps the leading"
+            " dimensions, suiting Matryoshka embeddings like OpenAI's"
+            " text-embedding-3 models. 'pca' projects onto principal components,"
+            " fit once pca_train_size rows were added (until then nothing's reduced)."
+        ),
+    )
+    pca_train_size: int = Field(
+        default=4096,
+        ge=1,
+        description="Number of rows the 'pca' dimensionality reduction is fit on.",
+    )
+    full_embeddings_path: Path | None = Field(
+        default=None,
+        description=(
+            "Optional file keeping the full-dimension embeddings of a store with a"
+            " reduced_dim, memory-mapped to re-rank the best rerank_candidates of"
+            " each similarity search."
+        ),
+    )
+    rerank_candidates: int = Field(
+        default=256,
+        ge=1,
+        description=(
+            "With a full_embeddings_path, the number of best-scoring candidates per"
+            " query re-ranked against the full-dimension embeddings."
+        ),
+    )
+    # Over-allocated float32 buffer of L2-normalized embeddings,
+    # only the first _embeddings_size rows are used
+    _embeddings_buffer: np.ndarray | None = None
+    _embeddings_size: int = 0
+    # Partition labels of the first len(_partitions) texts, from _partitioning_fn
+    _partitions: np.ndarray | None = None
+    _partitioning_fn: Callable[[Embeddable], int] | None = None
+    # Tombstones marking deleted and zero-norm rows until compaction,
+    # None if there are none
+    _deleted: np.ndarray | None = None
+    # Index into _docs of the first len(_row_docs) texts' documents, and lazily
+    # built column arrays of the documents' fields, to filter rows by document
+    _row_docs: np.ndarray | None = None
+    _docs: list[Doc | DocDetails] | None = None
+    _doc_columns: dict[str, np.ndarray] | None = None
+    # (full dim, reduced dim) projection of the embeddings, None until known,
+    # and the mean subtracted before projecting, None if not centering
+    _projection: np.ndarray | None = None
+    _projection_mean: np.ndarray | None = None
+    # Lazily memory-mapped rows of full_embeddings_path
+    _full_embeddings: np.ndarray | None = None
+
+    @model_validator(mode="after")
+    def validate_dim_reduction(self):
+        if (
+            self.reduced_dim is not None
+            and self.dim_reduction == "pca"
+            and self.pca_train_size < self.reduced_dim
+        ):
+            raise ValueError(
+                f"pca_train_size {self.pca_train_size} must be at least the"
+                f" reduced_dim {self.reduced_dim} to fit the principal components."
+            )
+        return self
+
+    @property
+    def _embeddings_matrix(self) -> np.ndarray | None:
+        """Read-only view of the populated rows of the embeddings buffer."""
+        if self._embeddings_buffer is None:
+            return None
+        view = self._embeddings_buffer[: self._embeddings_size]
+        view.flags.writeable = False
+        return view
 
     def __eq__(self, other) -> bool:
         if not isinstance(other, type(self)):
@@ -196,13 +837,386 @@ class NumpyVectorStore(VectorStore):
     def clear(self) -> None:
         super().clear()
         self.texts = []
-        self._embeddings_matrix = None
-        self._texts_filter = None
+        self._embeddings_buffer = None
+        self._embeddings_size = 0
+        self._partitions = None
+        self._partitioning_fn = None
+        self._deleted = None
+        self._row_docs = None
+        self._docs = None
+        self._doc_columns = None
+        self._projection = None
+        self._projection_mean = None
+        self._full_embeddings = None
+        if self.full_embeddings_path is not None:
+            self.full_embeddings_path.unlink(missing_ok=True)
+
+    def delete_documents(self, dockeys: Collection[DocKey]) -> None:
+        deleted = np.fromiter(
+            (cast("Text", t).doc.dockey in dockeys for t in self.texts),
+            dtype=bool,
+            count=len(self.texts),
+        )
+        if not deleted.any():
+            return
+        self._deleted = deleted if self._deleted is None else self._deleted | deleted
+        # Identical texts of other documents still own their (content) hash
+        deleted_hashes = {hash(self.texts[i]) for i in np.flatnonzero(deleted)}
+        deleted_hashes.difference_update(
+            hash(self.texts[i]) for i in np.flatnonzero(~self._deleted)
+        )
+        self.texts_hashes.difference_update(deleted_hashes)
+        if self._deleted.mean() > self.compaction_threshold:
+            # Compacting here instead of in the background, as a concurrent search
+            # would race with the rebuild, costing one copy of the live rows
+            self.compact()
+
+    def compact(self) -> None:
+        """Physically remove deleted rows, reclaiming their memory."""
+        if self._deleted is None:
+            return
+        live = ~self._deleted
+        if self.full_embeddings_path is not None:
+            compacted_path = self.full_embeddings_path.with_suffix(".compacting")
+            compacted_path.write_bytes(self._get_full_embeddings()[live].tobytes())
+            self._full_embeddings = None
+            compacted_path.replace(self.full_embeddings_path)
+        embedding_matrix = cast("np.ndarray", self._embeddings_matrix)
+        self.texts = [t for t, keep in zip(self.texts, live, strict=True) if keep]
+        compacted = embedding_matrix[live]
+        self._embeddings_buffer, self._embeddings_size = compacted, len(compacted)
+        if self._partitions is not None:
+            self._partitions = self._partitions[live[: len(self._partitions)]]
+        if self._row_docs is not None:
+            self._row_docs = self._row_docs[live[: len(self._row_docs)]]
+        self._deleted = None
+
+    def _drop_deleted(
+        self, rows: np.ndarray, scores: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if self._deleted is None:
+            return rows, scores
+        live = ~self._deleted[rows]
+        return rows[live], scores[live]
+
+    def __getstate__(self) -> dict[Any, Any]:
+        state = super().__getstate__()
+        # Partitioning functions may be unpicklable (e.g. closures),
+        # so drop the partition cache, it gets lazily rebuilt anyways
+        state["__pydantic_private__"] = (state["__pydantic_private__"] or {}) | {
+            "_partitions": None,
+            "_partitioning_fn": None,
+            "_full_embeddings": None,
+        }
+        return state
+
+    def _append_embeddings(self, embeddings: np.ndarray) -> None:
+        """Append rows to the embeddings buffer, doubling its capacity as needed."""
+        n_new, dim = embeddings.shape
+        size = self._embeddings_size
+        if self._embeddings_buffer is None:
+            self._embeddings_buffer = np.empty((n_new, dim), dtype=np.float32)
+        elif self._embeddings_buffer.shape[1] != dim:
+            raise ValueError(
+                f"Embedding dimension {dim} does not match the store's dimension"
+                f" {self._embeddings_buffer.shape[1]}."
+            )
+        elif size + n_new > self._embeddings_buffer.shape[0]:
+            capacity = max(2 * self._embeddings_buffer.shape[0], size + n_new)
+            grown = np.empty((capacity, dim), dtype=np.float32)
+            grown[:size] = self._embeddings_buffer[:size]
+            self._embeddings_buffer = grown
+        self._embeddings_buffer[size : size + n_new] = embeddings
+        self._embeddings_size = size + n_new
 
     async def add_texts_and_embeddings(self, texts: Iterable[Embeddable]) -> None:
+        texts = list(texts)
         await super().add_texts_and_embeddings(texts)
+        if not texts:
+            return
+        embeddings = normalize_rows(np.array([t.embedding for t in texts]))
+        n_rows = self._embeddings_size
+        if self.full_embeddings_path is not None:
+            # Overwrite the rows left behind by a previous store
+            with self.full_embeddings_path.open(
+                "ab" if self._embeddings_size else "wb"
+            ) as f:
+                f.write(embeddings.astype(np.float32).tobytes())
+            self._full_embeddings = None
+        self._append_embeddings(self._reduce(embeddings))
+        if (
+            self.reduced_dim is not None
+            and self.dim_reduction == "pca"
+            and self._projection is None
+            and self._embeddings_size >= self.pca_train_size
+        ):
+            self._fit_pca()
         self.texts.extend(texts)
-        self._embeddings_matrix = np.array([t.embedding for t in self.texts])
+        # Zero vectors have no direction to score, so like deleted rows they're
+        # excluded from searches, instead of scoring 0
+        is_zero = ~embeddings.any(axis=1)
+        if self._deleted is not None or is_zero.any():
+            self._deleted = np.concatenate(
+                (
+                    (
+                        np.zeros(n_rows, dtype=bool)
+                        if self._deleted is None
+                        else self._deleted
+                    ),
+                    is_zero,
+                )
+            )
+
+    def _reduce(self, embeddings: np.ndarray) -> np.ndarray:
+        """Reduce normalized rows to the reduced dimension, once the projection is known."""
+        if self.reduced_dim is None or embeddings.shape[1] <= self.reduced_dim:
+            return embeddings
+        if self._projection is None:
+            if self.dim_reduction == "pca":
+                return embeddings  # Not yet fit
+            self._projection = np.eye(
+                embeddings.shape[1], self.reduced_dim, dtype=np.float32
+            )
+        centered = (
+            embeddings
+            if self._projection_mean is None
+            else embeddings - self._projection_mean
+        )
+        return normalize_rows(centered @ self._projection)
+
+    def _fit_pca(self) -> None:
+        """Fit the principal components on a sample of rows, then project all rows."""
+        embedding_matrix = cast("np.ndarray", self._embeddings_matrix)
+        rng = np.random.default_rng(seed=42)
+        sample = embedding_matrix[
+            np.sort(
+                rng.choice(
+                    len(embedding_matrix), size=self.pca_train_size, replace=False
+                )
+            )
+        ]
+        mean = sample.mean(axis=0)
+        _, _, components = np.linalg.svd(sample - mean, full_matrices=False)
+        self._projection = components[: self.reduced_dim].T.astype(np.float32)
+        # The components are of the centered sample, so rows and queries get
+        # centered on the same mean before projecting
+        self._projection_mean = mean.astype(np.float32)
+        self._embeddings_buffer = normalize_rows(
+            (embedding_matrix - self._projection_mean) @ self._projection
+        ).astype(np.float32)
+
+    def _prepare_queries(self, np_queries: np.ndarray) -> np.ndarray:
+        """Normalize and reduce a (queries, dim) array, to score against the rows."""
+        return self._reduce(normalize_rows(np_queries))
+
+    def _get_full_embeddings(self) -> np.ndarray:
+        if self._full_embeddings is None:
+            self._full_embeddings = np.memmap(
+                cast("Path", self.full_embeddings_path), dtype=np.float32, mode="r"
+            ).reshape(self._embeddings_size, -1)
+        return self._full_embeddings
+
+    def _reranks(self, prune_to_k: bool) -> bool:
+        return (
+            prune_to_k
+            and self._projection is not None
+            and self.full_embeddings_path is not None
+        )
+
+    def _rerank(
+        self,
+        np_queries: np.ndarray,
+        candidates: list[tuple[np.ndarray, np.ndarray]],
+        k: int,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Re-score each query's best candidates with the full-dimension embeddings."""
+        full_embeddings = self._get_full_embeddings()
+        results: list[tuple[np.ndarray, np.ndarray]] = []
+        for np_query, (rows, scores) in zip(
+            normalize_rows(np_queries), candidates, strict=True
+        ):
+            rows = np.sort(rows[top_k_indices(scores, max(k, self.rerank_candidates))])
+            results.append(
+                (rows, np.nan_to_num(full_embeddings[rows] @ np_query, nan=-np.inf))
+            )
+        return results
+
+    def _get_partitions(
+        self, partitioning_fn: Callable[[Embeddable], int]
+    ) -> np.ndarray:
+        """Get the partition label of every text, only labelling uncached texts."""
+        partitions = self._partitions
+        if partitions is None or not same_partitioning(
+            self._partitioning_fn, partitioning_fn
+        ):
+            partitions = np.empty(0, dtype=np.int64)
+            self._partitioning_fn = partitioning_fn
+        n_labelled = len(partitions)
+        if n_labelled < len(self.texts):
+            new_partitions = np.fromiter(
+                (partitioning_fn(t) for t in self.texts[n_labelled:]), dtype=np.int64
+            )
+            partitions = np.concatenate((partitions, new_partitions))
+        self._partitions = partitions
+        return partitions
+
+    def _get_row_docs(self) -> tuple[np.ndarray, list[Doc | DocDetails]]:
+        """Get every text's index into the distinct documents, indexing uncached texts."""
+        row_docs, docs = self._row_docs, self._docs
+        if row_docs is None or docs is None:
+            row_docs, docs = np.empty(0, dtype=np.int64), []
+        n_indexed = len(row_docs)
+        if n_indexed < len(self.texts):
+            doc_indices = {doc.dockey: i for i, doc in enumerate(docs)}
+            for t in self.texts[n_indexed:]:
+                doc = cast("Text", t).doc
+                if doc.dockey not in doc_indices:
+                    doc_indices[doc.dockey] = len(docs)
+                    docs.append(doc)
+            new_row_docs = np.fromiter(
+                (
+                    doc_indices[cast("Text", t).doc.dockey]
+                    for t in self.texts[n_indexed:]
+                ),
+                dtype=np.int64,
+            )
+            row_docs = np.concatenate((row_docs, new_row_docs))
+        self._row_docs, self._docs = row_docs, docs
+        return row_docs, docs
+
+    def _get_doc_column(self, field: str) -> np.ndarray:
+        """Get an object array of a field's value per document, missing fields are None.
+
+        Columns are extended as documents are added, rather than rebuilt.
+        """
+        _, docs = self._get_row_docs()
+        if self._doc_columns is None:
+            self._doc_columns = {}
+        column = self._doc_columns.get(field, np.empty(0, dtype=object))
+        if len(column) < len(docs):
+            new_values = np.empty(len(docs) - len(column), dtype=object)
+            new_values[:] = [getattr(doc, field, None) for doc in docs[len(column) :]]
+            column = self._doc_columns[field] = np.concatenate((column, new_values))
+        return column
+
+    def get_filter_mask(self, filter_criteria: Mapping[str, Any]) -> np.ndarray:
+        """Get a boolean mask of the rows whose document matches the filter criteria.
+
+        Matches `Doc.matches_filter_criteria`, but each criterion is evaluated once
+        per column of document fields, and then broadcast to the rows.
+        """
+        row_docs, docs = self._get_row_docs()
+        doc_mask = np.ones(len(docs), dtype=bool)
+        for key, value in filter_criteria.items():
+            field, invert, relaxed, comparison = parse_filter_key(key)
+            column = self._get_doc_column(field)
+            has_field = np.fromiter(
+                (
+                    field in type(doc).model_fields
+                    or field in type(doc).model_computed_fields
+                    for doc in docs
+                ),
+                dtype=bool,
+                count=len(docs),
+            )
+            is_none = np.fromiter(
+                (v is None for v in column), dtype=bool, count=len(docs)
+            )
+            compared = np.zeros(len(docs), dtype=bool)
+            if comparison is operator.eq:
+                compared[is_none] = value is None
+            present = ~is_none
+            if isinstance(value, str) or np.isscalar(value):
+                compared[present] = comparison(column[present], value)
+            elif value is not None:  # Containers can't be compared elementwise
+                compared[present] = [
+                    bool(comparison(v, value)) for v in column[present]
+                ]
+            criterion_mask = has_field & (compared != invert)
+            if relaxed:
+                criterion_mask |= ~has_field | is_none
+            doc_mask &= criterion_mask
+        return doc_mask[row_docs[: len(self.texts)]]
+
+    def _score(self, np_queries: np.ndarray) -> np.ndarray:
+        """Score a (queries, dim) array against every row, giving (queries, rows)."""
+        # Rows are normalized at insertion, so cosine similarity is a dot product
+        embedding_matrix = cast("np.ndarray", self._embeddings_matrix)
+        similarity_scores = self._prepare_queries(np_queries) @ embedding_matrix.T
+        return np.nan_to_num(similarity_scores, nan=-np.inf)
+
+    def _score_shard(
+        self, np_queries: np.ndarray, start: int, stop: int, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Score rows [start, stop), giving each query's top k rows and scores."""
+        embedding_matrix = cast("np.ndarray", self._embeddings_matrix)
+        scores = np.nan_to_num(np_queries @ embedding_matrix[start:stop].T, nan=-np.inf)
+        if self._deleted is not None:
+            # Rank deleted rows last, they're dropped after the merge
+            scores[:, self._deleted[start:stop]] = -np.inf
+        k = min(k, stop - start)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return top + start, np.take_along_axis(scores, top, axis=1)
+
+    def _score_sharded(
+        self, np_queries: np.ndarray, k: int
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Get each query's top k rows, scoring the shards in a thread pool."""
+        np_queries = self._prepare_queries(np_queries)
+        n_shards = min(self.n_shards, self._embeddings_size)
+        bounds = np.linspace(0, self._embeddings_size, n_shards + 1, dtype=int)
+        # NumPy releases the GIL in matrix multiplication and partitioning
+        shard_results = list(
+            get_shard_executor(self.n_shards).map(
+                lambda start, stop: self._score_shard(np_queries, start, stop, k),
+                bounds[:-1].tolist(),
+                bounds[1:].tolist(),
+            )
+        )
+        # Merge the shards' top k in one vectorized top k over all queries
+        rows = np.concatenate([r for r, _ in shard_results], axis=1)
+        scores = np.concatenate([s for _, s in shard_results], axis=1)
+        k = min(k, rows.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        rows = np.take_along_axis(rows, top, axis=1)
+        scores = np.take_along_axis(scores, top, axis=1)
+        return list(starmap(self._drop_deleted, zip(rows, scores, strict=True)))
+
+    def _score_candidates(
+        self,
+        np_queries: np.ndarray,
+        k: int,
+        prune_to_k: bool = False,
+        mask: np.ndarray | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Get each query's candidate row indices and their scores.
+
+        This store scores every row, approximate stores can score fewer rows, but
+        should return at least k candidates when the store has that many rows,
+        or at least k candidates within the mask if a row mask is given.
+        Pass prune_to_k when only the top k matters, allowing candidates that can't
+        be in the top k to get dropped, such as when scoring shards, and re-ranking
+        the best candidates of reduced embeddings against the full embeddings.
+        """
+        n_candidates = (
+            max(k, self.rerank_candidates) if self._reranks(prune_to_k) else k
+        )
+        if prune_to_k and self.n_shards > 1:
+            candidates = self._score_sharded(np_queries, n_candidates)
+        else:
+            all_rows = np.arange(self._embeddings_size)
+            candidates = [
+                self._drop_deleted(all_rows, scores)
+                for scores in self._score(np_queries)
+            ]
+        if mask is not None:
+            # Drop non-matching rows first, so re-ranking only picks matching ones
+            candidates = [
+                (rows[mask[rows]], scores[mask[rows]]) for rows, scores in candidates
+            ]
+        if self._reranks(prune_to_k):
+            return self._rerank(np_queries, candidates, k)
+        return candidates
 
     async def partitioned_similarity_search(
         self,
@@ -211,68 +1225,284 @@ class NumpyVectorStore(VectorStore):
         embedding_model: EmbeddingModel,
         partitioning_fn: Callable[[Embeddable], int],
     ) -> tuple[Sequence[Embeddable], list[float]]:
-        scores: list[list[float]] = []
-        texts: list[Sequence[Embeddable]] = []
-
-        text_partitions = np.array([partitioning_fn(t) for t in self.texts])
-        # CPU bound so replacing w a gather wouldn't get us anything
-        # plus we need to reset self._texts_filter each iteration
-        for partition in np.unique(text_partitions):
-            self._texts_filter = text_partitions == partition
-            _texts, _scores = await self.similarity_search(query, k, embedding_model)
-            texts.append(_texts)
-            scores.append(_scores)
-        # reset the filter after running
-        self._texts_filter = None
+        k = min(k, len(self.texts))
+        if k == 0:
+            return [], []
 
+        partitions = self._get_partitions(partitioning_fn)
+        ((rows, similarity_scores),) = self._score_candidates(
+            await self._embed_queries([query], embedding_model), k
+        )
+
+        top_indices = partitioned_top_k_indices(similarity_scores, partitions[rows], k)
         return (
-            [
-                t
-                for t in itertools.chain.from_iterable(itertools.zip_longest(*texts))
-                if t is not None
-            ][:k],
-            [
-                s
-                for s in itertools.chain.from_iterable(itertools.zip_longest(*scores))
-                if s is not None
-            ][:k],
+            [self.texts[i] for i in rows[top_indices]],
+            similarity_scores[top_indices].tolist(),
         )
 
     async def similarity_search(
         self, query: str, k: int, embedding_model: EmbeddingModel
     ) -> tuple[Sequence[Embeddable], list[float]]:
+        return (await self.batch_similarity_search([query], k, embedding_model))[0]
+
+    async def batch_similarity_search(
+        self, queries: Sequence[str], k: int, embedding_model: EmbeddingModel
+    ) -> list[tuple[Sequence[Embeddable], list[float]]]:
         k = min(k, len(self.texts))
-        if k == 0:
-            return [], []
+        if k == 0 or not queries:
+            return [([], []) for _ in queries]
+
+        results: list[tuple[Sequence[Embeddable], list[float]]] = []
+        for rows, similarity_scores in self._score_candidates(
+            await self._embed_queries(queries, embedding_model), k, prune_to_k=True
+        ):
+            # a lot of algorithms expect a sorted list, so the top k get sorted
+            top_indices = top_k_indices(similarity_scores, k)
+            results.append(
+                (
+                    [self.texts[i] for i in rows[top_indices]],
+                    similarity_scores[top_indices].tolist(),
+                )
+            )
+        return results
 
-        # this will only affect models that embedding prompts
-        embedding_model.set_mode(EmbeddingModes.QUERY)
+    async def batch_filtered_similarity_search(
+        self,
+        queries: Sequence[str],
+        k: int,
+        embedding_model: EmbeddingModel,
+        filter_criteria: Mapping[str, Any],
+        partitioning_fn: Callable[[Embeddable], int] | None = None,
+    ) -> list[tuple[Sequence[Embeddable], list[float]]]:
+        k = min(k, len(self.texts))
+        if k == 0 or not queries:
+            return [([], []) for _ in queries]
 
-        np_query = np.array((await embedding_model.embed_documents([query]))[0])
+        mask = self.get_filter_mask(filter_criteria)
+        partitions = (
+            None if partitioning_fn is None else self._get_partitions(partitioning_fn)
+        )
+        results: list[tuple[Sequence[Embeddable], list[float]]] = []
+        for rows, similarity_scores in self._score_candidates(
+            await self._embed_queries(queries, embedding_model), k, mask=mask
+        ):
+            # Mask out non-matching rows before the top k
+            matching = mask[rows]
+            rows, similarity_scores = rows[matching], similarity_scores[matching]
+            top_indices = (
+                top_k_indices(similarity_scores, k)
+                if partitions is None
+                else partitioned_top_k_indices(similarity_scores, partitions[rows], k)
+            )
+            results.append(
+                (
+                    [self.texts[i] for i in rows[top_indices]],
+                    similarity_scores[top_indices].tolist(),
+                )
+            )
+        return results
 
-        embedding_model.set_mode(EmbeddingModes.DOCUMENT)
 
-        embedding_matrix = self._embeddings_matrix
+class IVFVectorStore(NumpyVectorStore):
+    """Approximate nearest neighbor store using an inverted file (IVF-flat) index.
 
-        if self._texts_filter is not None:
-            original_indices = np.where(self._texts_filter)[0]
-            embedding_matrix = embedding_matrix[self._texts_filter]  # type: ignore[index]
-        else:
-            original_indices = np.arange(len(self.texts))
-
-        similarity_scores = cosine_similarity(
-            np_query.reshape(1, -1), embedding_matrix
-        )[0]
-        similarity_scores = np.nan_to_num(similarity_scores, nan=-np.inf)
-        # minus so descending
-        # we could use arg-partition here
-        # but a lot of algorithms expect a sorted list
-        sorted_indices = np.argsort(-similarity_scores)
+    Rows are clustered with spherical k-means, and a query only scores the rows of
+    its n_probe closest clusters. Until the store holds min_train_size rows, search
+    is exact. The index is maintained lazily at search time: new rows get assigned
+    to their closest centroid, and the centroids are retrained once the store grows
+    by retrain_growth.
+    """
+
+    n_lists: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Number of k-means clusters (inverted lists), leave unset to use the"
+            " square root of the number of rows at training time."
+        ),
+    )
+    n_probe: int = Field(
+        default=16,
+        ge=1,
+        description=(
+            "Number of closest clusters scored per query, raising it increases recall"
+            " at the cost of latency."
+        ),
+    )
+    min_train_size: int = Field(
+        default=10_000,
+        ge=1,
+        description="Number of rows below which search is exact (no index is built).",
+    )
+    retrain_growth: float = Field(
+        default=4.0,
+        gt=1.0,
+        description="Retrain the centroids when the store grows by this factor.",
+    )
+    kmeans_iterations: int = Field(default=10, ge=1)
+    seed: int = Field(default=42, description="Seed for k-means initialization.")
+
+    MAX_TRAINING_ROWS_PER_LIST: ClassVar[int] = 64
+    ASSIGNMENT_CHUNK_SIZE: ClassVar[int] = 65_536
+
+    _centroids: np.ndarray | None = None
+    _trained_size: int = 0
+    # Cluster of the first len(_assignments) rows
+    _assignments: np.ndarray | None = None
+    # Rows sorted by cluster, with cluster i at _list_rows[_list_offsets[i]:_list_offsets[i + 1]]
+    _list_rows: np.ndarray | None = None
+    _list_offsets: np.ndarray | None = None
+
+    def clear(self) -> None:
+        super().clear()
+        self._centroids = None
+        self._trained_size = 0
+        self._assignments = self._list_rows = self._list_offsets = None
+
+    def compact(self) -> None:
+        if self._deleted is not None and self._assignments is not None:
+            # Keep the centroids, only dropping the deleted rows' assignments
+            live = ~self._deleted[: len(self._assignments)]
+            self._assignments = self._assignments[live]
+            self._list_rows = self._list_offsets = None
+        super().compact()
+
+    def _nearest_centroids(self, rows: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # Chunked, to bound the size of the (rows, centroids) score matrix
+        return np.concatenate(
+            [
+                (rows[i : i + self.ASSIGNMENT_CHUNK_SIZE] @ centroids.T).argmax(axis=1)
+                for i in range(0, len(rows), self.ASSIGNMENT_CHUNK_SIZE)
+            ]
+            or [np.empty(0, dtype=np.intp)]
+        )
+
+    def _train(self) -> None:
+        """Fit centroids with spherical k-means on a sample of the rows."""
+        embedding_matrix = cast("np.ndarray", self._embeddings_matrix)
+        size = len(embedding_matrix)
+        n_lists = min(self.n_lists or round(np.sqrt(size)), size)
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(size, n_lists * self.MAX_TRAINING_ROWS_PER_LIST)
+        sample = embedding_matrix[
+            np.sort(rng.choice(size, size=sample_size, replace=False))
+        ]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)]
+        for _ in range(self.kmeans_iterations):
+            assignments = self._nearest_centroids(sample, centroids)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=n_lists)
+            nonempty = counts > 0
+            sums = np.add.reduceat(
+                sample[order], np.cumsum(counts)[nonempty] - counts[nonempty]
+            )
+            centroids = centroids.copy()
+            centroids[nonempty] = normalize_rows(sums)
+            # Reseed empty clusters with random rows
+            n_empty = n_lists - int(nonempty.sum())
+            if n_empty:
+                centroids[~nonempty] = sample[rng.choice(sample_size, size=n_empty)]
+        self._centroids = centroids
+        self._trained_size = size
+        self._assignments = self._nearest_centroids(embedding_matrix, centroids)
+        self._list_rows = self._list_offsets = None
+
+    def _get_inverted_lists(self) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        """Get centroids and the rows of each cluster, or None if search is exact."""
+        size = self._embeddings_size
+        if size < self.min_train_size:
+            return None
+        if (
+            self._centroids is None
+            or size >= self.retrain_growth * self._trained_size
+            # Fitting a dimensionality reduction changes the rows' dimension
+            or self._centroids.shape[1]
+            != cast("np.ndarray", self._embeddings_buffer).shape[1]
+        ):
+            self._train()
+        assignments = cast("np.ndarray", self._assignments)
+        if len(assignments) < size:
+            embedding_matrix = cast("np.ndarray", self._embeddings_matrix)
+            self._assignments = assignments = np.concatenate(
+                (
+                    assignments,
+                    self._nearest_centroids(
+                        embedding_matrix[len(assignments) :],
+                        cast("np.ndarray", self._centroids),
+                    ),
+                )
+            )
+            self._list_rows = self._list_offsets = None
+        if self._list_rows is None or self._list_offsets is None:
+            self._list_rows = np.argsort(assignments, kind="stable")
+            self._list_offsets = np.concatenate(
+                (
+                    [0],
+                    np.cumsum(
+                        np.bincount(
+                            assignments,
+                            minlength=len(cast("np.ndarray", self._centroids)),
+                        )
+                    ),
+                )
+            )
         return (
-            [self.texts[i] for i in original_indices[sorted_indices][:k]],
-            [similarity_scores[i] for i in sorted_indices[:k]],
+            cast("np.ndarray", self._centroids),
+            self._list_rows,
+            self._list_offsets,
         )
 
+    def _score_candidates(
+        self,
+        np_queries: np.ndarray,
+        k: int,
+        prune_to_k: bool = False,
+        mask: np.ndarray | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        inverted_lists = self._get_inverted_lists()
+        if inverted_lists is None:
+            return super()._score_candidates(np_queries, k, prune_to_k, mask)
+        centroids, list_rows, list_offsets = inverted_lists
+        embedding_matrix = cast("np.ndarray", self._embeddings_matrix)
+        if mask is None:
+            list_sizes = np.diff(list_offsets)
+        else:
+            # Only count the rows that can match, so selective filters probe
+            # more clusters (up to all of them) instead of returning too few
+            eligible = (
+                mask[: self._embeddings_size]
+                if self._deleted is None
+                else mask[: self._embeddings_size]
+                & ~self._deleted[: self._embeddings_size]
+            )
+            list_sizes = np.bincount(
+                cast("np.ndarray", self._assignments)[eligible],
+                minlength=len(centroids),
+            )
+
+        prepared_queries = self._prepare_queries(np_queries)
+        results: list[tuple[np.ndarray, np.ndarray]] = []
+        for np_query, centroid_scores in zip(
+            prepared_queries, prepared_queries @ centroids.T, strict=True
+        ):
+            probe_order = np.argsort(-centroid_scores, kind="stable")
+            # Probe past n_probe if needed to get at least k (eligible) candidates
+            n_probe = max(
+                self.n_probe,
+                int(np.searchsorted(np.cumsum(list_sizes[probe_order]), k)) + 1,
+            )
+            rows = np.concatenate(
+                [
+                    list_rows[list_offsets[i] : list_offsets[i + 1]]
+                    for i in probe_order[:n_probe]
+                ]
+            )
+            scores = np.nan_to_num(embedding_matrix[rows] @ np_query, nan=-np.inf)
+            results.append(self._drop_deleted(rows, scores))
+        if self._reranks(prune_to_k):
+            return self._rerank(np_queries, results, k)
+        return results
+
 
 class QdrantVectorStore(VectorStore):
     client: Any = Field(
@@ -284,7 +1514,27 @@ class QdrantVectorStore(VectorStore):
     )
     collection_name: str = Field(default_factory=lambda: f"paper-qa-{uuid.uuid4().hex}")
     vector_name: str | None = Field(default=None)
+    upsert_batch_size: int = Field(
+        default=256, ge=1, description="Maximum number of points per upsert request."
+    )
+    max_concurrent_upserts: int = Field(
+        default=4, ge=1, description="Maximum number of concurrent upsert requests."
+    )
+    # Payload keys indexed upon collection creation, mapped to their schema type
+    PAYLOAD_INDEXES: ClassVar[dict[str, str]] = {
+        "doc.dockey": "keyword",
+        "doc.year": "integer",
+        "doc.journal": "keyword",
+        "doc.other.client_source": "keyword",
+        "partition": "integer",
+    }
+    PARTITION_KEY: ClassVar[str] = "partition"
     _point_ids: set[str] | None = None
+    # Tombstones of deleted documents, excluded from searches until compaction
+    _deleted_dockeys: set[DocKey] | None = None
+    # Partitioning function whose labels are stored in the points' payload
+    _partitioning_fn: Callable[[Embeddable], int] | None = None
+    _partitions: set[int] | None = None
 
     def __del__(self):
         """Cleanup async client connection."""
@@ -312,6 +1562,13 @@ class QdrantVectorStore(VectorStore):
             and self.vector_name == other.vector_name
             and self.client.init_options == other.client.init_options
             and self._point_ids == other._point_ids
+            and self._deleted_dockeys == other._deleted_dockeys
+        )
+
+    def __contains__(self, item) -> bool:
+        return super().__contains__(item) and (
+            not self._deleted_dockeys
+            or cast("Text", item).doc.dockey not in self._deleted_dockeys
         )
 
     @model_validator(mode="after")
@@ -363,8 +1620,144 @@ class QdrantVectorStore(VectorStore):
 
         await self.client.delete_collection(collection_name=self.collection_name)
         self._point_ids = None
+        self._deleted_dockeys = None
+        self._partitioning_fn = None
+        self._partitions = None
+
+    def delete_documents(self, dockeys: Collection[DocKey]) -> None:
+        # Points are only removed from the collection upon compaction
+        self._deleted_dockeys = (self._deleted_dockeys or set()) | set(dockeys)
+
+    def _get_filter(
+        self, query_filter: "models.Filter | None" = None
+    ) -> "models.Filter | None":
+        """Combine an optional filter with the exclusion of deleted documents."""
+        if not self._deleted_dockeys:
+            return query_filter
+        tombstone_filter = models.Filter(
+            must_not=[
+                models.FieldCondition(
+                    key="doc.dockey",
+                    match=models.MatchAny(any=sorted(self._deleted_dockeys)),
+                )
+            ]
+        )
+        if query_filter is None:
+            return tombstone_filter
+        return models.Filter(must=[query_filter, tombstone_filter])
+
+    async def _create_payload_indexes(self) -> None:
+        with warnings.catch_warnings():
+            # The local (in-memory or on-disk) client warns the indexes have no effect
+            warnings.filterwarnings(
+                "ignore", message="Payload indexes have no effect in the local Qdrant"
+            )
+            await asyncio.gather(
+                *(
+                    self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field_name,
+                        field_schema=models.PayloadSchemaType(field_schema),
+                    )
+                    for field_name, field_schema in self.PAYLOAD_INDEXES.items()
+                )
+            )
+
+    async def _label_partitions(
+        self, partitioning_fn: Callable[[Embeddable], int], batch_size: int = 1000
+    ) -> None:
+        """Store the partitioning function's labels in the payload of every point."""
+        if same_partitioning(self._partitioning_fn, partitioning_fn):
+            return
+        partitions: set[int] = set()
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["text", "name", "doc"],
+                with_vectors=False,
+            )
+            ids_by_partition: dict[int, list[Any]] = {}
+            for record in records:
+                partition = partitioning_fn(Text(**cast("dict", record.payload)))
+                ids_by_partition.setdefault(partition, []).append(record.id)
+            await asyncio.gather(
+                *(
+                    self.client.set_payload(
+                        collection_name=self.collection_name,
+                        payload={self.PARTITION_KEY: partition},
+                        points=ids,
+                    )
+                    for partition, ids in ids_by_partition.items()
+                )
+            )
+            partitions.update(ids_by_partition)
+            if offset is None:
+                break
+        self._partitioning_fn = partitioning_fn
+        self._partitions = partitions
+
+    async def acompact(self, batch_size: int = 1000) -> None:
+        """Physically delete the points of deleted documents from the collection.
+
+        This runs before the next insert rather than in the background, as only
+        then could re-added texts of deleted documents get caught by the deletion.
+        """
+        if not self._deleted_dockeys:
+            return
+        if await self._collection_exists():
+            deleted_hashes: set[int] = set()
+            deleted_filter = models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="doc.dockey",
+                        match=models.MatchAny(any=sorted(self._deleted_dockeys)),
+                    )
+                ]
+            )
+            offset = None
+            while True:
+                records, offset = await self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=deleted_filter,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=["text"],
+                    with_vectors=False,
+                )
+                for record in records:
+                    deleted_hashes.add(hash(cast("dict", record.payload)["text"]))
+                    if self._point_ids is not None:
+                        self._point_ids.discard(uuid.UUID(str(record.id)).hex)
+                if offset is None:
+                    break
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(filter=deleted_filter),
+            )
+            if deleted_hashes:
+                # Identical texts of other documents still own their (content) hash
+                while True:
+                    records, offset = await self.client.scroll(
+                        collection_name=self.collection_name,
+                        limit=batch_size,
+                        offset=offset,
+                        with_payload=["text"],
+                        with_vectors=False,
+                    )
+                    deleted_hashes.difference_update(
+                        hash(cast("dict", record.payload)["text"]) for record in records
+                    )
+                    if offset is None or not deleted_hashes:
+                        break
+            self.texts_hashes.difference_update(deleted_hashes)
+        self._deleted_dockeys = None
 
     async def add_texts_and_embeddings(self, texts: Iterable[Embeddable]) -> None:
+        # Compact first, so re-added texts of deleted documents aren't deleted later
+        await self.acompact()
         await super().add_texts_and_embeddings(texts)
 
         texts_list = list(texts)
@@ -381,65 +1774,179 @@ class QdrantVectorStore(VectorStore):
                     {self.vector_name: params} if self.vector_name else params
                 ),
             )
-
-        ids, payloads, vectors = [], [], []
-        for text in texts_list:
-            ids.append(uuid.uuid5(uuid.NAMESPACE_URL, str(text.embedding)).hex)
-            payloads.append(text.model_dump(exclude={"embedding"}))
-            vectors.append(
-                {self.vector_name: text.embedding}
-                if self.vector_name
-                else text.embedding
+            await self._create_payload_indexes()
+
+        points = [
+            models.PointStruct(
+                id=self._point_id(text),
+                payload=self._get_payload(text),
+                vector=(
+                    {self.vector_name: text.embedding}
+                    if self.vector_name
+                    else text.embedding
+                ),
             )
-
-        await self.client.upsert(
-            collection_name=self.collection_name,
-            points=[
-                models.PointStruct(
-                    id=some_id,
-                    payload=some_payload,
-                    vector=some_vector,
+            for text in texts_list
+        ]
+        await gather_with_concurrency(
+            self.max_concurrent_upserts,
+            (
+                self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=points[i : i + self.upsert_batch_size],
                 )
-                for some_id, some_payload, some_vector in zip(
-                    ids, payloads, vectors, strict=True
+                for i in range(0, len(points), self.upsert_batch_size)
+            ),
+        )
+        self._point_ids = (self._point_ids or set()) | {str(p.id) for p in points}
+
+    def _get_payload(self, text: Embeddable) -> dict[str, Any]:
+        payload = text.model_dump(exclude={"embedding"})
+        if self._partitioning_fn is not None:
+            partition = self._partitioning_fn(text)
+            payload[self.PARTITION_KEY] = partition
+            self._partitions = (self._partitions or set()) | {partition}
+        return payload
+
+    @staticmethod
+    def _point_id(text: Embeddable) -> str:
+        """Get a point ID from the text's document, name, and content, as a UUID hex.
+
+        The name distinguishes identical chunks within a document (e.g. repeated
+        headers), which would otherwise collapse to one point.
+        """
+        t = cast("Text", text)
+        return hexdigest(f"{t.doc.dockey}:{t.name}:{t.text}")
+
+    def _points_to_texts(
+        self, points: Sequence[Any]
+    ) -> tuple[Sequence[Embeddable], list[float]]:
+        return (
+            [
+                Text(
+                    **p.payload,
+                    embedding=(
+                        p.vector[self.vector_name] if self.vector_name else p.vector
+                    ),
                 )
+                for p in points
             ],
+            [p.score for p in points],
         )
-        self._point_ids = set(ids)
 
     async def similarity_search(
         self, query: str, k: int, embedding_model: EmbeddingModel
     ) -> tuple[Sequence[Embeddable], list[float]]:
+        return await self.filtered_similarity_search(query, k, embedding_model)
+
+    async def filtered_similarity_search(
+        self,
+        query: str,
+        k: int,
+        embedding_model: EmbeddingModel,
+        query_filter: "models.Filter | None" = None,
+    ) -> tuple[Sequence[Embeddable], list[float]]:
+        """Perform similarity search over the points matching a Qdrant filter.
+
+        Args:
+            query: query string
+            k: Number of results to return
+            embedding_model: model used to embed the query
+            query_filter: filter applied server-side, e.g. on the indexed payload keys
+                `doc.year`, `doc.journal` or `doc.other.client_source`.
+
+        Returns:
+            Tuple of lists of Embeddables and scores of length k.
+        """
         if not await self._collection_exists():
             return ([], [])
 
-        embedding_model.set_mode(EmbeddingModes.QUERY)
-        np_query = np.array((await embedding_model.embed_documents([query]))[0])
-        embedding_model.set_mode(EmbeddingModes.DOCUMENT)
+        np_query = (await self._embed_queries([query], embedding_model))[0]
 
         points = (
             await self.client.query_points(
                 collection_name=self.collection_name,
                 query=np_query,
                 using=self.vector_name,
+                query_filter=self._get_filter(query_filter),
                 limit=k,
                 with_vectors=True,
                 with_payload=True,
             )
         ).points
+        return self._points_to_texts(points)
 
-        return (
-            [
-                Text(
-                    **p.payload,
-                    embedding=(
-                        p.vector[self.vector_name] if self.vector_name else p.vector
+    async def batch_similarity_search(
+        self, queries: Sequence[str], k: int, embedding_model: EmbeddingModel
+    ) -> list[tuple[Sequence[Embeddable], list[float]]]:
+        if not await self._collection_exists():
+            return [([], []) for _ in queries]
+
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(
+                    query=np_query.tolist(),
+                    using=self.vector_name,
+                    filter=self._get_filter(),
+                    limit=k,
+                    with_vector=True,
+                    with_payload=True,
+                )
+                for np_query in await self._embed_queries(queries, embedding_model)
+            ],
+        )
+        return [self._points_to_texts(response.points) for response in responses]
+
+    async def partitioned_similarity_search(
+        self,
+        query: str,
+        k: int,
+        embedding_model: EmbeddingModel,
+        partitioning_fn: Callable[[Embeddable], int],
+    ) -> tuple[Sequence[Embeddable], list[float]]:
+        if not await self._collection_exists():
+            return ([], [])
+
+        await self._label_partitions(partitioning_fn)
+        partitions = sorted(self._partitions or set())
+        np_query = (await self._embed_queries([query], embedding_model))[0]
+        # One filtered request per partition, run together in a single batch
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(
+                    query=np_query.tolist(),
+                    using=self.vector_name,
+                    filter=self._get_filter(
+                        models.Filter(
+                            must=[
+                                models.FieldCondition(
+                                    key=self.PARTITION_KEY,
+                                    match=models.MatchValue(value=partition),
+                                )
+                            ]
+                        )
                     ),
+                    limit=k,
+                    with_vector=True,
+                    with_payload=True,
                 )
-                for p in points
+                for partition in partitions
             ],
-            [p.score for p in points],
         )
+        points = [p for response in responses for p in response.points]
+        labels = np.array(
+            [
+                partition
+                for partition, response in zip(partitions, responses, strict=True)
+                for _ in response.points
+            ],
+            dtype=np.int64,
+        )
+        texts, scores = self._points_to_texts(points)
+        indices = partitioned_top_k_indices(np.array(scores), labels, k)
+        return [texts[i] for i in indices], [scores[i] for i in indices]
 
     @classmethod
     async def load_docs(
@@ -448,80 +1955,627 @@ class QdrantVectorStore(VectorStore):
         collection_name: str,
         vector_name: str | None = None,
         batch_size: int = 100,
-        max_concurrent_requests: int = 5,
+        max_concurrent_requests: int | None = None,
+        with_vectors: bool = True,
     ) -> "Docs":
+        """Build a `Docs` from an existing collection, streaming its points in pages.
+
+        Args:
+            client: client connected to the collection.
+            collection_name: name of the collection.
+            vector_name: optional name of the vector holding the texts' embeddings.
+            batch_size: number of points per page, bounding peak memory.
+            max_concurrent_requests: deprecated and ignored, pages are fetched with
+                a cursor, while the texts of the previous page get built.
+            with_vectors: set False to leave the embeddings server-side, searches
+                still return them, but the `Docs` texts won't have embeddings.
+        """
         from paperqa.docs import Docs  # Avoid circular imports
 
+        if max_concurrent_requests is not None:
+            warnings.warn(
+                "The 'max_concurrent_requests' argument is deprecated and ignored, as"
+                " pages are now fetched sequentially with a cursor.",
+                category=DeprecationWarning,
+                stacklevel=2,
+            )
+
         vectorstore = cls(
             client=client, collection_name=collection_name, vector_name=vector_name
         )
         docs = Docs(texts_index=vectorstore)
 
-        collection_info = await client.get_collection(collection_name)
-        total_points = collection_info.points_count or 0
+        async def fetch_page(
+            offset: "models.ExtendedPointId | None",
+        ) -> "tuple[list[Record], models.ExtendedPointId | None]":
+            return await client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=(
+                    ([vector_name] if vector_name else True) if with_vectors else False
+                ),
+            )
 
-        semaphore = asyncio.Semaphore(max_concurrent_requests)
-        all_points: list[Record] = []
+        points, next_page_offset = await fetch_page(None)
+        while True:
+            # Fetch the next page while this page's texts get built
+            next_page = (
+                asyncio.create_task(fetch_page(next_page_offset))
+                if next_page_offset is not None
+                else None
+            )
+            for point in points:
+                try:
+                    if point.payload is None:
+                        continue
+
+                    payload = point.payload
+                    doc_data = payload.get("doc", {})
+                    if not isinstance(doc_data, dict):
+                        continue
+
+                    if doc_data.get("dockey") not in docs.docs:
+                        docs.docs[doc_data["dockey"]] = Doc(
+                            docname=doc_data.get("docname", ""),
+                            citation=doc_data.get("citation", ""),
+                            dockey=doc_data["dockey"],
+                        )
+                        docs.docnames.add(doc_data.get("docname", ""))
+
+                    if with_vectors and point.vector is None:
+                        continue
+
+                    vector_value = (
+                        point.vector.get(vector_name)
+                        if vector_name and isinstance(point.vector, dict)
+                        else point.vector
+                    )
 
-        async def fetch_batch_with_semaphore(offset: int) -> None:
-            async with semaphore:
-                points = await client.scroll(
-                    collection_name=collection_name,
-                    limit=batch_size,
-                    offset=offset,
-                    with_payload=True,
-                    with_vectors=True,
+                    text = Text(
+                        text=payload.get("text", ""),
+                        name=payload.get("name", ""),
+                        doc=docs.docs[doc_data["dockey"]],
+                        embedding=vector_value,
+                    )
+                    docs.texts.append(text)
+                    # Already in the collection, so Docs mustn't re-add it
+                    vectorstore.texts_hashes.add(hash(text))
+
+                except KeyError as e:
+                    logger.warning(
+                        f"Skipping invalid point due to missing field: {e!s}"
+                    )
+                    continue
+            if next_page is None:
+                break
+            points, next_page_offset = await next_page
+
+        return docs
+
+
+class MmapVectorStore(VectorStore):
+    """Vector store keeping its embeddings and texts on disk.
+
+    Embeddings are L2-normalized and appended as raw float32 rows to a file that is
+    memory-mapped for search, so the corpus doesn't need to fit in RAM and processes
+    opening the same directory share one copy in the OS page cache. Texts are stored
+    in a JSON lines sidecar with a byte offset index, and only materialized
+    (with their normalized embedding) when returned from a search.
+
+    With int8 quantization, search scores a file of int8 codes (a quarter of the
+    size, so it stays resident in the page cache), then re-ranks the best
+    candidates against the full-precision rows.
+    """
+
+    EMBEDDINGS_FILENAME: ClassVar[str] = "embeddings.f32"
+    TEXTS_FILENAME: ClassVar[str] = "texts.jsonl"
+    OFFSETS_FILENAME: ClassVar[str] = "offsets.i64"
+    HASHES_FILENAME: ClassVar[str] = "hashes.u64"
+    DOCS_FILENAME: ClassVar[str] = "docs.jsonl"
+    METADATA_FILENAME: ClassVar[str] = "metadata.json"
+    CODES_FILENAME: ClassVar[str] = "codes.i8"
+    SCALES_FILENAME: ClassVar[str] = "scales.f32"
+    SCORING_CHUNK_SIZE: ClassVar[int] = 65_536
+
+    path: Path = Field(
+        description="Directory holding the store's files, created if it doesn't exist."
+    )
+    quantization: Literal["int8"] | None = Field(
+        default=None,
+        description=(
+            "Optional quantization of the embeddings used for scoring, 'int8' stores"
+            " one byte per dimension. Codes are built from the full-precision"
+            " embeddings on the first search needing them."
+        ),
+    )
+    rerank_candidates: int = Field(
+        default=256,
+        ge=1,
+        description=(
+            "With quantization, the number of best-scoring candidates per query"
+            " re-ranked against the full-precision embeddings."
+        ),
+    )
+    # These are lazily (re)opened, and dropped when pickling
+    _dim: int | None = None
+    _embeddings: np.ndarray | None = None
+    _codes: np.ndarray | None = None
+    _scales: np.ndarray | None = None
+    _offsets: np.ndarray | None = None
+    _content_hashes: set[int] | None = None
+    _docs: dict[DocKey, Doc | DocDetails] | None = None
+    _partitions: np.ndarray | None = None
+    _partitioning_fn: Callable[[Embeddable], int] | None = None
+
+    def __getstate__(self) -> dict[Any, Any]:
+        state = super().__getstate__()
+        # Don't copy the memory-mapped arrays into the pickle, they get reopened
+        state["__pydantic_private__"] = {
+            name: private.default
+            for name, private in self.__private_attributes__.items()
+        }
+        return state
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, type(self)):
+            return NotImplemented
+        return self.path == other.path and self.mmr_lambda == other.mmr_lambda
+
+    def __contains__(self, item) -> bool:
+        return self._content_hash(item) in self._get_content_hashes()
+
+    def __len__(self) -> int:
+        return len(self._get_offsets())
+
+    @staticmethod
+    def _content_hash(item: Embeddable) -> int:
+        """Hash that is stable across processes, unlike `hash` of a `str`."""
+        return int(hexdigest(cast("Text", item).text)[:16], 16)
+
+    def _reset_handles(self) -> None:
+        self._dim = None
+        self._embeddings = None
+        self._codes = None
+        self._scales = None
+        self._offsets = None
+        self._content_hashes = None
+        self._docs = None
+        self._partitions = None
+        self._partitioning_fn = None
+
+    def _get_dim(self) -> int | None:
+        if self._dim is None:
+            metadata_path = self.path / self.METADATA_FILENAME
+            if metadata_path.exists():
+                self._dim = json.loads(metadata_path.read_text())["dim"]
+        return self._dim
+
+    def _get_offsets(self) -> np.ndarray:
+        if self._offsets is None:
+            offsets_path = self.path / self.OFFSETS_FILENAME
+            self._offsets = (
+                np.memmap(offsets_path, dtype=np.int64, mode="r")
+                if offsets_path.exists() and offsets_path.stat().st_size
+                else np.empty(0, dtype=np.int64)
+            )
+        return self._offsets
+
+    def _get_embeddings(self) -> np.ndarray:
+        if self._embeddings is None:
+            dim, n_rows = self._get_dim(), len(self._get_offsets())
+            self._embeddings = (
+                np.memmap(
+                    self.path / self.EMBEDDINGS_FILENAME,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(n_rows, dim),
+                )
+                if dim is not None and n_rows
+                else np.empty((0, dim or 0), dtype=np.float32)
+            )
+        return self._embeddings
+
+    def _get_codes(self) -> tuple[np.ndarray, np.ndarray]:
+        """Get the int8 codes and scales of every row, quantizing rows lacking them."""
+        if self._codes is None or self._scales is None:
+            dim, n_rows = self._get_dim() or 0, len(self)
+            codes_path = self.path / self.CODES_FILENAME
+            scales_path = self.path / self.SCALES_FILENAME
+            # Trim any partially written rows, then quantize the missing ones
+            n_quantized = min(
+                codes_path.stat().st_size // dim if codes_path.exists() else 0,
+                scales_path.stat().st_size // 4 if scales_path.exists() else 0,
+                n_rows,
+            )
+            if n_quantized < n_rows:
+                codes, scales = quantize_int8(self._get_embeddings()[n_quantized:])
+                for file_path, data in ((codes_path, codes), (scales_path, scales)):
+                    with file_path.open("ab") as f:
+                        f.truncate(n_quantized * data.nbytes // len(data))
+                        f.write(data.tobytes())
+            if n_rows:
+                self._codes = np.memmap(
+                    codes_path, dtype=np.int8, mode="r", shape=(n_rows, dim)
                 )
-                all_points.extend(points[0])
+                self._scales = np.memmap(
+                    scales_path, dtype=np.float32, mode="r", shape=(n_rows,)
+                )
+            else:
+                self._codes = np.empty((0, dim), dtype=np.int8)
+                self._scales = np.empty(0, dtype=np.float32)
+        return self._codes, self._scales
+
+    def _get_content_hashes(self) -> set[int]:
+        if self._content_hashes is None:
+            hashes_path = self.path / self.HASHES_FILENAME
+            self._content_hashes = (
+                set(np.fromfile(hashes_path, dtype=np.uint64).tolist())
+                if hashes_path.exists()
+                else set()
+            )
+        return self._content_hashes
+
+    def _get_docs(self) -> dict[DocKey, Doc | DocDetails]:
+        if self._docs is None:
+            self._docs = {}
+            docs_path = self.path / self.DOCS_FILENAME
+            if docs_path.exists():
+                with docs_path.open(encoding="utf-8") as f:
+                    for line in f:
+                        row = json.loads(line)
+                        self._docs[row["dockey"]] = _DOC_ADAPTER.validate_python(
+                            row["doc"]
+                        )
+        return self._docs
+
+    def get_text(self, index: int) -> Text:
+        """Materialize the text at the input row index, with its normalized embedding."""
+        with (self.path / self.TEXTS_FILENAME).open("rb") as f:
+            f.seek(int(self._get_offsets()[index]))
+            row = json.loads(f.readline())
+        return Text(
+            text=row["text"],
+            name=row["name"],
+            doc=self._get_docs()[row["dockey"]],
+            embedding=self._get_embeddings()[index].tolist(),
+        )
 
-        tasks = [
-            fetch_batch_with_semaphore(offset)
-            for offset in range(0, total_points, batch_size)
-        ]
-        await asyncio.gather(*tasks)
+    def iter_texts(self) -> Iterator[Text]:
+        """Stream over all texts in insertion order, without their embeddings."""
+        docs = self._get_docs()
+        with (self.path / self.TEXTS_FILENAME).open("rb") as f:
+            for line, _ in zip(f, range(len(self)), strict=False):
+                row = json.loads(line)
+                yield Text(text=row["text"], name=row["name"], doc=docs[row["dockey"]])
 
-        for point in all_points:
-            try:
-                if point.payload is None:
-                    continue
+    async def add_texts_and_embeddings(self, texts: Iterable[Embeddable]) -> None:
+        texts = [t for t in texts if t not in self]
+        if not texts:
+            return
+        embeddings = normalize_rows(np.array([t.embedding for t in texts]))
+        dim = self._get_dim()
+        if dim is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            (self.path / self.METADATA_FILENAME).write_text(
+                json.dumps({"dim": embeddings.shape[1]})
+            )
+        elif embeddings.shape[1] != dim:
+            raise ValueError(
+                f"Embedding dimension {embeddings.shape[1]} does not match the store's"
+                f" dimension {dim}."
+            )
 
-                payload = point.payload
-                doc_data = payload.get("doc", {})
-                if not isinstance(doc_data, dict):
-                    continue
+        docs = self._get_docs()
+        new_docs: dict[DocKey, Doc | DocDetails] = {}
+        text_lines: list[bytes] = []
+        for t in cast("list[Text]", texts):
+            if t.doc.dockey not in docs:
+                new_docs[t.doc.dockey] = t.doc
+            text_lines.append(
+                json.dumps(
+                    {"text": t.text, "name": t.name, "dockey": t.doc.dockey}
+                ).encode("utf-8")
+                + b"\n"
+            )
+        texts_path = self.path / self.TEXTS_FILENAME
+        start = texts_path.stat().st_size if texts_path.exists() else 0
+        offsets = start + np.cumsum([0] + [len(line) for line in text_lines[:-1]])
+        hashes = np.array([self._content_hash(t) for t in texts], dtype=np.uint64)
+
+        # Append the sidecars before the embeddings, the offsets are the row count
+        with (self.path / self.DOCS_FILENAME).open("a", encoding="utf-8") as f:
+            f.writelines(
+                json.dumps({"dockey": dockey, "doc": doc.model_dump(mode="json")})
+                + "\n"
+                for dockey, doc in new_docs.items()
+            )
+        with texts_path.open("ab") as f:
+            f.writelines(text_lines)
+        with (self.path / self.EMBEDDINGS_FILENAME).open("ab") as f:
+            f.write(embeddings.tobytes())
+        with (self.path / self.HASHES_FILENAME).open("ab") as f:
+            f.write(hashes.tobytes())
+        with (self.path / self.OFFSETS_FILENAME).open("ab") as f:
+            f.write(offsets.astype(np.int64).tobytes())
+
+        # Remap to pick up the appended rows
+        docs.update(new_docs)
+        self._get_content_hashes().update(hashes.tolist())
+        self._dim = embeddings.shape[1]
+        self._embeddings = self._codes = self._scales = self._offsets = None
 
-                if doc_data.get("dockey") not in docs.docs:
-                    docs.docs[doc_data["dockey"]] = Doc(
-                        docname=doc_data.get("docname", ""),
-                        citation=doc_data.get("citation", ""),
-                        dockey=doc_data["dockey"],
-                    )
-                    docs.docnames.add(doc_data.get("docname", ""))
+    def clear(self) -> None:
+        super().clear()
+        for filename in (
+            self.EMBEDDINGS_FILENAME,
+            self.TEXTS_FILENAME,
+            self.OFFSETS_FILENAME,
+            self.HASHES_FILENAME,
+            self.DOCS_FILENAME,
+            self.METADATA_FILENAME,
+            self.CODES_FILENAME,
+            self.SCALES_FILENAME,
+        ):
+            (self.path / filename).unlink(missing_ok=True)
+        self._reset_handles()
+
+    def _score(self, np_queries: np.ndarray) -> np.ndarray:
+        """Score a (queries, dim) array against every row, giving (queries, rows).
+
+        With quantization, these scores are approximated from the int8 codes.
+        """
+        np_queries = normalize_rows(np_queries)
+        if self.quantization is None:
+            similarity_scores = np_queries @ self._get_embeddings().T
+        else:
+            codes, scales = self._get_codes()
+            # Chunked, to bound the memory of upcasting the codes
+            similarity_scores = np.concatenate(
+                [
+                    (codes[i : i + self.SCORING_CHUNK_SIZE] @ np_queries.T).T
+                    * scales[i : i + self.SCORING_CHUNK_SIZE]
+                    for i in range(0, len(codes), self.SCORING_CHUNK_SIZE)
+                ],
+                axis=1,
+            )
+        return np.nan_to_num(similarity_scores, nan=-np.inf)
 
-                if point.vector is None:
-                    continue
+    def _score_candidates(
+        self, np_queries: np.ndarray, k: int, partitions: np.ndarray | None = None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Get each query's candidate row indices and their full-precision scores.
 
-                vector_value = (
-                    point.vector.get(vector_name)
-                    if vector_name and isinstance(point.vector, dict)
-                    else point.vector
+        Without quantization every row is a candidate. Otherwise the candidates are
+        the best rerank_candidates rows by approximate score (within each partition,
+        if partitions are given), re-scored with their full-precision embeddings.
+        """
+        similarity_scores = self._score(np_queries)
+        if self.quantization is None:
+            all_rows = np.arange(len(self))
+            return [(all_rows, scores) for scores in similarity_scores]
+
+        n_candidates = min(max(k, self.rerank_candidates), len(self))
+        embeddings = self._get_embeddings()
+        results: list[tuple[np.ndarray, np.ndarray]] = []
+        for np_query, approximate_scores in zip(
+            normalize_rows(np_queries), similarity_scores, strict=True
+        ):
+            rows = np.sort(
+                top_k_indices(approximate_scores, n_candidates)
+                if partitions is None
+                else partitioned_top_k_indices(
+                    approximate_scores, partitions, n_candidates
                 )
+            )
+            scores = np.nan_to_num(embeddings[rows] @ np_query, nan=-np.inf)
+            results.append((rows, scores))
+        return results
+
+    def _get_partitions(
+        self, partitioning_fn: Callable[[Embeddable], int]
+    ) -> np.ndarray:
+        """Get the partition label of every text, streaming over the texts once."""
+        if (
+            self._partitions is None
+            or not same_partitioning(self._partitioning_fn, partitioning_fn)
+            or len(self._partitions) != len(self)
+        ):
+            self._partitions = np.fromiter(
+                (partitioning_fn(t) for t in self.iter_texts()),
+                dtype=np.int64,
+                count=len(self),
+            )
+            self._partitioning_fn = partitioning_fn
+        return self._partitions
+
+    async def partitioned_similarity_search(
+        self,
+        query: str,
+        k: int,
+        embedding_model: EmbeddingModel,
+        partitioning_fn: Callable[[Embeddable], int],
+    ) -> tuple[Sequence[Embeddable], list[float]]:
+        k = min(k, len(self))
+        if k == 0:
+            return [], []
+
+        partitions = self._get_partitions(partitioning_fn)
+        ((rows, similarity_scores),) = self._score_candidates(
+            await self._embed_queries([query], embedding_model), k, partitions
+        )
+
+        top_indices = partitioned_top_k_indices(similarity_scores, partitions[rows], k)
+        return (
+            [self.get_text(i) for i in rows[top_indices]],
+            similarity_scores[top_indices].tolist(),
+        )
 
-                text = Text(
-                    text=payload.get("text", ""),
-                    name=payload.get("name", ""),
-                    doc=docs.docs[doc_data["dockey"]],
-                    embedding=vector_value,
+    async def similarity_search(
+        self, query: str, k: int, embedding_model: EmbeddingModel
+    ) -> tuple[Sequence[Embeddable], list[float]]:
+        return (await self.batch_similarity_search([query], k, embedding_model))[0]
+
+    async def batch_similarity_search(
+        self, queries: Sequence[str], k: int, embedding_model: EmbeddingModel
+    ) -> list[tuple[Sequence[Embeddable], list[float]]]:
+        k = min(k, len(self))
+        if k == 0 or not queries:
+            return [([], []) for _ in queries]
+
+        results: list[tuple[Sequence[Embeddable], list[float]]] = []
+        for rows, similarity_scores in self._score_candidates(
+            await self._embed_queries(queries, embedding_model), k
+        ):
+            top_indices = top_k_indices(similarity_scores, k)
+            results.append(
+                (
+                    [self.get_text(i) for i in rows[top_indices]],
+                    similarity_scores[top_indices].tolist(),
                 )
-                docs.texts.append(text)
+            )
+        return results
 
-            except KeyError as e:
-                logger.warning(f"Skipping invalid point due to missing field: {e!s}")
-                continue
+    @classmethod
+    def load_docs(cls, path: str | os.PathLike) -> "Docs":
+        """Open a `Docs` backed by the store at the input directory.
 
+        Only the per-document metadata is loaded, the texts stay on disk.
+        """
+        from paperqa.docs import Docs  # Avoid circular imports
+
+        vectorstore = cls(path=Path(path))
+        docs = Docs(texts_index=vectorstore)
+        for doc in vectorstore._get_docs().values():
+            docs.docs[doc.dockey] = doc
+            docs.docnames.add(doc.docname)
         return docs
 
 
+class BM25Index(BaseModel):
+    """Okapi BM25 keyword index over texts, supporting incremental insertion.
+
+    Complements dense retrieval on exact terms (e.g. gene names, trial IDs, or drug
+    codes), which embeddings tend to blur. Deleted texts are tombstoned, and the
+    index is rebuilt without them once they exceed compaction_threshold.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    k1: float = Field(default=1.2, ge=0.0, description="Term frequency saturation.")
+    b: float = Field(
+        default=0.75, ge=0.0, le=1.0, description="Document length normalization."
+    )
+    compaction_threshold: float = Field(default=0.25, ge=0.0, le=1.0)
+
+    TOKEN_PATTERN: ClassVar[re.Pattern] = re.compile(r"\w+(?:[-./]\w+)*")
+
+    _texts: list[Embeddable] = []
+    _texts_hashes: set[int] = set()
+    # Term to the rows containing it, and the term's frequency in those rows
+    _postings: dict[str, tuple[list[int], list[int]]] = {}
+    _lengths: list[int] = []
+    _deleted: set[int] = set()
+
+    def __contains__(self, item) -> bool:
+        return hash(item) in self._texts_hashes
+
+    def __len__(self) -> int:
+        return len(self._texts) - len(self._deleted)
+
+    @classmethod
+    def tokenize(cls, text: str) -> list[str]:
+        """Lowercase word tokens, also keeping compound tokens (e.g. "abt-199") whole."""
+        tokens: list[str] = []
+        for token in cls.TOKEN_PATTERN.findall(text.lower()):
+            tokens.append(token)
+            if not token.isalnum():
+                tokens.extend(re.findall(r"[^\W_]+", token))
+        return tokens
+
+    def add_texts(self, texts: Iterable[Embeddable]) -> None:
+        for t in texts:
+            row = len(self._texts)
+            term_counts = Counter(self.tokenize(cast("Text", t).text))
+            for term, count in term_counts.items():
+                rows, counts = self._postings.setdefault(term, ([], []))
+                rows.append(row)
+                counts.append(count)
+            self._texts.append(t)
+            self._texts_hashes.add(hash(t))
+            self._lengths.append(sum(term_counts.values()))
+
+    def clear(self) -> None:
+        self._texts = []
+        self._texts_hashes = set()
+        self._postings = {}
+        self._lengths = []
+        self._deleted = set()
+
+    def delete_documents(self, dockeys: Collection[DocKey]) -> None:
+        """Delete the texts of the input documents, excluding them from searches."""
+        for row, t in enumerate(self._texts):
+            if row not in self._deleted and cast("Text", t).doc.dockey in dockeys:
+                self._deleted.add(row)
+                self._texts_hashes.discard(hash(t))
+        if len(self._deleted) > self.compaction_threshold * len(self._texts):
+            live_texts = [
+                t for row, t in enumerate(self._texts) if row not in self._deleted
+            ]
+            self.clear()
+            self.add_texts(live_texts)
+
+    def search(self, query: str, k: int) -> tuple[list[Embeddable], list[float]]:
+        """Get up to k texts matching any query term, sorted by descending score."""
+        if not self._texts:
+            return [], []
+        lengths = np.array(self._lengths, dtype=np.float64)
+        n_texts = len(self._texts)
+        average_length = max(lengths.mean(), 1.0)
+        scores = np.zeros(n_texts)
+        for term in set(self.tokenize(query)):
+            if term not in self._postings:
+                continue
+            rows, counts = (np.array(x) for x in self._postings[term])
+            idf = np.log(1 + (n_texts - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += (
+                idf
+                * counts
+                * (self.k1 + 1)
+                / (
+                    counts
+                    + self.k1 * (1 - self.b + self.b * lengths[rows] / average_length)
+                )
+            )
+        if self._deleted:
+            scores[list(self._deleted)] = 0.0
+        matched = np.flatnonzero(scores > 0)
+        top_indices = matched[top_k_indices(scores[matched], k)]
+        return [self._texts[i] for i in top_indices], scores[top_indices].tolist()
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[Embeddable]], k: int = 60
+) -> list[Embeddable]:
+    """Fuse rankings of texts, scoring each text by the sum of 1 / (k + its rank).
+
+    Texts are identified by name and content, so rankings from stores returning
+    copies of the same text (e.g. Qdrant) are still fused, the first copy is kept.
+    """
+    fused_scores: dict[tuple[str, str], float] = {}
+    first_seen: dict[tuple[str, str], Embeddable] = {}
+    for ranking in rankings:
+        for rank, t in enumerate(ranking, start=1):
+            key = (cast("Text", t).name, cast("Text", t).text)
+            fused_scores[key] = fused_scores.get(key, 0.0) + 1 / (k + rank)
+            first_seen.setdefault(key, t)
+    return [
+        first_seen[key]
+        for key in sorted(fused_scores, key=fused_scores.__getitem__, reverse=True)
+    ]
+
+
 def embedding_model_factory(embedding: str, **kwargs) -> EmbeddingModel:
     """
     Factory function to create an appropriate EmbeddingModel based on the embedding string.
@@ -582,3 +2636,31 @@ def embedding_model_factory(embedding: str, **kwargs) -> EmbeddingModel:
 
     # Default to LiteLLMEmbeddingModel if no special prefix is found
     return LiteLLMEmbeddingModel(name=embedding, config=kwargs)
+
+
+def vector_store_factory(texts_index: str, **kwargs) -> VectorStore:
+    """
+    Factory function to create a VectorStore based on the texts index string.
+
+    Supports:
+    - "numpy": exact in-memory search with NumpyVectorStore (default)
+    - "ivf": approximate in-memory search with IVFVectorStore
+    - "mmap": exact search over memory-mapped files with MmapVectorStore
+    - "qdrant": QdrantVectorStore, which requires qdrant-client
+
+    Args:
+        texts_index: The vector store identifier.
+        **kwargs: Additional keyword arguments for the vector store.
+    """
+    stores: dict[str, type[VectorStore]] = {
+        "numpy": NumpyVectorStore,
+        "ivf": IVFVectorStore,
+        "mmap": MmapVectorStore,
+        "qdrant": QdrantVectorStore,
+    }
+    try:
+        return stores[texts_index.strip().lower()](**kwargs)
+    except KeyError:
+        raise ValueError(
+            f"Unknown texts index {texts_index!r}, must be one of {sorted(stores)}."
+        ) from None
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import logging
+import multiprocessing
 import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cache
+from itertools import islice
 from math import ceil
 from pathlib import Path
 from typing import Literal, cast, overload
@@ -14,6 +22,7 @@ from html2text import html2text
 from paperqa.types import (
     ChunkMetadata,
     Doc,
+    DocKey,
     ParsedMetadata,
     ParsedText,
     Text,
@@ -21,16 +30,27 @@ from paperqa.types import (
 from paperqa.utils import ImpossibleParsingError
 from paperqa.version import __version__ as pqa_version
 
+logger = logging.getLogger(__name__)
+
 
 def parse_pdf_to_pages(
-    path: str | os.PathLike, page_size_limit: int | None = None
+    path: str | os.PathLike,
+    page_size_limit: int | None = None,
+    page_range: tuple[int, int] | None = None,
 ) -> ParsedText:
+    """Parse a PDF into a dict of 1-indexed page numbers to page text.
 
+    Args:
+        path: path to the PDF.
+        page_size_limit: optional limit on the number of characters per page.
+        page_range: optional 0-indexed page range [start, stop) to parse, for parsing
+            parts of one PDF in parallel. Default is all pages.
+    """
     with pymupdf.open(path) as file:
         pages: dict[str, str] = {}
         total_length = 0
 
-        for i in range(file.page_count):
+        for i in range(*(page_range or (0, file.page_count))):
             try:
                 page = file.load_page(i)
             except pymupdf.mupdf.FzErrorFormat as exc:
@@ -49,21 +69,251 @@ def parse_pdf_to_pages(
             pages[str(i + 1)] = text
             total_length += len(text)
 
+        document_metadata = {k: v for k, v in (file.metadata or {}).items() if v}
+        if xmp := file.get_xml_metadata():
+            document_metadata["xmp"] = xmp
+
     metadata = ParsedMetadata(
         parsing_libraries=[f"pymupdf ({pymupdf.__version__})"],
         paperqa_version=pqa_version,
         total_parsed_text_length=total_length,
         parse_type="pdf",
+        document_metadata=document_metadata,
     )
     return ParsedText(content=pages, metadata=metadata)
 
 
+def get_pdf_page_count(path: str | os.PathLike) -> int:
+    with pymupdf.open(path) as file:
+        return file.page_count
+
+
+def merge_parsed_pdf_pages(parsed_texts: list[ParsedText]) -> ParsedText:
+    """Merge PDF page ranges, parsed in order, back into one ParsedText."""
+    pages: dict[str, str] = {}
+    for parsed_text in parsed_texts:
+        pages.update(cast("dict[str, str]", parsed_text.content))
+    metadata = parsed_texts[0].metadata.model_copy(
+        update={
+            "total_parsed_text_length": sum(
+                p.metadata.total_parsed_text_length for p in parsed_texts
+            )
+        }
+    )
+    return ParsedText(content=pages, metadata=metadata)
+
+
+class _PDFParsingWorker:
+    """A worker process in its own executor, so it can be killed on its own.
+
+    Killing a worker of a shared ProcessPoolExecutor breaks the whole pool,
+    failing every other parse in flight.
+    """
+
+    def __init__(self) -> None:
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            # Spawn to not fork the event loop's threads and locks
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.pid: int | None = None
+        self.n_tasks = 0
+
+    async def start(self) -> None:
+        """Start the process, getting its ID so it can be killed mid-parse."""
+        self.pid = await asyncio.wrap_future(self.executor.submit(os.getpid))
+
+    def kill(self) -> None:
+        # Killing is the only way to stop a worker stuck mid-parse
+        if self.pid is not None:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(self.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PDFParsingPool:
+    """Parse PDFs in worker processes, so parsing isn't serialized on the GIL.
+
+    Only the path is sent to a worker, and only the ParsedText is sent back. Workers
+    are replaced after parsing max_tasks_per_child PDFs, and a worker exceeding the
+    timeout is killed and replaced, so a pathological PDF can't hang or bloat a
+    worker forever. Tasks only get submitted to idle workers, so the timeout counts
+    parsing time, not time spent queued behind other PDFs. If pages_per_task is set,
+    PDFs with more pages are split into page ranges parsed in parallel, each worker
+    opening the PDF independently.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        timeout: float | None = None,
+        max_tasks_per_child: int | None = None,
+        pages_per_task: int | None = None,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.pages_per_task = pages_per_task
+        self._workers: set[_PDFParsingWorker] = set()
+        self._idle_workers: list[_PDFParsingWorker] = []
+        # Caps tasks in flight at max_workers, bound to the event loop using it
+        self._slots: asyncio.Semaphore | None = None
+        self._slots_loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # The pool is shared across Docs, which may be used from other event loops
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _acquire_worker(self) -> _PDFParsingWorker:
+        if self._idle_workers:
+            return self._idle_workers.pop()
+        worker = _PDFParsingWorker()
+        self._workers.add(worker)
+        try:
+            await worker.start()
+        except BaseException:
+            self._kill_worker(worker)
+            raise
+        return worker
+
+    def _release_worker(self, worker: _PDFParsingWorker) -> None:
+        worker.n_tasks += 1
+        if (
+            self.max_tasks_per_child is not None
+            and worker.n_tasks >= self.max_tasks_per_child
+        ):
+            # Retire the worker, to free memory leaked by the PDF parser
+            self._workers.discard(worker)
+            worker.executor.shutdown(wait=False)
+        else:
+            self._idle_workers.append(worker)
+
+    def _kill_worker(self, worker: _PDFParsingWorker) -> None:
+        self._workers.discard(worker)
+        worker.kill()
+
+    async def _run_in_worker(
+        self,
+        path: str | os.PathLike,
+        page_size_limit: int | None,
+        page_range: tuple[int, int] | None,
+    ) -> ParsedText:
+        """Parse in an idle worker, killing only that worker upon timeout."""
+        worker = await self._acquire_worker()
+        try:
+            parsed_text = await asyncio.wait_for(
+                asyncio.wrap_future(
+                    worker.executor.submit(
+                        parse_pdf_to_pages, path, page_size_limit, page_range
+                    )
+                ),
+                timeout=self.timeout,
+            )
+        except TimeoutError as exc:
+            self._kill_worker(worker)
+            raise ImpossibleParsingError(
+                f"Parsing the PDF at path {path} exceeded the {self.timeout} second"
+                " timeout."
+            ) from exc
+        except BrokenProcessPool:
+            self._kill_worker(worker)  # Already dead, this cleans up its executor
+            raise
+        except Exception:
+            # Parsing errors (e.g. a page over the size limit) leave the worker usable
+            self._release_worker(worker)
+            raise
+        except BaseException:
+            # Cancelled while the worker may still be parsing
+            self._kill_worker(worker)
+            raise
+        self._release_worker(worker)
+        return parsed_text
+
+    async def _submit(
+        self,
+        path: str | os.PathLike,
+        page_size_limit: int | None,
+        page_range: tuple[int, int] | None,
+    ) -> ParsedText:
+        async with self._get_slots():
+            try:
+                return await self._run_in_worker(path, page_size_limit, page_range)
+            except BrokenProcessPool:
+                # Workers are independent, so only this PDF (or running out of
+                # memory) could have crashed the worker
+                logger.warning(
+                    f"Retrying parsing the PDF at path {path} in a new worker."
+                )
+            try:
+                return await self._run_in_worker(path, page_size_limit, page_range)
+            except BrokenProcessPool as exc:
+                raise ImpossibleParsingError(
+                    f"Parsing the PDF at path {path} crashed its worker process."
+                ) from exc
+
+    async def parse(
+        self, path: str | os.PathLike, page_size_limit: int | None = None
+    ) -> ParsedText:
+        """Parse the PDF at the path in worker processes.
+
+        Parsing (of any page range) that fails, times out, or crashes a worker twice
+        surfaces as an ImpossibleParsingError.
+        """
+        pages_per_task = self.pages_per_task or 0
+        page_count = 0
+        if pages_per_task:
+            page_count = await asyncio.to_thread(get_pdf_page_count, path)
+        if page_count <= pages_per_task:
+            return await self._submit(path, page_size_limit, None)
+        try:
+            # Upon the first error, the other page ranges get cancelled,
+            # killing their workers if they're mid-parse
+            async with asyncio.TaskGroup() as tg:
+                tasks = [
+                    tg.create_task(
+                        self._submit(
+                            path,
+                            page_size_limit,
+                            (start, min(start + pages_per_task, page_count)),
+                        )
+                    )
+                    for start in range(0, page_count, pages_per_task)
+                ]
+        except ExceptionGroup as exc_group:
+            raise exc_group.exceptions[0] from exc_group
+        return merge_parsed_pdf_pages([task.result() for task in tasks])
+
+    def shutdown(self) -> None:
+        for worker in self._workers:
+            worker.executor.shutdown(wait=True)
+        self._workers.clear()
+        self._idle_workers.clear()
+
+
+@cache
+def get_pdf_parsing_pool(
+    max_workers: int | None = None,
+    timeout: float | None = None,
+    max_tasks_per_child: int | None = None,
+    pages_per_task: int | None = None,
+) -> PDFParsingPool:
+    """Get a process pool shared across Docs with the same configuration."""
+    return PDFParsingPool(
+        max_workers=max_workers,
+        timeout=timeout,
+        max_tasks_per_child=max_tasks_per_child,
+        pages_per_task=pages_per_task,
+    )
+
+
 def chunk_pdf(
     parsed_text: ParsedText, doc: Doc, chunk_chars: int, overlap: int
 ) -> list[Text]:
-    pages: list[str] = []
     texts: list[Text] = []
-    split: str = ""
 
     if not isinstance(parsed_text.content, dict):
         raise NotImplementedError(
@@ -76,27 +326,35 @@ def chunk_pdf(
             f" {doc.dockey}, either empty or corrupted."
         )
 
+    # Chunk by offsets into one joined string, instead of re-slicing a growing
+    # buffer, which copies the buffer per chunk and so is quadratic in page length
+    content = "".join(parsed_text.content.values())
+    start = end = 0  # Text not yet chunked is content[start:end]
+    first_page = next(iter(parsed_text.content))
     for page_num, page_text in parsed_text.content.items():
-        split += page_text
-        pages.append(page_num)
-        # split could be so long it needs to be split
+        end += len(page_text)
+        # the remaining text could be so long it needs to be split
         # into multiple chunks. Or it could be so short
         # that it needs to be combined with the next chunk.
-        while len(split) > chunk_chars:
+        while end - start > chunk_chars:
             # pretty formatting of pages (e.g. 1-3, 4, 5-7)
-            pg = "-".join([pages[0], pages[-1]])
             texts.append(
                 Text(
-                    text=split[:chunk_chars], name=f"{doc.docname} pages {pg}", doc=doc
+                    text=content[start : start + chunk_chars],
+                    name=f"{doc.docname} pages {first_page}-{page_num}",
+                    doc=doc,
                 )
             )
-            split = split[chunk_chars - overlap :]
-            pages = [page_num]
+            start += chunk_chars - overlap
+            first_page = page_num
 
-    if len(split) > overlap or not texts:
-        pg = "-".join([pages[0], pages[-1]])
+    if end - start > overlap or not texts:
         texts.append(
-            Text(text=split[:chunk_chars], name=f"{doc.docname} pages {pg}", doc=doc)
+            Text(
+                text=content[start : start + chunk_chars],
+                name=f"{doc.docname} pages {first_page}-{page_num}",
+                doc=doc,
+            )
         )
     return texts
 
@@ -220,7 +478,6 @@ def chunk_code_text(
     parsed_text: ParsedText, doc: Doc, chunk_chars: int, overlap: int
 ) -> list[Text]:
     """Parse a document into chunks, based on line numbers (for code)."""
-    split = ""
     texts: list[Text] = []
     last_line = 0
 
@@ -229,22 +486,25 @@ def chunk_code_text(
             f"ParsedText.content must be a `list`, not {type(parsed_text.content)}."
         )
 
+    # Like chunk_pdf, chunk by offsets into one joined string
+    content = "".join(parsed_text.content)
+    start = end = 0  # Text not yet chunked is content[start:end]
     for i, line in enumerate(parsed_text.content):
-        split += line
-        while len(split) > chunk_chars:
+        end += len(line)
+        while end - start > chunk_chars:
             texts.append(
                 Text(
-                    text=split[:chunk_chars],
+                    text=content[start : start + chunk_chars],
                     name=f"{doc.docname} lines {last_line}-{i}",
                     doc=doc,
                 )
             )
-            split = split[chunk_chars - overlap :]
+            start += chunk_chars - overlap
             last_line = i
-    if len(split) > overlap or not texts:
+    if end - start > overlap or not texts:
         texts.append(
             Text(
-                text=split[:chunk_chars],
+                text=content[start : start + chunk_chars],
                 name=f"{doc.docname} lines {last_line}-{i}",
                 doc=doc,
             )
@@ -252,6 +512,146 @@ def chunk_code_text(
     return texts
 
 
+async def parse_doc(
+    path: str | os.PathLike,
+    page_size_limit: int | None = None,
+    pdf_parsing_pool: PDFParsingPool | None = None,
+) -> ParsedText:
+    """Parse a document into text, in a thread, choosing the parser by extension.
+
+    Args:
+        path: local document path
+        page_size_limit: optional limit on the number of characters per page
+        pdf_parsing_pool: optional process pool to parse PDFs in, instead of a thread
+    """
+    str_path = str(path)
+    if str_path.endswith(".pdf"):
+        if pdf_parsing_pool is not None:
+            return await pdf_parsing_pool.parse(path, page_size_limit=page_size_limit)
+        # TODO: Make parse_pdf_to_pages async
+        return await asyncio.to_thread(
+            parse_pdf_to_pages, path, page_size_limit=page_size_limit
+        )
+    if str_path.endswith(".txt"):
+        # TODO: Make parse_text async
+        return await asyncio.to_thread(
+            parse_text, path, page_size_limit=page_size_limit
+        )
+    if str_path.endswith(".html"):
+        return await asyncio.to_thread(
+            parse_text, path, html=True, page_size_limit=page_size_limit
+        )
+    return await asyncio.to_thread(
+        parse_text,
+        path,
+        split_lines=True,
+        use_tiktoken=False,
+        page_size_limit=page_size_limit,
+    )
+
+
+def chunk_parsed_text(
+    parsed_text: ParsedText,
+    path: str | os.PathLike,
+    doc: Doc,
+    chunk_chars: int = 3000,
+    overlap: int = 100,
+) -> tuple[list[Text], ChunkMetadata]:
+    """Split parsed text into chunks, choosing the chunking by the path's extension.
+
+    Args:
+        parsed_text: text parsed from the document at the path
+        path: local document path
+        doc: object with document metadata
+        chunk_chars: size of chunks
+        overlap: size of overlap between chunks
+    """
+    str_path = str(path)
+    # check if chunk is 0 (no chunking)
+    if chunk_chars == 0:
+        return [
+            Text(text=parsed_text.reduce_content(), name=doc.docname, doc=doc)
+        ], ChunkMetadata(chunk_chars=0, overlap=0, chunk_type="no_chunk")
+    if str_path.endswith(".pdf"):
+        return chunk_pdf(
+            parsed_text, doc, chunk_chars=chunk_chars, overlap=overlap
+        ), ChunkMetadata(
+            chunk_chars=chunk_chars,
+            overlap=overlap,
+            chunk_type="overlap_pdf_by_page",
+        )
+    if str_path.endswith((".txt", ".html")):
+        return chunk_text(
+            parsed_text, doc, chunk_chars=chunk_chars, overlap=overlap
+        ), ChunkMetadata(chunk_chars=chunk_chars, overlap=overlap, chunk_type="overlap")
+    return chunk_code_text(
+        parsed_text, doc, chunk_chars=chunk_chars, overlap=overlap
+    ), ChunkMetadata(
+        chunk_chars=chunk_chars,
+        overlap=overlap,
+        chunk_type="overlap_code_by_line",
+    )
+
+
+def peek_first_chunk(
+    parsed_text: ParsedText,
+    path: str | os.PathLike,
+    dockey: DocKey,
+    chunk_chars: int = 3000,
+    overlap: int = 100,
+) -> str:
+    """Get a document's first chunk, only chunking its leading pages (or lines).
+
+    Args:
+        parsed_text: text parsed from the document at the path
+        path: local document path
+        dockey: key of the document
+        chunk_chars: size of chunks
+        overlap: size of overlap between chunks
+    """
+    content = parsed_text.content
+    # Enough text for the first chunk, so long documents don't get chunked twice
+    leading_chars = chunk_chars + overlap
+    if chunk_chars == 0:  # No chunking, the whole document is a chunk
+        leading = parsed_text
+    elif isinstance(content, str):
+        leading = parsed_text.model_copy(
+            update={
+                "content": content[:leading_chars],
+                "metadata": parsed_text.metadata.model_copy(
+                    update={"total_parsed_text_length": len(content[:leading_chars])}
+                ),
+            }
+        )
+    else:
+        parts = content.values() if isinstance(content, dict) else content
+        n_parts = length = 0
+        for part in parts:
+            n_parts += 1
+            length += len(part)
+            if length > leading_chars:
+                break
+        leading = parsed_text.model_copy(
+            update={
+                "content": (
+                    dict(islice(content.items(), n_parts))
+                    if isinstance(content, dict)
+                    else content[:n_parts]
+                )
+            }
+        )
+    texts, _ = chunk_parsed_text(
+        leading,
+        path,
+        Doc(docname="", citation="", dockey=dockey),  # Fake doc
+        chunk_chars=chunk_chars,
+        overlap=overlap,
+    )
+    if not texts:
+        raise ValueError(f"Could not read document {path}. Is it empty?")
+    return texts[0].text
+
+
 @overload
 async def read_doc(
     path: str | os.PathLike,
@@ -261,6 +661,7 @@ async def read_doc(
     chunk_chars: int = ...,
     overlap: int = ...,
     page_size_limit: int | None = ...,
+    pdf_parsing_pool: PDFParsingPool | None = ...,
 ) -> list[Text]: ...
 
 
@@ -273,6 +674,7 @@ async def read_doc(
     chunk_chars: int = ...,
     overlap: int = ...,
     page_size_limit: int | None = ...,
+    pdf_parsing_pool: PDFParsingPool | None = ...,
 ) -> list[Text]: ...
 
 
@@ -285,6 +687,7 @@ async def read_doc(
     chunk_chars: int = ...,
     overlap: int = ...,
     page_size_limit: int | None = ...,
+    pdf_parsing_pool: PDFParsingPool | None = ...,
 ) -> ParsedText: ...
 
 
@@ -297,6 +700,7 @@ async def read_doc(
     chunk_chars: int = ...,
     overlap: int = ...,
     page_size_limit: int | None = ...,
+    pdf_parsing_pool: PDFParsingPool | None = ...,
 ) -> tuple[list[Text], ParsedMetadata]: ...
 
 
@@ -308,6 +712,7 @@ async def read_doc(
     chunk_chars: int = 3000,
     overlap: int = 100,
     page_size_limit: int | None = None,
+    pdf_parsing_pool: PDFParsingPool | None = None,
 ) -> list[Text] | ParsedText | tuple[list[Text], ParsedMetadata]:
     """Parse a document and split into chunks.
 
@@ -320,69 +725,20 @@ async def read_doc(
         chunk_chars: size of chunks
         overlap: size of overlap between chunks
         page_size_limit: optional limit on the number of characters per page
+        pdf_parsing_pool: optional process pool to parse PDFs in, instead of a thread
     """
-    str_path = str(path)
-
     # start with parsing -- users may want to store this separately
-    if str_path.endswith(".pdf"):
-        # TODO: Make parse_pdf_to_pages async
-        parsed_text = await asyncio.to_thread(
-            parse_pdf_to_pages, path, page_size_limit=page_size_limit
-        )
-    elif str_path.endswith(".txt"):
-        # TODO: Make parse_text async
-        parsed_text = await asyncio.to_thread(
-            parse_text, path, page_size_limit=page_size_limit
-        )
-    elif str_path.endswith(".html"):
-        parsed_text = await asyncio.to_thread(
-            parse_text, path, html=True, page_size_limit=page_size_limit
-        )
-    else:
-        parsed_text = await asyncio.to_thread(
-            parse_text,
-            path,
-            split_lines=True,
-            use_tiktoken=False,
-            page_size_limit=page_size_limit,
-        )
+    parsed_text = await parse_doc(
+        path, page_size_limit=page_size_limit, pdf_parsing_pool=pdf_parsing_pool
+    )
 
     if parsed_text_only:
         return parsed_text
 
     # next chunk the parsed text
-
-    # check if chunk is 0 (no chunking)
-    if chunk_chars == 0:
-        chunked_text = [
-            Text(text=parsed_text.reduce_content(), name=doc.docname, doc=doc)
-        ]
-        chunk_metadata = ChunkMetadata(chunk_chars=0, overlap=0, chunk_type="no_chunk")
-    elif str_path.endswith(".pdf"):
-        chunked_text = chunk_pdf(
-            parsed_text, doc, chunk_chars=chunk_chars, overlap=overlap
-        )
-        chunk_metadata = ChunkMetadata(
-            chunk_chars=chunk_chars,
-            overlap=overlap,
-            chunk_type="overlap_pdf_by_page",
-        )
-    elif str_path.endswith((".txt", ".html")):
-        chunked_text = chunk_text(
-            parsed_text, doc, chunk_chars=chunk_chars, overlap=overlap
-        )
-        chunk_metadata = ChunkMetadata(
-            chunk_chars=chunk_chars, overlap=overlap, chunk_type="overlap"
-        )
-    else:
-        chunked_text = chunk_code_text(
-            parsed_text, doc, chunk_chars=chunk_chars, overlap=overlap
-        )
-        chunk_metadata = ChunkMetadata(
-            chunk_chars=chunk_chars,
-            overlap=overlap,
-            chunk_type="overlap_code_by_line",
-        )
+    chunked_text, chunk_metadata = chunk_parsed_text(
+        parsed_text, path, doc, chunk_chars=chunk_chars, overlap=overlap
+    )
 
     if include_metadata:
         parsed_text.metadata.chunk_metadata = chunk_metadata
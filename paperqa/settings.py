@@ -2,11 +2,14 @@ import asyncio
 import importlib.resources
 import os
 import pathlib
+import shutil
+import tempfile
 import warnings
+import weakref
 from collections.abc import Callable, Mapping, Sequence
 from enum import StrEnum
 from pydoc import locate
-from typing import Any, ClassVar, Self, TypeAlias, assert_never, cast
+from typing import Any, ClassVar, Literal, Self, TypeAlias, assert_never, cast
 
 import anyio
 from aviary.core import Tool, ToolSelector
@@ -39,6 +42,7 @@ from paperqa._ldp_shims import (
     _Memories,
     set_training_mode,
 )
+from paperqa.llms import EmbeddingCache, VectorStore, vector_store_factory
 from paperqa.prompts import (
     CONTEXT_INNER_PROMPT,
     CONTEXT_OUTER_PROMPT,
@@ -54,6 +58,7 @@ from paperqa.prompts import (
     summary_json_system_prompt,
     summary_prompt,
 )
+from paperqa.readers import PDFParsingPool, get_pdf_parsing_pool
 from paperqa.utils import hexdigest, pqa_directory
 from paperqa.version import __version__
 
@@ -76,6 +81,29 @@ class AnswerSettings(BaseModel):
         default=True,
         description="Whether to use retrieval instead of processing all docs.",
     )
+    evidence_retrieval_lexical_fusion: bool = Field(
+        default=False,
+        description=(
+            "Whether to fuse BM25 keyword retrieval with dense retrieval, improving"
+            " recall of exact terms such as gene names, trial IDs, or drug codes."
+        ),
+    )
+    evidence_retrieval_rrf_k: int = Field(
+        default=60,
+        ge=0,
+        description=(
+            "Constant k of reciprocal rank fusion, where a text's fused score is the"
+            " sum of 1 / (k + rank) over the dense and keyword rankings."
+        ),
+    )
+    evidence_retrieval_filter: Mapping[str, Any] | None = Field(
+        default=None,
+        description=(
+            "Optional filter restricting evidence retrieval to the texts of matching"
+            " documents, with the same syntax as `parsing.doc_filters`, for example"
+            " {'year>=': 2020} to only retrieve from papers since 2020."
+        ),
+    )
     evidence_summary_length: str = Field(
         default="about 100 words", description="Length of evidence summary."
     )
@@ -168,6 +196,15 @@ class ParsingSettings(BaseModel):
     use_doc_details: bool = Field(
         default=True, description="Whether to try to get metadata details for a Doc."
     )
+    metadata_fast_path: bool = Field(
+        default=True,
+        description=(
+            "Whether to first try getting a Doc's metadata details from a DOI without"
+            " LLM calls, where the DOI is either passed in (e.g. from a manifest) or"
+            " found in the document's embedded metadata or first pages. Requires"
+            " use_doc_details."
+        ),
+    )
     overlap: int = Field(
         default=250, description="Number of characters to overlap chunks."
     )
@@ -206,13 +243,63 @@ class ParsingSettings(BaseModel):
             " rejected. To change this behavior, prefix the key with a '?' to allow the"
             " Doc to pass if the key is not found. For example, {'!title': 'bad title',"
             " '?year': '2022'} would only allow Docs with a title that is not 'bad"
-            " title' and a year of 2022 or no year at all."
+            " title' and a year of 2022 or no year at all. Suffix the key with '>=',"
+            " '<=', '>' or '<' to compare instead of matching, for example"
+            " {'year>=': 2020}."
         ),
     )
     use_human_readable_clinical_trials: bool = Field(
         default=False,
         description="Parse clinical trial JSONs into human readable text.",
     )
+    pdf_parsing_processes: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Number of worker processes to parse PDFs in, so concurrently added PDFs"
+            " (e.g. up to IndexSettings.concurrency) are parsed on multiple cores"
+            " instead of serializing on the GIL. If 0, PDFs are parsed in a thread."
+        ),
+    )
+    pdf_parsing_timeout: float | None = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Optional timeout (seconds) for a worker process to parse one PDF, not"
+            " counting time queued behind other PDFs, after which that worker is"
+            " killed and the PDF is skipped. Only used if pdf_parsing_processes is"
+            " positive."
+        ),
+    )
+    pdf_parsing_max_tasks_per_child: int | None = Field(
+        default=100,
+        gt=0,
+        description=(
+            "Optional number of PDFs a worker process parses before being replaced,"
+            " to bound memory leaked by the PDF parser. Only used if"
+            " pdf_parsing_processes is positive."
+        ),
+    )
+    pdf_parsing_pages_per_task: int | None = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Optional number of pages per worker process task, to split PDFs with more"
+            " pages (e.g. books) into page ranges parsed in parallel, each range"
+            " getting the pdf_parsing_timeout. Only used if pdf_parsing_processes is"
+            " positive."
+        ),
+    )
+
+    def get_pdf_parsing_pool(self) -> PDFParsingPool | None:
+        if not self.pdf_parsing_processes:
+            return None
+        return get_pdf_parsing_pool(
+            max_workers=self.pdf_parsing_processes,
+            timeout=self.pdf_parsing_timeout,
+            max_tasks_per_child=self.pdf_parsing_max_tasks_per_child,
+            pages_per_task=self.pdf_parsing_pages_per_task,
+        )
 
     def chunk_type(self, chunking_selection: ChunkingOptions | None = None) -> str:
         """Future chunking implementations (i.e. by section) will get an elif clause here."""
@@ -622,6 +709,11 @@ def make_default_litellm_model_list_settings(
     }
 
 
+# Texts indexes holding their embeddings in a NumPy matrix, which support sharded
+# scoring and dimensionality reduction
+IN_MEMORY_TEXTS_INDEXES = frozenset({"numpy", "ivf"})
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(extra="ignore")
 
@@ -663,11 +755,69 @@ class Settings(BaseSettings):
         default=None,
         description="Optional configuration for the embedding model.",
     )
+    embedding_reduced_dim: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Optional dimension the 'numpy' or 'ivf' texts index reduces embeddings"
+            " to, shrinking the index and speeding up search. For reducing the"
+            " embeddings at the source, 'text-embedding-3-*' models instead accept a"
+            " 'dimensions' in embedding_config's kwargs."
+        ),
+    )
+    embedding_dim_reduction: Literal["truncate", "pca"] = Field(
+        default="truncate",
+        description=(
+            "How embeddings are reduced to embedding_reduced_dim, 'truncate' keeps"
+            " the leading dimensions of Matryoshka embeddings (like"
+            " 'text-embedding-3-*'), 'pca' projects onto principal components."
+        ),
+    )
+    embedding_cache_path: str | os.PathLike | None = Field(
+        default=None,
+        description=(
+            "Optional SQLite file caching document embeddings by embedding model and"
+            " text content, shared across Docs, indexes, and processes."
+        ),
+    )
+    embedding_cache_max_bytes: int = Field(
+        default=2**30,
+        ge=0,
+        description=(
+            "Maximum size of the embedding cache, beyond which the least recently"
+            " used embeddings are evicted."
+        ),
+    )
     temperature: float = Field(default=0.0, description="Temperature for LLMs.")
     batch_size: int = Field(default=1, description="Batch size for calling LLMs.")
     texts_index_mmr_lambda: float = Field(
         default=1.0, description="Lambda for MMR in text index."
     )
+    texts_index: str = Field(
+        default="numpy",
+        description=(
+            "Vector store for new Docs' texts index, either 'numpy' (exact search),"
+            " 'ivf' (approximate search for large corpora), 'mmap', or 'qdrant'."
+        ),
+    )
+    texts_index_config: dict | None = Field(
+        default=None,
+        description=(
+            "Optional configuration for the texts index, such as 'n_probe' to trade"
+            " latency for recall with the 'ivf' texts index. For the 'mmap' texts"
+            " index, 'path' is the parent directory of each Docs' store directory,"
+            " defaulting to a directory in the PQA home. Each store directory is"
+            " temporary, removed once its store is garbage collected."
+        ),
+    )
+    texts_index_shards: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "Number of shards the 'numpy' or 'ivf' texts index splits its embeddings"
+            " into, to score them concurrently across threads."
+        ),
+    )
     index_absolute_directory: bool = Field(
         default=False,
         description="Whether to use the absolute paper directory for the PQA index.",
@@ -756,6 +906,22 @@ class Settings(BaseSettings):
             self.temperature = 1
         return self
 
+    @model_validator(mode="after")
+    def _validate_in_memory_texts_index_options(self) -> Self:
+        if self.texts_index.strip().lower() in IN_MEMORY_TEXTS_INDEXES:
+            return self
+        for name, value in (
+            ("texts_index_shards", self.texts_index_shards > 1),
+            ("embedding_reduced_dim", self.embedding_reduced_dim is not None),
+        ):
+            if value:
+                raise ValueError(
+                    f"{name} of {getattr(self, name)} requires an in-memory texts"
+                    f" index, one of {sorted(IN_MEMORY_TEXTS_INDEXES)}, not"
+                    f" {self.texts_index!r}."
+                )
+        return self
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def md5(self) -> str:
@@ -861,6 +1027,41 @@ class Settings(BaseSettings):
     def get_embedding_model(self) -> EmbeddingModel:
         return embedding_model_factory(self.embedding, **(self.embedding_config or {}))
 
+    def get_embedding_cache(self) -> EmbeddingCache | None:
+        if self.embedding_cache_path is None:
+            return None
+        return EmbeddingCache(
+            path=pathlib.Path(self.embedding_cache_path),
+            max_size_bytes=self.embedding_cache_max_bytes,
+        )
+
+    def get_texts_index(self) -> VectorStore:
+        config = dict(self.texts_index_config or {})
+        texts_index = self.texts_index.strip().lower()
+        if texts_index == "mmap":
+            # Give each Docs its own directory, so concurrent Docs don't clobber
+            # each other's files
+            parent = pathlib.Path(config.get("path") or pqa_directory("texts_indexes"))
+            parent.mkdir(parents=True, exist_ok=True)
+            config |= {"path": pathlib.Path(tempfile.mkdtemp(dir=parent))}
+        if self.texts_index_shards > 1 and texts_index in IN_MEMORY_TEXTS_INDEXES:
+            config = {"n_shards": self.texts_index_shards} | config
+        if (
+            self.embedding_reduced_dim is not None
+            and texts_index in IN_MEMORY_TEXTS_INDEXES
+        ):
+            config = {
+                "reduced_dim": self.embedding_reduced_dim,
+                "dim_reduction": self.embedding_dim_reduction,
+            } | config
+        texts_index_store = vector_store_factory(self.texts_index, **config)
+        if texts_index == "mmap":
+            # Remove the directory along with its store, so they don't pile up
+            weakref.finalize(
+                texts_index_store, shutil.rmtree, config["path"], ignore_errors=True
+            )
+        return texts_index_store
+
     def make_aviary_tool_selector(self, agent_type: str | type) -> ToolSelector | None:
         """Attempt to convert the input agent type to an aviary ToolSelector."""
         if agent_type is ToolSelector or (
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import logging
+import operator
 import os
 import re
 import warnings
-from collections.abc import Collection, Mapping
+from collections.abc import Callable, Collection, Mapping
 from copy import deepcopy
 from datetime import datetime
 from typing import Any, ClassVar, cast
@@ -50,6 +51,27 @@ DEFAULT_FIELDS_TO_OVERWRITE_FROM_METADATA: Collection[str] = {
     "dockey",
     "citation",
 }
+# Comparisons suffixing a filter criteria key, e.g. 'year>='
+FILTER_OPERATORS: Mapping[str, Callable[[Any, Any], Any]] = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+
+def parse_filter_key(key: str) -> tuple[str, bool, bool, Callable[[Any, Any], Any]]:
+    """Parse a filter criteria key into its field, inversion, relaxation and comparison.
+
+    For example, '?year>=' gives ('year', False, True, operator.ge).
+    """
+    invert = key.startswith("!")
+    relaxed = key.startswith("?")
+    key = key.lstrip("!?")
+    for suffix, comparison in FILTER_OPERATORS.items():
+        if key.endswith(suffix):
+            return key.removesuffix(suffix), invert, relaxed, comparison
+    return key, invert, relaxed, operator.eq
 
 
 class Doc(Embeddable):
@@ -80,17 +102,17 @@ class Doc(Embeddable):
         """Returns True if the doc matches the filter criteria, False otherwise."""
         data_dict = self.model_dump()
         for key, value in filter_criteria.items():
-            invert = key.startswith("!")
-            relaxed = key.startswith("?")
-            key = key.lstrip("!?")
+            key, invert, relaxed, comparison = parse_filter_key(key)
             # we check if missing or sentinel/unset
             if relaxed and (key not in data_dict or data_dict[key] is None):
                 continue
             if key not in data_dict:
                 return False
-            if invert and data_dict[key] == value:
-                return False
-            if not invert and data_dict[key] != value:
+            if comparison is not operator.eq and data_dict[key] is None:
+                matches = False
+            else:
+                matches = bool(comparison(data_dict[key], value))
+            if matches == invert:
                 return False
         return True
 
@@ -283,6 +305,13 @@ class ParsedMetadata(BaseModel):
     paperqa_version: str = pqa_version
     parse_type: str | None = None
     chunk_metadata: ChunkMetadata | None = None
+    document_metadata: dict[str, str] = Field(
+        default_factory=dict,
+        description=(
+            "Metadata embedded in the document, such as a PDF's title, author,"
+            " subject, and XMP metadata."
+        ),
+    )
 
 
 class ParsedText(BaseModel):
@@ -108,7 +108,9 @@ def hexdigest(data: str | bytes) -> str:
 
 
 def md5sum(file_path: str | os.PathLike) -> str:
-    return hexdigest(Path(file_path).read_bytes())
+    # Stream the file in blocks, to not read large files into memory
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "md5").hexdigest()
 
 
 def strip_citations(text: str) -> str:
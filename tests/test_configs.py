@@ -1,3 +1,4 @@
+import gc
 import os
 import pathlib
 import warnings
@@ -7,6 +8,7 @@ import pytest
 from pydantic import ValidationError
 from pytest_subtests import SubTests
 
+from paperqa.llms import IVFVectorStore, MmapVectorStore, NumpyVectorStore
 from paperqa.prompts import citation_prompt
 from paperqa.settings import (
     AgentSettings,
@@ -99,6 +101,52 @@ def test_router_kwargs_present_in_models() -> None:
     assert settings.get_summary_llm().config["router_kwargs"] is not None
 
 
+def test_get_texts_index() -> None:
+    assert isinstance(Settings().get_texts_index(), NumpyVectorStore)
+    texts_index = Settings(
+        texts_index="ivf", texts_index_config={"n_probe": 4}
+    ).get_texts_index()
+    assert isinstance(texts_index, IVFVectorStore)
+    assert texts_index.n_probe == 4
+    texts_index = Settings(texts_index_shards=8).get_texts_index()
+    assert isinstance(texts_index, NumpyVectorStore)
+    assert texts_index.n_shards == 8
+    texts_index = Settings(
+        embedding_reduced_dim=256, embedding_dim_reduction="pca"
+    ).get_texts_index()
+    assert isinstance(texts_index, NumpyVectorStore)
+    assert texts_index.reduced_dim == 256
+    assert texts_index.dim_reduction == "pca"
+    with pytest.raises(ValueError, match="Unknown texts index"):
+        Settings(texts_index="faiss").get_texts_index()
+
+
+@pytest.mark.parametrize("texts_index", ["mmap", "qdrant"])
+def test_in_memory_texts_index_options(texts_index: str) -> None:
+    with pytest.raises(ValidationError, match="requires an in-memory texts index"):
+        Settings(texts_index=texts_index, texts_index_shards=2)
+    with pytest.raises(ValidationError, match="requires an in-memory texts index"):
+        Settings(texts_index=texts_index, embedding_reduced_dim=256)
+    # The defaults are fine for any texts index
+    settings = Settings(texts_index=texts_index)
+    assert settings.texts_index_shards == 1
+    assert settings.embedding_reduced_dim is None
+
+
+def test_get_texts_index_mmap_path(tmp_path: pathlib.Path) -> None:
+    settings = Settings(texts_index="mmap", texts_index_config={"path": tmp_path})
+    first, second = settings.get_texts_index(), settings.get_texts_index()
+    assert isinstance(first, MmapVectorStore)
+    assert isinstance(second, MmapVectorStore)
+    assert first.path.parent == second.path.parent == tmp_path
+    assert first.path != second.path, "Each Docs should get its own directory"
+    first_path = first.path
+    del first
+    gc.collect()
+    assert not first_path.exists(), "Expected the directory to go with its store"
+    assert second.path.exists()
+
+
 def test_o1_requires_temp_equals_1() -> None:
     with warnings.catch_warnings(record=True) as w:
         warnings.simplefilter("always")
@@ -182,6 +230,37 @@ def test_o1_requires_temp_equals_1() -> None:
             True,
             id="DocDetails-relaxed-missing-volume",
         ),
+        pytest.param(
+            DocDetails,
+            {
+                "title": "Test Paper",
+                "authors": ["Alice", "Bob"],
+                "year": 2020,
+            },
+            {"year>=": 2020, "year<": 2021},
+            True,
+            id="DocDetails-year-range",
+        ),
+        pytest.param(
+            DocDetails,
+            {
+                "title": "Test Paper",
+                "authors": ["Alice", "Bob"],
+            },
+            {"year>": 2019},
+            False,
+            id="DocDetails-comparison-missing-year",
+        ),
+        pytest.param(
+            DocDetails,
+            {
+                "title": "Test Paper",
+                "authors": ["Alice", "Bob"],
+            },
+            {"?year>": 2019, "!year<=": 2019},
+            True,
+            id="DocDetails-inverted-comparison-missing-year",
+        ),
     ],
 )
 def test_matches_filter_criteria(doc_class, doc_data, filter_criteria, expected_result):
@@ -1,14 +1,17 @@
+import asyncio
 import contextlib
 import os
 import pathlib
 import pickle
 import re
-from collections.abc import AsyncIterable, Sequence
+from collections.abc import AsyncIterable, Callable, Sequence
 from copy import deepcopy
 from datetime import datetime, timedelta
+from functools import partial
 from io import BytesIO
 from pathlib import Path
 from typing import cast
+from unittest.mock import AsyncMock, patch
 from uuid import UUID
 
 import httpx
@@ -35,26 +38,48 @@ from paperqa import (
     Doc,
     DocDetails,
     Docs,
+    EmbeddingCache,
+    IVFVectorStore,
+    MmapVectorStore,
     NumpyVectorStore,
     PQASession,
     QdrantVectorStore,
+    QueryEmbeddingCache,
     Settings,
     Text,
     VectorStore,
     print_callback,
 )
-from paperqa.clients import CrossrefProvider
+from paperqa.clients import CrossrefProvider, DocMetadataClient
 from paperqa.clients.journal_quality import JournalQualityPostProcessor
 from paperqa.core import llm_parse_json
+from paperqa.llms import (
+    BM25Index,
+    cosine_similarity,
+    embed_documents,
+    embedding_model_key,
+)
 from paperqa.prompts import CANNOT_ANSWER_PHRASE
 from paperqa.prompts import qa_prompt as default_qa_prompt
-from paperqa.readers import read_doc
+from paperqa.readers import (
+    PDFParsingPool,
+    chunk_code_text,
+    chunk_parsed_text,
+    chunk_pdf,
+    parse_pdf_to_pages,
+    peek_first_chunk,
+    read_doc,
+)
+from paperqa.settings import ParsingSettings
+from paperqa.types import ParsedMetadata, ParsedText
 from paperqa.utils import (
+    ImpossibleParsingError,
     extract_score,
     get_citenames,
     maybe_get_date,
     maybe_is_html,
     maybe_is_text,
+    md5sum,
     name_in_text,
     strings_similarity,
     strip_citations,
@@ -809,6 +834,1305 @@ async def test_hybrid_embedding(
     assert any(docs.texts[0].embedding)
 
 
+@pytest.mark.asyncio
+async def test_numpy_vector_store_incremental_add() -> None:
+    stub_doc = Doc(docname="stub", citation="stub", dockey="stub")
+    index = NumpyVectorStore()
+    all_texts: list[Text] = []
+    for i in range(5):
+        texts = [
+            Text(
+                text=f"text {i}-{j}",
+                name=f"stub {i}-{j}",
+                doc=stub_doc,
+                embedding=[float(i), 1.0, float(j)],
+            )
+            for j in range(3)
+        ]
+        await index.add_texts_and_embeddings(texts)
+        all_texts += texts
+
+    assert index.texts == all_texts
+    matrix = index._embeddings_matrix
+    assert matrix is not None
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (15, 3)
+    embeddings = np.array([t.embedding for t in all_texts])
+    assert np.allclose(
+        matrix, embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    )
+    assert index._embeddings_buffer is not None
+    assert index._embeddings_buffer.shape[0] >= 15, "Capacity should be amortized"
+    with pytest.raises(ValueError, match="read-only"):
+        matrix[0, 0] = 1.0
+
+    with pytest.raises(ValueError, match="dimension"):
+        await index.add_texts_and_embeddings(
+            [Text(text="bad", name="bad", doc=stub_doc, embedding=[1.0, 2.0])]
+        )
+
+    index.clear()
+    assert index._embeddings_matrix is None
+    assert not index.texts
+
+
+@pytest.mark.asyncio
+async def test_numpy_vector_store_similarity_search() -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embedding = rng.normal(size=8).tolist()
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return [query_embedding for _ in texts]
+
+    stub_doc = Doc(docname="stub", citation="stub", dockey="stub")
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=stub_doc,
+            embedding=(rng.normal(size=8) * rng.uniform(0.1, 10)).tolist(),
+        )
+        for i in range(50)
+    ]
+    index = NumpyVectorStore()
+    await index.add_texts_and_embeddings(texts)
+    assert index._embeddings_matrix is not None
+    assert np.allclose(np.linalg.norm(index._embeddings_matrix, axis=1), 1.0)
+
+    embeddings = np.array([t.embedding for t in texts])
+    expected_scores = (
+        embeddings @ query_embedding / np.linalg.norm(embeddings, axis=1)
+    ) / np.linalg.norm(query_embedding)
+    expected_order = np.argsort(-expected_scores)[:5]
+
+    matches, scores = await index.similarity_search("query", 5, QueryEmbeds())
+    assert [texts.index(m) for m in matches] == expected_order.tolist()  # type: ignore[arg-type]
+    assert np.allclose(scores, expected_scores[expected_order], atol=1e-6)
+    assert all(isinstance(s, float) for s in scores)
+    assert scores == sorted(scores, reverse=True)
+
+    matches, scores = await index.similarity_search("query", 100, QueryEmbeds())
+    assert len(matches) == len(scores) == len(texts)
+
+    # Zero vectors have no direction, so they're excluded instead of scoring 0
+    zero_text = Text(text="zero", name="zero", doc=stub_doc, embedding=[0.0] * 8)
+    await index.add_texts_and_embeddings([zero_text])
+    matches, scores = await index.similarity_search("query", 100, QueryEmbeds())
+    assert zero_text not in matches
+    assert len(matches) == len(texts)
+
+
+@pytest.mark.asyncio
+async def test_numpy_vector_store_sharded_scoring() -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embeddings = rng.normal(size=(3, 8)).tolist()
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return query_embeddings[: len(texts)]
+
+    stub_doc = Doc(docname="stub", citation="stub", dockey="stub")
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=Doc(docname=f"stub{i % 5}", citation="stub", dockey=f"stub{i % 5}"),
+            embedding=rng.normal(size=8).tolist(),
+        )
+        for i in range(101)
+    ]
+    texts.append(Text(text="empty", name="empty", doc=stub_doc, embedding=[0.0] * 8))
+    index = NumpyVectorStore()
+    sharded_index = NumpyVectorStore(n_shards=4)
+    for store in (index, sharded_index):
+        await store.add_texts_and_embeddings(texts)
+        store.delete_documents({"stub3"})
+
+    queries = ["query 1", "query 2", "query 3"]
+    for k in (1, 7, 200):
+        expected = await index.batch_similarity_search(queries, k, QueryEmbeds())
+        results = await sharded_index.batch_similarity_search(queries, k, QueryEmbeds())
+        for (matches, scores), (expected_matches, expected_scores) in zip(
+            results, expected, strict=True
+        ):
+            assert matches == expected_matches
+            assert np.allclose(scores, expected_scores)
+    # More shards than rows shouldn't leave any shard empty
+    index = NumpyVectorStore(n_shards=16)
+    await index.add_texts_and_embeddings(texts[:3])
+    (matches, _), *_ = await index.batch_similarity_search(queries, 2, QueryEmbeds())
+    assert len(matches) == 2
+
+
+@pytest.mark.asyncio
+async def test_numpy_vector_store_dim_reduction(tmp_path: Path) -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embeddings = rng.normal(size=(2, 8)).tolist()
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return query_embeddings[: len(texts)]
+
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=Doc(docname=f"stub{i % 4}", citation="stub", dockey=f"stub{i % 4}"),
+            embedding=rng.normal(size=8).tolist(),
+        )
+        for i in range(40)
+    ]
+    queries = ["query 1", "query 2"]
+    exact_index = NumpyVectorStore()
+    await exact_index.add_texts_and_embeddings(texts)
+
+    truncated_index = NumpyVectorStore(reduced_dim=3)
+    await truncated_index.add_texts_and_embeddings(texts)
+    assert cast("np.ndarray", truncated_index._embeddings_matrix).shape == (40, 3)
+    (_, scores), _ = await truncated_index.batch_similarity_search(
+        queries, 40, QueryEmbeds()
+    )
+    embeddings = np.array([t.embedding for t in texts])[:, :3]
+    expected_scores = (
+        embeddings @ query_embeddings[0][:3] / np.linalg.norm(embeddings, axis=1)
+    ) / np.linalg.norm(query_embeddings[0][:3])
+    assert np.allclose(scores, sorted(expected_scores, reverse=True), atol=1e-6)
+
+    with pytest.raises(ValueError, match="pca_train_size"):
+        NumpyVectorStore(reduced_dim=8, dim_reduction="pca", pca_train_size=4)
+    full_embeddings_path = tmp_path / "embeddings.f32"
+    pca_index = NumpyVectorStore(
+        reduced_dim=3,
+        dim_reduction="pca",
+        pca_train_size=20,
+        full_embeddings_path=full_embeddings_path,
+    )
+    await pca_index.add_texts_and_embeddings(texts[:10])
+    assert cast("np.ndarray", pca_index._embeddings_matrix).shape == (10, 8)
+    await pca_index.add_texts_and_embeddings(texts[10:])
+    assert cast("np.ndarray", pca_index._embeddings_matrix).shape == (40, 3)
+    assert full_embeddings_path.stat().st_size == 40 * 8 * 4
+    # Rows and queries get centered on the PCA sample's mean before projecting
+    mean = cast("np.ndarray", pca_index._projection_mean)
+    assert not np.allclose(mean, 0)
+    for full, reduced in (
+        (
+            np.array([t.embedding for t in texts]),
+            cast("np.ndarray", pca_index._embeddings_matrix),
+        ),
+        (
+            np.array(query_embeddings),
+            pca_index._prepare_queries(np.array(query_embeddings)),
+        ),
+    ):
+        centered = full / np.linalg.norm(full, axis=1, keepdims=True) - mean
+        projected = centered @ cast("np.ndarray", pca_index._projection)
+        assert np.allclose(
+            reduced,
+            projected / np.linalg.norm(projected, axis=1, keepdims=True),
+            atol=1e-5,
+        )
+
+    # Re-ranking all candidates with the full embeddings gives exact results,
+    # the truncated index shares the file as its rows were added in the same order
+    for index in (pca_index, truncated_index.model_copy(deep=True)):
+        index.full_embeddings_path = full_embeddings_path
+        for k in (3, 10):
+            expected = await exact_index.batch_similarity_search(
+                queries, k, QueryEmbeds()
+            )
+            results = await index.batch_similarity_search(queries, k, QueryEmbeds())
+            for (matches, scores), (expected_matches, expected_scores) in zip(
+                results, expected, strict=True
+            ):
+                assert matches == expected_matches
+                assert np.allclose(scores, expected_scores, atol=1e-6)
+
+    for index in (pca_index, exact_index):
+        index.delete_documents({"stub1", "stub2"})
+        index.compact()
+    assert full_embeddings_path.stat().st_size == 20 * 8 * 4
+    expected = await exact_index.batch_similarity_search(queries, 5, QueryEmbeds())
+    results = await pca_index.batch_similarity_search(queries, 5, QueryEmbeds())
+    assert [m for m, _ in results] == [m for m, _ in expected]
+
+    assert pickle.loads(pickle.dumps(pca_index)) == pca_index
+    pca_index.clear()
+    assert not full_embeddings_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_max_marginal_relevance_search() -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embedding = rng.normal(size=8).tolist()
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return [query_embedding for _ in texts]
+
+    stub_doc = Doc(docname="stub", citation="stub", dockey="stub")
+    # Near-duplicate pairs, which MMR should avoid selecting together
+    base = rng.normal(size=(50, 8))
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=stub_doc,
+            embedding=(
+                (base[i // 2] + 0.01 * rng.normal(size=8)) * rng.uniform(0.5, 2)
+            ).tolist(),
+        )
+        for i in range(100)
+    ]
+    index = NumpyVectorStore(mmr_lambda=0.5)
+    await index.add_texts_and_embeddings(texts)
+    candidates, candidate_scores = await index.similarity_search(
+        "query", 40, QueryEmbeds()
+    )
+
+    # Reference implementation, with the full similarity matrix
+    embeddings = np.array([t.embedding for t in candidates])
+    similarity_matrix = cosine_similarity(embeddings, embeddings)
+    expected = [0]
+    while len(expected) < 10:
+        mmr_scores = 0.5 * np.array(candidate_scores) - 0.5 * similarity_matrix[
+            :, expected
+        ].max(axis=1)
+        mmr_scores[expected] = -np.inf
+        expected.append(int(mmr_scores.argmax()))
+
+    matches, scores = await index.max_marginal_relevance_search(
+        "query", k=10, fetch_k=40, embedding_model=QueryEmbeds()
+    )
+    assert matches == [candidates[i] for i in expected]
+    assert scores == [candidate_scores[i] for i in expected]
+
+    def count_pairs(selected: Sequence[Embeddable]) -> int:
+        return len({int(cast("Text", m).name.split()[-1]) // 2 for m in selected})
+
+    assert count_pairs(matches) > count_pairs(
+        candidates[:10]
+    ), "MMR should skip near-duplicates"
+
+
+@pytest.mark.asyncio
+async def test_numpy_vector_store_partitioned_similarity_search() -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embedding = rng.normal(size=8).tolist()
+    embed_calls = 0
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            nonlocal embed_calls
+            embed_calls += 1
+            return [query_embedding for _ in texts]
+
+    def partition_by_name(t: Embeddable) -> int:
+        return int(cast("Text", t).name.split()[-1]) % 3
+
+    stub_doc = Doc(docname="stub", citation="stub", dockey="stub")
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=stub_doc,
+            embedding=rng.normal(size=8).tolist(),
+        )
+        for i in range(20)
+    ]
+    index = NumpyVectorStore()
+    await index.add_texts_and_embeddings(texts[:10])
+    await index.partitioned_similarity_search(
+        "query", 2, QueryEmbeds(), partition_by_name
+    )
+    await index.add_texts_and_embeddings(texts[10:])
+
+    embed_calls = 0
+    matches, scores = await index.partitioned_similarity_search(
+        "another query", 7, QueryEmbeds(), partition_by_name
+    )
+    assert embed_calls == 1, "Query should have been embedded once"
+    assert index._partitions is not None
+    assert index._partitions.tolist() == [partition_by_name(t) for t in texts]
+
+    # Partitions' rankings are interleaved in ascending partition order
+    embeddings = np.array([t.embedding for t in texts])
+    expected_scores = embeddings @ query_embedding / np.linalg.norm(embeddings, axis=1)
+    rankings = [
+        sorted(
+            (i for i, t in enumerate(texts) if partition_by_name(t) == partition),
+            key=lambda i: -expected_scores[i],
+        )
+        for partition in range(3)
+    ]
+    expected = [i for rank in zip(*rankings, strict=False) for i in rank][:7]
+    assert [texts.index(m) for m in matches] == expected  # type: ignore[arg-type]
+    assert len(scores) == 7
+
+    # The partition cache holds a local function, but that shouldn't block pickling
+    assert pickle.loads(pickle.dumps(index)) == index
+
+
+@pytest.mark.asyncio
+async def test_mmap_vector_store(tmp_path: Path) -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embedding = rng.normal(size=8).tolist()
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return [query_embedding for _ in texts]
+
+    docs = [
+        Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        for i in range(2)
+    ]
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=docs[i % 2],
+            embedding=rng.normal(size=8).tolist(),
+        )
+        for i in range(30)
+    ]
+    numpy_index = NumpyVectorStore()
+    await numpy_index.add_texts_and_embeddings(texts)
+    index = MmapVectorStore(path=tmp_path / "index")
+    await index.add_texts_and_embeddings(texts[:10])
+    await index.add_texts_and_embeddings(texts[5:])  # Overlap should be skipped
+    assert len(index) == len(texts)
+    assert all(t in index for t in texts)
+    assert (
+        tmp_path / "index" / MmapVectorStore.EMBEDDINGS_FILENAME
+    ).stat().st_size == (len(texts) * 8 * np.dtype(np.float32).itemsize)
+
+    expected_matches, expected_scores = await numpy_index.similarity_search(
+        "query", 5, QueryEmbeds()
+    )
+    matches, scores = await index.similarity_search("query", 5, QueryEmbeds())
+    expected_names = [cast("Text", m).name for m in expected_matches]
+    assert [cast("Text", m).name for m in matches] == expected_names
+    assert np.allclose(scores, expected_scores)
+    assert cast("Text", matches[0]).doc == cast("Text", expected_matches[0]).doc
+
+    def partition_by_doc(t: Embeddable) -> int:
+        return int(cast("Text", t).doc.dockey == "stub1")
+
+    expected_matches, _ = await numpy_index.partitioned_similarity_search(
+        "query", 6, QueryEmbeds(), partition_by_doc
+    )
+    matches, _ = await index.partitioned_similarity_search(
+        "query", 6, QueryEmbeds(), partition_by_doc
+    )
+    assert [cast("Text", m).name for m in matches] == [
+        cast("Text", m).name for m in expected_matches
+    ]
+
+    # Reopening from another object shouldn't need anything but the directory
+    reopened_docs = MmapVectorStore.load_docs(tmp_path / "index")
+    assert set(reopened_docs.docs) == {"stub0", "stub1"}
+    assert not reopened_docs.texts
+    matches, _ = await reopened_docs.texts_index.similarity_search(
+        "query", 5, QueryEmbeds()
+    )
+    assert [cast("Text", m).name for m in matches] == expected_names
+    # Docs should retrieve through it like any other index
+    new_doc = Doc(docname="new", citation="new", dockey="new")
+    new_text = Text(text="new", name="new 1", doc=new_doc, embedding=query_embedding)
+    await reopened_docs.aadd_texts([new_text], new_doc)
+    assert (
+        await reopened_docs.retrieve_texts("query", 1, embedding_model=QueryEmbeds())
+    )[0].name == "new 1"
+    assert len(reopened_docs.texts_index) == len(texts) + 1
+    index.clear()
+    await index.add_texts_and_embeddings(texts)
+
+    unpickled = pickle.loads(pickle.dumps(index))
+    assert unpickled == index
+    assert unpickled._embeddings is None, "Should not have pickled the memory map"
+    assert len(unpickled) == len(texts)
+
+    index.clear()
+    assert len(index) == 0
+    assert not list((tmp_path / "index").iterdir())
+
+
+@pytest.mark.asyncio
+async def test_mmap_vector_store_int8_quantization(tmp_path: Path) -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embeddings = {f"query {i}": rng.normal(size=32).tolist() for i in range(5)}
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return [query_embeddings[t] for t in texts]
+
+    docs = [
+        Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        for i in range(2)
+    ]
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=docs[i % 2],
+            embedding=rng.normal(size=32).tolist(),
+        )
+        for i in range(300)
+    ]
+    exact_index = MmapVectorStore(path=tmp_path / "exact")
+    await exact_index.add_texts_and_embeddings(texts)
+    index = MmapVectorStore(
+        path=tmp_path / "int8", quantization="int8", rerank_candidates=50
+    )
+    await index.add_texts_and_embeddings(texts[:100])
+    await index.similarity_search("query 0", 1, QueryEmbeds())
+    await index.add_texts_and_embeddings(texts[100:])
+
+    queries = list(query_embeddings)
+    exact_results = await exact_index.batch_similarity_search(
+        queries, 10, QueryEmbeds()
+    )
+    results = await index.batch_similarity_search(queries, 10, QueryEmbeds())
+    for (matches, scores), (exact_matches, exact_scores) in zip(
+        results, exact_results, strict=True
+    ):
+        assert [cast("Text", m).name for m in matches] == [
+            cast("Text", m).name for m in exact_matches
+        ]
+        # Re-ranked scores come from the full-precision embeddings
+        assert np.allclose(scores, exact_scores)
+    # Codes of the rows added after the first search got quantized incrementally
+    assert (tmp_path / "int8" / MmapVectorStore.CODES_FILENAME).stat().st_size == (
+        len(texts) * 32
+    )
+    codes, scales = index._get_codes()
+    assert np.allclose(
+        codes * scales[:, None], exact_index._get_embeddings(), atol=0.02
+    )
+
+    def partition_by_doc(t: Embeddable) -> int:
+        return int(cast("Text", t).doc.dockey == "stub1")
+
+    expected_matches, _ = await exact_index.partitioned_similarity_search(
+        "query 1", 6, QueryEmbeds(), partition_by_doc
+    )
+    matches, _ = await index.partitioned_similarity_search(
+        "query 1", 6, QueryEmbeds(), partition_by_doc
+    )
+    assert [cast("Text", m).name for m in matches] == [
+        cast("Text", m).name for m in expected_matches
+    ]
+
+    index.clear()
+    assert not list((tmp_path / "int8").iterdir())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("store_cls", [NumpyVectorStore, MmapVectorStore])
+async def test_batch_similarity_search(
+    tmp_path: Path, store_cls: type[VectorStore]
+) -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embeddings = {f"query {i}": rng.normal(size=8).tolist() for i in range(4)}
+    embed_calls = 0
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            nonlocal embed_calls
+            embed_calls += 1
+            return [query_embeddings[t] for t in texts]
+
+    docs = [
+        Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        for i in range(2)
+    ]
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=docs[i % 2],
+            embedding=rng.normal(size=8).tolist(),
+        )
+        for i in range(30)
+    ]
+    index = (
+        MmapVectorStore(path=tmp_path / "index")
+        if store_cls is MmapVectorStore
+        else store_cls()
+    )
+    await index.add_texts_and_embeddings(texts)
+
+    queries = list(query_embeddings)
+    results = await index.batch_similarity_search(queries, 5, QueryEmbeds())
+    assert embed_calls == 1, "All queries should be embedded in one request"
+    assert len(results) == len(queries)
+    for query, (matches, scores) in zip(queries, results, strict=True):
+        expected_matches, expected_scores = await index.similarity_search(
+            query, 5, QueryEmbeds()
+        )
+        assert matches == expected_matches
+        assert np.allclose(scores, expected_scores)
+
+    assert await index.batch_similarity_search([], 5, QueryEmbeds()) == []
+
+    index.mmr_lambda = 0.5
+    results = await index.batch_max_marginal_relevance_search(
+        queries, k=3, fetch_k=10, embedding_model=QueryEmbeds()
+    )
+    assert embed_calls == 1, "Repeat queries should have hit the cache"
+    assert (
+        await index.batch_max_marginal_relevance_search(
+            [], k=3, fetch_k=10, embedding_model=QueryEmbeds()
+        )
+        == []
+    )
+    for query, (matches, _) in zip(queries, results, strict=True):
+        expected_matches, _ = await index.max_marginal_relevance_search(
+            query, k=3, fetch_k=10, embedding_model=QueryEmbeds()
+        )
+        assert matches == expected_matches
+
+    # Docs should batch too, filtering deleted documents per query
+    docs_obj = Docs(texts_index=index)
+    for doc in docs:
+        await docs_obj.aadd_texts(
+            [t for t in texts if t.doc == doc], doc, embedding_model=QueryEmbeds()
+        )
+    docs_obj.delete(dockey="stub1")
+    batched = await docs_obj.retrieve_texts(queries, 4, embedding_model=QueryEmbeds())
+    assert len(batched) == len(queries)
+    for query, matches in zip(queries, batched, strict=True):
+        assert len(matches) == 4
+        assert all(m.doc.dockey == "stub0" for m in matches)
+        assert matches == await docs_obj.retrieve_texts(
+            query, 4, embedding_model=QueryEmbeds()
+        )
+
+
+@pytest.mark.asyncio
+async def test_ivf_vector_store() -> None:
+    rng = np.random.default_rng(seed=42)
+    centers = rng.normal(size=(20, 16))
+    query_embeddings = {
+        f"query {i}": (centers[i] + 0.3 * rng.normal(size=16)).tolist()
+        for i in range(10)
+    }
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return [query_embeddings[t] for t in texts]
+
+    stub_doc = Doc(docname="stub", citation="stub", dockey="stub")
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=stub_doc,
+            embedding=(centers[i % 20] + 0.3 * rng.normal(size=16)).tolist(),
+        )
+        for i in range(2000)
+    ]
+    exact_index = NumpyVectorStore()
+    await exact_index.add_texts_and_embeddings(texts)
+    index = IVFVectorStore(min_train_size=500, n_probe=3, retrain_growth=3)
+    await index.add_texts_and_embeddings(texts[:400])
+    await index.similarity_search("query 0", 1, QueryEmbeds())
+    assert index._centroids is None, "Small stores should be searched exactly"
+
+    await index.add_texts_and_embeddings(texts[400:600])
+    await index.similarity_search("query 0", 1, QueryEmbeds())
+    assert index._trained_size == 600, "Expected training once large enough"
+    # Insertions get assigned to the existing clusters until retraining
+    await index.add_texts_and_embeddings(texts[600:1000])
+    await index.similarity_search("query 0", 1, QueryEmbeds())
+    assert index._trained_size == 600
+    assert index._assignments is not None
+    assert len(index._assignments) == 1000
+    await index.add_texts_and_embeddings(texts[1000:])
+    await index.similarity_search("query 0", 1, QueryEmbeds())
+    assert index._trained_size == len(texts)
+
+    queries = list(query_embeddings)
+    exact_results = await exact_index.batch_similarity_search(
+        queries, 10, QueryEmbeds()
+    )
+    results = await index.batch_similarity_search(queries, 10, QueryEmbeds())
+    recall = np.mean(
+        [
+            len(set(matches) & set(exact_matches)) / 10
+            for (matches, _), (exact_matches, _) in zip(
+                results, exact_results, strict=True
+            )
+        ]
+    )
+    assert recall >= 0.9
+    for matches, scores in results:
+        assert scores == sorted(scores, reverse=True)
+        assert all(isinstance(m, Text) for m in matches)
+
+    # Even with few probes, k results should come back
+    index.n_probe = 1
+    matches, _ = await index.similarity_search("query 0", 500, QueryEmbeds())
+    assert len(matches) == 500
+
+    def partition_by_name(t: Embeddable) -> int:
+        return int(cast("Text", t).name.split()[-1]) % 3
+
+    matches, _ = await index.partitioned_similarity_search(
+        "query 0", 6, QueryEmbeds(), partition_by_name
+    )
+    assert [partition_by_name(m) for m in matches] == [0, 1, 2] * 2
+
+    index.mmr_lambda = 0.5
+    matches, _ = await index.max_marginal_relevance_search(
+        "query 0", k=5, fetch_k=20, embedding_model=QueryEmbeds()
+    )
+    assert len(matches) == 5
+
+    index.clear()
+    assert index._centroids is None
+    assert not (await index.similarity_search("query 0", 1, QueryEmbeds()))[0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "vector_store",
+    [
+        NumpyVectorStore,
+        partial(IVFVectorStore, min_train_size=10),
+        QdrantVectorStore,
+    ],
+)
+async def test_vector_store_delete_documents(
+    vector_store: Callable[[], VectorStore],
+) -> None:
+    rng = np.random.default_rng(seed=42)
+    query_embedding = rng.normal(size=8).tolist()
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return [query_embedding for _ in texts]
+
+    docs = [
+        Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        for i in range(4)
+    ]
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=docs[i % 4],
+            embedding=rng.normal(size=8).tolist(),
+        )
+        for i in range(40)
+    ]
+    index = vector_store()
+    await index.add_texts_and_embeddings(texts)
+
+    index.delete_documents({"stub1"})
+    matches, _ = await index.similarity_search("query", 40, QueryEmbeds())
+    assert len(matches) == 30
+    assert all(cast("Text", m).doc.dockey != "stub1" for m in matches)
+    assert all((t in index) == (t.doc.dockey != "stub1") for t in texts)
+    if isinstance(index, NumpyVectorStore):
+        assert len(index.texts) == 40, "Deleting below the threshold is a tombstone"
+
+    # Deleted documents can be re-added
+    stub1_texts = [t for t in texts if t.doc.dockey == "stub1"]
+    await index.add_texts_and_embeddings(stub1_texts)
+    matches, _ = await index.similarity_search("query", 40, QueryEmbeds())
+    assert len(matches) == 40
+
+    index.delete_documents({"stub0", "stub1"})
+    if isinstance(index, NumpyVectorStore):
+        assert len(index.texts) == 20, "Expected compaction to reclaim deleted rows"
+        assert index._deleted is None
+    else:
+        await cast("QdrantVectorStore", index).acompact()
+        collection = await cast("QdrantVectorStore", index).client.get_collection(
+            cast("QdrantVectorStore", index).collection_name
+        )
+        assert collection.points_count == 20
+    matches, scores = await index.similarity_search("query", 40, QueryEmbeds())
+    assert {cast("Text", m).doc.dockey for m in matches} == {"stub2", "stub3"}
+    assert len(matches) == len(scores) == 20
+    assert len(index.texts_hashes) == 20
+
+    # Docs should no longer need to over-fetch and filter deleted documents
+    docs_obj = Docs(texts_index=index)
+    for doc in docs[2:]:
+        await docs_obj.aadd_texts(
+            [t for t in texts if t.doc == doc], doc, embedding_model=QueryEmbeds()
+        )
+    docs_obj.delete(dockey="stub2")
+    assert not docs_obj.deleted_dockeys
+    matches = await docs_obj.retrieve_texts("query", 20, embedding_model=QueryEmbeds())
+    assert {m.doc.dockey for m in matches} == {"stub3"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("vector_store", [NumpyVectorStore, QdrantVectorStore])
+async def test_vector_store_delete_shared_texts(
+    vector_store: Callable[[], VectorStore],
+) -> None:
+    docs = [
+        Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        for i in range(2)
+    ]
+    # Both documents share a boilerplate chunk
+    texts = [
+        Text(text=text, name=f"stub{i} {text}", doc=doc, embedding=[1.0, float(i)])
+        for i, doc in enumerate(docs)
+        for text in (f"unique {i}", "boilerplate")
+    ]
+    index = vector_store()
+    await index.add_texts_and_embeddings(texts)
+    index.delete_documents({"stub0"})
+    if isinstance(index, QdrantVectorStore):
+        await index.acompact()
+    assert texts[0] not in index
+    assert texts[3] in index, "The other document still owns the shared text"
+    assert len(index.texts_hashes) == 2
+
+
+def test_bm25_index() -> None:
+    docs = [
+        Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        for i in range(2)
+    ]
+    corpus = [
+        "Venetoclax (ABT-199) inhibits BCL2 in CLL.",
+        "BCL2 family proteins regulate apoptosis, BCL2 is the best studied.",
+        "Trial NCT01234567 enrolled patients with relapsed CLL.",
+        "Apoptosis is programmed cell death.",
+    ]
+    texts = [
+        Text(text=text, name=f"stub {i}", doc=docs[i % 2])
+        for i, text in enumerate(corpus)
+    ]
+    index = BM25Index()
+    index.add_texts(texts[:2])
+    index.add_texts(texts[2:])
+    assert len(index) == 4
+    assert all(t in index for t in texts)
+
+    assert index.search("abt-199", 5)[0] == [texts[0]]
+    assert index.search("ABT", 5)[0] == [texts[0]], "Compound parts should match"
+    assert index.search("nct01234567", 5)[0] == [texts[2]]
+    matches, scores = index.search("BCL2 apoptosis", 5)
+    assert matches[0] == texts[1], "Higher term frequency should rank first"
+    assert set(matches) == {texts[0], texts[1], texts[3]}
+    assert scores == sorted(scores, reverse=True)
+    assert index.search("unrelated", 5) == ([], [])
+
+    index.compaction_threshold = 0.6
+    index.delete_documents({"stub1"})
+    assert len(index) == 2
+    assert texts[1] not in index
+    assert index.search("BCL2 apoptosis", 5)[0] == [texts[0]]
+    index.delete_documents({"stub0"})  # Exceeds the threshold, so it's rebuilt
+    assert not index._texts
+    assert index.search("CLL", 5) == ([], [])
+
+
+@pytest.mark.asyncio
+async def test_retrieve_texts_lexical_fusion() -> None:
+    class ConstantEmbeds(EmbeddingModel):
+        name: str = "constant_embed"
+
+        async def embed_documents(self, texts):
+            # Dense retrieval that ranks the gene variant chunk last for queries
+            return [[1.0, 0.0] if t.startswith("TP53") else [0.0, 1.0] for t in texts]
+
+    docs = Docs()
+    for i in range(20):
+        doc = Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        text = f"Filler chunk {i} about oncology." if i != 13 else "TP53 R175H."
+        await docs.aadd_texts(
+            [Text(text=text, name=f"stub{i} chunk 1", doc=doc)],
+            doc,
+            embedding_model=ConstantEmbeds(),
+        )
+
+    settings = Settings()
+    dense_matches = await docs.retrieve_texts(
+        "Effect of TP53 R175H", 3, settings, embedding_model=ConstantEmbeds()
+    )
+    assert all(m.doc.dockey != "stub13" for m in dense_matches)
+    assert not docs._lexical_index, "Expected no keyword index without fusion"
+    settings.answer.evidence_retrieval_lexical_fusion = True
+    matches = await docs.retrieve_texts(
+        "Effect of TP53 R175H", 3, settings, embedding_model=ConstantEmbeds()
+    )
+    assert len(matches) == 3
+    assert "stub13" in {m.doc.dockey for m in matches}
+    assert docs._lexical_index is not None
+    assert len(docs._lexical_index) == 20
+
+    # The keyword index isn't pickled, it's rebuilt on the next fused retrieval
+    docs = pickle.loads(pickle.dumps(docs))
+    assert docs._lexical_index is None
+    extra_doc = Doc(docname="extra", citation="extra", dockey="extra")
+    await docs.aadd_texts(
+        [Text(text="TP53 R175H again.", name="extra chunk 1", doc=extra_doc)],
+        extra_doc,
+        embedding_model=ConstantEmbeds(),
+    )
+    # Each keyword match only ties the dense match of the same rank, and ties keep
+    # the dense order, so it takes the top 4 to interleave both keyword matches
+    matches = await docs.retrieve_texts(
+        "Effect of TP53 R175H", 4, settings, embedding_model=ConstantEmbeds()
+    )
+    assert [m.doc.dockey for m in matches][1::2] == ["stub13", "extra"]
+    docs.delete(dockey="extra")
+
+    # Docs pickled with the eagerly built keyword index field still load
+    state = deepcopy(docs.__getstate__())
+    state["__dict__"]["texts_lexical_index"] = BM25Index()
+    state["__pydantic_private__"] = {"_pending_texts": None}
+    old_docs = Docs.__new__(Docs)
+    old_docs.__setstate__(state)
+    assert "texts_lexical_index" not in old_docs.__dict__
+    old_docs.delete(dockey="stub0")
+    matches = await old_docs.retrieve_texts(
+        "Effect of TP53 R175H", 3, settings, embedding_model=ConstantEmbeds()
+    )
+    assert "stub13" in {m.doc.dockey for m in matches}
+
+    docs.delete(dockey="stub13")
+    matches = await docs.retrieve_texts(
+        "Effect of TP53 R175H", 3, settings, embedding_model=ConstantEmbeds()
+    )
+    assert all(m.doc.dockey != "stub13" for m in matches)
+
+
+@pytest.mark.parametrize(
+    "vector_store",
+    [
+        NumpyVectorStore,
+        # A single probe would miss most matches of selective filters
+        partial(IVFVectorStore, min_train_size=10, n_probe=1),
+        QdrantVectorStore,
+    ],
+)
+@pytest.mark.asyncio
+async def test_retrieve_texts_filter_criteria(
+    vector_store: Callable[[], VectorStore],
+) -> None:
+    rng = np.random.default_rng(seed=42)
+
+    class RandomEmbeds(EmbeddingModel):
+        name: str = "random_embed"
+
+        async def embed_documents(self, texts):
+            return rng.normal(size=(len(texts), 8)).tolist()
+
+    docs = Docs(texts_index=vector_store())
+    for i in range(12):
+        doc = DocDetails(
+            docname=f"stub{i}",
+            citation=f"stub {i}",
+            title=f"Paper {i}",
+            year=2015 + i if i % 4 else None,
+            journal="Nature" if i % 2 else "Science",
+        )
+        await docs.aadd_texts(
+            [
+                Text(text=f"text {i} {j}", name=f"stub{i} {j}", doc=doc)
+                for j in range(3)
+            ],
+            doc,
+            embedding_model=RandomEmbeds(),
+        )
+
+    for filter_criteria in (
+        {"year>=": 2020},
+        {"?year>=": 2020, "journal": "Nature"},
+        {"!year<": 2020, "!journal": "Nature"},
+    ):
+        expected = {
+            doc.docname
+            for doc in docs.docs.values()
+            if doc.matches_filter_criteria(filter_criteria)
+        }
+        matches = await docs.retrieve_texts(
+            "query",
+            5,
+            Settings(),
+            embedding_model=RandomEmbeds(),
+            filter_criteria=filter_criteria,
+        )
+        assert len(matches) == min(5, 3 * len(expected))
+        assert all(m.doc.docname in expected for m in matches)
+        if isinstance(docs.texts_index, NumpyVectorStore):
+            mask = docs.texts_index.get_filter_mask(filter_criteria)
+            assert mask.tolist() == [
+                cast("Text", t).doc.docname in expected for t in docs.texts_index.texts
+            ]
+
+    # The filter defaults to the settings' filter
+    settings = Settings()
+    settings.answer.evidence_retrieval_filter = {"year>=": 2025}
+    matches = await docs.retrieve_texts(
+        "query", 5, settings, embedding_model=RandomEmbeds()
+    )
+    assert {cast("DocDetails", m.doc).year for m in matches} == {2025, 2026}
+
+
+@pytest.mark.asyncio
+async def test_qdrant_vector_store_batched_upserts() -> None:
+    docs = [
+        Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        for i in range(2)
+    ]
+    # Identical embeddings shouldn't collide, as point IDs come from the content
+    texts = [
+        Text(text=f"text {i}", name=f"stub {i}", doc=docs[i % 2], embedding=[1.0, 2.0])
+        for i in range(10)
+    ]
+    index = QdrantVectorStore(upsert_batch_size=3, max_concurrent_upserts=2)
+    await index.add_texts_and_embeddings(texts[:7])
+    await index.add_texts_and_embeddings(texts[7:])
+
+    collection = await index.client.get_collection(index.collection_name)
+    assert collection.points_count == len(texts)
+    assert index._point_ids == {QdrantVectorStore._point_id(t) for t in texts}
+    assert QdrantVectorStore._point_id(texts[0]) == QdrantVectorStore._point_id(
+        Text(text="text 0", name="stub 0", doc=docs[0])
+    ), "Point IDs should be stable across processes"
+    assert QdrantVectorStore._point_id(texts[0]) != QdrantVectorStore._point_id(
+        Text(text="text 0", name="stub 0 repeated", doc=docs[0])
+    ), "Identical chunks within a document should be distinct points"
+    assert QdrantVectorStore._point_id(texts[0]) != QdrantVectorStore._point_id(
+        Text(text="text 0", name="stub 0", doc=docs[1])
+    )
+
+
+@pytest.mark.asyncio
+async def test_qdrant_vector_store_load_docs() -> None:
+    docs = [
+        Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        for i in range(3)
+    ]
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=docs[i % 3],
+            embedding=[float(i), 1.0],
+        )
+        for i in range(25)
+    ]
+    index = QdrantVectorStore(vector_name="dense")
+    await index.add_texts_and_embeddings(texts)
+
+    page_sizes: list[int] = []
+    scroll = index.client.scroll
+
+    async def counting_scroll(*args, **kwargs):
+        points, next_page_offset = await scroll(*args, **kwargs)
+        page_sizes.append(len(points))
+        return points, next_page_offset
+
+    with patch.object(index.client, "scroll", counting_scroll):
+        loaded = await QdrantVectorStore.load_docs(
+            index.client, index.collection_name, vector_name="dense", batch_size=4
+        )
+    assert page_sizes == [4] * 6 + [1], "Expected to page through with a cursor"
+    assert set(loaded.docs) == {"stub0", "stub1", "stub2"}
+    assert loaded.docnames == {"stub0", "stub1", "stub2"}
+    assert sorted(t.name for t in loaded.texts) == sorted(t.name for t in texts)
+    # Qdrant stores cosine distance vectors normalized
+    expected_embeddings = {
+        t.name: np.array(t.embedding) / np.linalg.norm(np.array(t.embedding))
+        for t in texts
+    }
+    assert all(
+        np.allclose(cast("list[float]", t.embedding), expected_embeddings[t.name])
+        for t in loaded.texts
+    )
+    assert all(
+        t in loaded.texts_index for t in loaded.texts
+    ), "Loaded texts shouldn't get re-added to the collection"
+
+    loaded = await QdrantVectorStore.load_docs(
+        index.client, index.collection_name, vector_name="dense", with_vectors=False
+    )
+    assert len(loaded.texts) == len(texts)
+    assert all(t.embedding is None for t in loaded.texts)
+
+
+@pytest.mark.asyncio
+async def test_qdrant_vector_store_partitioned_and_filtered_search() -> None:
+    from qdrant_client import models
+
+    from paperqa.sources.clinical_trials import (
+        CLINICAL_TRIALS_BASE,
+        partition_clinical_trials_by_source,
+    )
+
+    rng = np.random.default_rng(seed=42)
+    query_embedding = rng.normal(size=8).tolist()
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            return [query_embedding for _ in texts]
+
+    docs = [
+        DocDetails(
+            docname=f"stub{i}",
+            citation=f"stub {i}",
+            year=2018 + i,
+            journal="Trials" if i % 2 else "Nature",
+            other={"client_source": [CLINICAL_TRIALS_BASE] if i % 2 else ["semantic"]},
+        )
+        for i in range(4)
+    ]
+    texts = [
+        Text(
+            text=f"text {i}",
+            name=f"stub {i}",
+            doc=docs[i % 4],
+            embedding=rng.normal(size=8).tolist(),
+        )
+        for i in range(20)
+    ]
+    index = QdrantVectorStore()
+    numpy_index = NumpyVectorStore()
+    for store in (index, numpy_index):
+        await store.add_texts_and_embeddings(texts[:12])
+        await store.partitioned_similarity_search(
+            "query", 2, QueryEmbeds(), partition_clinical_trials_by_source
+        )
+        await store.add_texts_and_embeddings(texts[12:])
+
+    # Points added after labeling should get labeled upon insertion
+    records, _ = await index.client.scroll(
+        index.collection_name, limit=len(texts), with_payload=True
+    )
+    assert {
+        cast("dict", r.payload)["name"]: cast("dict", r.payload)["partition"]
+        for r in records
+    } == {t.name: partition_clinical_trials_by_source(t) for t in texts}
+
+    matches, scores = await index.partitioned_similarity_search(
+        "another query", 7, QueryEmbeds(), partition_clinical_trials_by_source
+    )
+    expected_matches, expected_scores = await numpy_index.partitioned_similarity_search(
+        "another query", 7, QueryEmbeds(), partition_clinical_trials_by_source
+    )
+    assert [cast("Text", m).name for m in matches] == [
+        cast("Text", m).name for m in expected_matches
+    ]
+    assert np.allclose(scores, expected_scores)
+
+    matches, _ = await index.filtered_similarity_search(
+        "query",
+        10,
+        QueryEmbeds(),
+        models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="doc.year", range=models.Range(gte=2019, lte=2020)
+                ),
+                models.FieldCondition(
+                    key="doc.journal", match=models.MatchValue(value="Nature")
+                ),
+            ]
+        ),
+    )
+    assert sorted(cast("Text", m).name for m in matches) == sorted(
+        t.name for t in texts if t.doc is docs[2]
+    )
+
+    # Deleted documents stay excluded from filtered searches
+    index.delete_documents({docs[1].dockey})
+    matches, _ = await index.partitioned_similarity_search(
+        "query", 20, QueryEmbeds(), partition_clinical_trials_by_source
+    )
+    assert len(matches) == 15
+    assert all(cast("Text", m).doc.dockey != docs[1].dockey for m in matches)
+
+    # A function recreated per query with the same key shouldn't relabel
+    class OffsetPartitions:
+        def __init__(self, offset: int):
+            self.offset = offset
+            self.partition_key = f"offset {offset}"
+
+        def __call__(self, text: Embeddable) -> int:
+            return partition_clinical_trials_by_source(text) + self.offset
+
+    with patch.object(index.client, "scroll", wraps=index.client.scroll) as mock_scroll:
+        for _ in range(2):
+            await index.partitioned_similarity_search(
+                "query", 2, QueryEmbeds(), OffsetPartitions(1)
+            )
+    assert mock_scroll.await_count == 1
+    with patch.object(index.client, "scroll", wraps=index.client.scroll) as mock_scroll:
+        await index.partitioned_similarity_search(
+            "query", 2, QueryEmbeds(), OffsetPartitions(2)
+        )
+    assert mock_scroll.await_count == 1, "A different key should relabel"
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_cache(tmp_path: Path) -> None:
+    embedded: list[str] = []
+
+    class QueryEmbeds(EmbeddingModel):
+        name: str = "query_embed"
+
+        async def embed_documents(self, texts):
+            embedded.extend(texts)
+            return [[float(len(t)), 1.0] for t in texts]
+
+    stub_doc = Doc(docname="stub", citation="stub", dockey="stub")
+    index = NumpyVectorStore(
+        query_embedding_cache=QueryEmbeddingCache(
+            max_size=2, path=tmp_path / "queries.jsonl"
+        )
+    )
+    await index.add_texts_and_embeddings(
+        [Text(text="stub", name="stub 1", doc=stub_doc, embedding=[1.0, 1.0])]
+    )
+    for query in ("a", "bb", "a", "ccc", "a", "bb"):
+        await index.similarity_search(query, 1, QueryEmbeds())
+    # "bb" was the least recently used when "ccc" came in, so it got evicted
+    assert embedded == ["a", "bb", "ccc", "bb"]
+    cache = index.query_embedding_cache
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert cache.hit_rate == pytest.approx(1 / 3)
+
+    class OtherEmbeds(QueryEmbeds):
+        name: str = "other_embed"
+
+    await index.similarity_search("a", 1, OtherEmbeds())
+    assert embedded[-1] == "a", "Cache should be keyed on the embedding model"
+
+    # Another process should pick up the persisted (most recent) entries
+    reopened = QueryEmbeddingCache(max_size=2, path=tmp_path / "queries.jsonl")
+    query_key, other_key = (
+        embedding_model_key(QueryEmbeds()),
+        embedding_model_key(OtherEmbeds()),
+    )
+    assert reopened.get((other_key, "query", "a")) == [1.0, 1.0]
+    assert reopened.get((query_key, "query", "bb")) == [2.0, 1.0]
+    assert reopened.get((query_key, "query", "a")) is None
+    assert (
+        len((tmp_path / "queries.jsonl").read_text().splitlines()) == 2
+    ), "Expected the file to be compacted on load"
+
+    # A line truncated by a concurrent append is skipped, not raised on
+    with (tmp_path / "queries.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"model": "query_embed", "mode": "qu\n')
+    reopened = QueryEmbeddingCache(max_size=2, path=tmp_path / "queries.jsonl")
+    assert reopened.get((query_key, "query", "bb")) == [2.0, 1.0]
+
+    # Reduced dimensions give different embeddings, so they're keyed apart
+    n_embedded = len(embedded)
+    await index.similarity_search("bb", 1, QueryEmbeds())
+    await index.similarity_search("bb", 1, QueryEmbeds(ndim=1))
+    assert embedded[n_embedded:] == ["bb"], "Cache should be keyed on the dimensions"
+
+    cache.clear()
+    assert not (tmp_path / "queries.jsonl").exists()
+
+    # Stores pickled before query embeddings were cached get an empty cache
+    state = index.__getstate__()
+    state["__dict__"] = {
+        k: v for k, v in state["__dict__"].items() if k != "query_embedding_cache"
+    }
+    unpickled = NumpyVectorStore.__new__(NumpyVectorStore)
+    unpickled.__setstate__(state)
+    assert isinstance(unpickled.query_embedding_cache, QueryEmbeddingCache)
+    await unpickled.similarity_search("a", 1, QueryEmbeds())
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache(tmp_path) -> None:
+    embedded: list[list[str]] = []
+
+    class CountingEmbeds(EmbeddingModel):
+        name: str = "counting_embed"
+
+        async def embed_documents(self, texts):
+            embedded.append(texts)
+            return [[float(len(t)), 0.5] for t in texts]
+
+    settings = Settings(embedding_cache_path=tmp_path / "embeddings.sqlite")
+    doc = Doc(docname="stub", citation="stub", dockey="stub")
+    await Docs().aadd_texts(
+        [Text(text=t, name=f"stub {t}", doc=doc) for t in ("a", "bb")],
+        doc,
+        settings=settings,
+        embedding_model=CountingEmbeds(),
+    )
+    # Same content under another document is served from the cache
+    other_doc = Doc(docname="other", citation="other", dockey="other")
+    docs = Docs()
+    texts = [Text(text=t, name=f"other {t}", doc=other_doc) for t in ("bb", "ccc")]
+    await docs.aadd_texts(
+        texts, other_doc, settings=settings, embedding_model=CountingEmbeds()
+    )
+    assert embedded == [["a", "bb"], ["ccc"]]
+    assert [t.embedding for t in texts] == [[2.0, 0.5], [3.0, 0.5]]
+    cache = cast("EmbeddingCache", settings.get_embedding_cache())
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 3)
+    assert stats["hit_rate"] == pytest.approx(1 / 4)
+
+    # Deferred embeddings are cached too, and the model config is part of the key
+    settings.parsing.defer_embedding = True
+    docs = Docs()
+    await docs.aadd_texts(
+        [Text(text=t, name=f"other {t}", doc=other_doc) for t in ("a", "dddd")],
+        other_doc,
+        settings=settings,
+    )
+    embedded.clear()
+    await docs.retrieve_texts("query", 2, settings, embedding_model=CountingEmbeds())
+    assert embedded == [["dddd"], ["query"]]
+    embedded.clear()
+    await embed_documents(CountingEmbeds(config={"dimensions": 2}), ["a"], cache)
+    await embed_documents(CountingEmbeds(ndim=1), ["a"], cache)
+    assert embedded == [["a"], ["a"]]
+
+    # Least recently used embeddings are evicted beyond the size limit
+    small_cache = EmbeddingCache(path=tmp_path / "small.sqlite", max_size_bytes=32)
+    embedded.clear()
+    for batch in (["a", "bb"], ["a"], ["ccc"]):
+        await small_cache.aembed_documents(CountingEmbeds(), batch)
+    assert small_cache.stats()["size_bytes"] == 32
+    await small_cache.aembed_documents(CountingEmbeds(), ["a", "bb", "ccc"])
+    assert embedded == [["a", "bb"], ["ccc"], ["bb"]], "Expected LRU eviction"
+
+    cache.clear()
+    assert not (tmp_path / "embeddings.sqlite").exists()
+
+
 @pytest.mark.asyncio
 async def test_custom_llm(stub_data_dir: Path) -> None:
     class StubLLMModel(LLMModel):
@@ -986,6 +2310,285 @@ async def test_pdf_reader_w_no_chunks(stub_data_dir: Path) -> None:
     assert docs.texts[0].embedding is None, "Should have deferred the embedding"
 
 
+@pytest.mark.asyncio
+async def test_docs_pending_texts() -> None:
+    embedded: list[list[str]] = []
+
+    class CountingEmbeds(EmbeddingModel):
+        name: str = "counting_embed"
+
+        async def embed_documents(self, texts):
+            embedded.append(texts)
+            return [[float(len(t)), 1.0] for t in texts]
+
+    settings = Settings()
+    settings.parsing.defer_embedding = True
+    docs = Docs()
+    for i in range(3):
+        doc = Doc(docname=f"stub{i}", citation=f"stub {i}", dockey=f"stub{i}")
+        await docs.aadd_texts(
+            [
+                Text(text=f"text {i}", name=f"stub{i} chunk 1", doc=doc),
+                Text(text="shared text", name=f"stub{i} chunk 2", doc=doc),
+            ],
+            doc,
+            settings=settings,
+        )
+    docs.delete(dockey="stub2")
+    await docs.retrieve_texts("query", 2, settings, embedding_model=CountingEmbeds())
+    assert embedded == [["text 0", "shared text", "text 1"], ["query"]], (
+        "Pending texts should be embedded in one batch, without duplicates"
+        " or deleted texts"
+    )
+    assert len(docs.texts_index) == 3
+
+    # Retrieval shouldn't re-check already indexed texts
+    with patch.object(
+        NumpyVectorStore, "__contains__", side_effect=AssertionError
+    ) as mock_contains:
+        await docs.retrieve_texts(
+            "another query", 2, settings, embedding_model=CountingEmbeds()
+        )
+        mock_contains.assert_not_called()
+
+    doc = Doc(docname="stub3", citation="stub 3", dockey="stub3")
+    await docs.aadd_texts(
+        [Text(text="text 3", name="stub3 chunk 1", doc=doc)], doc, settings=settings
+    )
+    docs = pickle.loads(pickle.dumps(docs))  # Pending texts survive pickling
+    embedded.clear()
+    await docs.retrieve_texts("query", 2, settings, embedding_model=CountingEmbeds())
+    assert embedded == [["text 3"]]
+    assert len(docs.texts_index) == 4
+
+
+@pytest.mark.asyncio
+async def test_aadd_parses_once(stub_data_dir: Path) -> None:
+    class CitationLLMModel(LLMModel):
+        name: str = "custom/citation"
+
+        async def call_single(  # type: ignore[override]
+            self, messages: list[Message], **kwargs  # noqa: ARG002
+        ) -> LLMResult:
+            return LLMResult(
+                model=self.name, text="Stub Author, Stub Title, 2024.", prompt=messages
+            )
+
+    settings = Settings()
+    settings.parsing.use_doc_details = False
+    settings.parsing.defer_embedding = True
+    docs = Docs()
+    with patch(
+        "paperqa.readers.parse_pdf_to_pages", side_effect=parse_pdf_to_pages
+    ) as mock_parse:
+        docname = await docs.aadd(
+            stub_data_dir / "paper.pdf",
+            settings=settings,
+            llm_model=CitationLLMModel(),
+        )
+    mock_parse.assert_called_once()
+    assert docname == "Stub2024"
+    assert docs.texts
+    assert all(t.name.startswith(f"{docname} pages ") for t in docs.texts)
+
+
+@pytest.mark.asyncio
+async def test_aadd_metadata_fast_path(tmp_path: Path) -> None:
+    class CitationLLMModel(LLMModel):
+        name: str = "custom/citation"
+
+        async def call_single(  # type: ignore[override]
+            self, messages: list[Message], **kwargs  # noqa: ARG002
+        ) -> LLMResult:
+            return LLMResult(
+                model=self.name, text="Stub Author, Stub Title, 2024.", prompt=messages
+            )
+
+    paper = tmp_path / "paper.txt"
+    paper.write_text(
+        "A Study of Turtles\n\nJ. Smith, University of Rochester\n"
+        "https://doi.org/10.1234/turtles.2020.\n\n"
+        + "Turtles are reptiles with a shell, which live in many habitats. " * 40
+    )
+    # Stub the metadata providers, to exercise upgrading to the details
+    metadata_client = DocMetadataClient()
+    turtles_details = DocDetails(
+        title="A study of turtles",
+        doi="10.1234/turtles.2020",
+        authors=["Jane Smith"],
+        year=2020,
+        journal="Turtle Science",
+        other={"client_source": ["stub"]},
+    )
+    settings = Settings()
+    settings.parsing.defer_embedding = True
+    docs = Docs()
+    with (
+        patch.object(
+            metadata_client,
+            "query",
+            AsyncMock(return_value=turtles_details.model_copy(deep=True)),
+        ) as mock_query,
+        patch.object(CitationLLMModel, "call_single") as mock_call_single,
+    ):
+        docname = await docs.aadd(
+            paper,
+            settings=settings,
+            llm_model=CitationLLMModel(),
+            metadata_client=metadata_client,
+        )
+        mock_call_single.assert_not_called()
+    assert docname == "smith2020astudyof"
+    assert mock_query.call_args.kwargs["doi"] == (
+        "10.1234/turtles.2020"
+    ), "Expected the DOI from the first page, without trailing punctuation"
+    (doc,) = docs.docs.values()
+    assert isinstance(doc, DocDetails)
+    assert doc.title == "A study of turtles"
+    assert doc.docname == docname
+    assert "Unknown" not in doc.citation, "Placeholder citation should be replaced"
+    assert "A study of turtles" in doc.citation
+
+    # A passed docname is kept, and deduplicated against the present docs
+    with patch.object(
+        metadata_client,
+        "query",
+        AsyncMock(return_value=turtles_details.model_copy(deep=True)),
+    ):
+        docname = await docs.aadd(
+            paper,
+            docname="smith2020astudyof",
+            dockey="another",
+            settings=settings,
+            llm_model=CitationLLMModel(),
+            metadata_client=metadata_client,
+        )
+    assert docname == "smith2020astudyofa"
+    assert docname in docs.docnames
+    assert set(docs.docs) == {md5sum(paper), "another"}, "Expected our dockeys kept"
+
+    # A found DOI whose title isn't in the first pages (e.g. a cited work) is ignored
+    docs = Docs()
+    with patch.object(
+        metadata_client,
+        "query",
+        AsyncMock(
+            return_value=DocDetails(
+                title="Some cited work",
+                doi="10.1234/turtles.2020",
+                year=2020,
+                other={"client_source": ["stub"]},
+            )
+        ),
+    ):
+        docname = await docs.aadd(
+            paper,
+            settings=settings,
+            llm_model=CitationLLMModel(),
+            metadata_client=metadata_client,
+        )
+    assert docname == "Stub2024", "Expected the LLM inferred citation"
+
+    # A passed DOI without details isn't looked up again when falling back
+    docs = Docs()
+    with patch.object(
+        metadata_client, "query", AsyncMock(return_value=None)
+    ) as mock_query:
+        docname = await docs.aadd(
+            paper,
+            doi="10.1234/missing",
+            settings=settings,
+            llm_model=CitationLLMModel(),
+            metadata_client=metadata_client,
+        )
+    assert docname == "Stub2024"
+    mock_query.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_aadd_many(stub_data_dir: Path) -> None:
+    class CitationLLMModel(LLMModel):
+        name: str = "custom/citation"
+
+        async def call_single(  # type: ignore[override]
+            self, messages: list[Message], **kwargs  # noqa: ARG002
+        ) -> LLMResult:
+            return LLMResult(
+                model=self.name, text="Stub Author, Stub Title, 2024.", prompt=messages
+            )
+
+    embedded: list[list[str]] = []
+
+    class CountingEmbeds(EmbeddingModel):
+        name: str = "counting_embed"
+
+        async def embed_documents(self, texts):
+            embedded.append(texts)
+            return [[float(len(t)), 1.0] for t in texts]
+
+    settings = Settings()
+    settings.parsing.use_doc_details = False
+    paths = [
+        stub_data_dir / "bates.txt",
+        stub_data_dir / "empty.txt",
+        stub_data_dir / "obama.txt",
+        stub_data_dir / "bates.txt",
+        stub_data_dir / "flag_day.html",
+    ]
+    docs = Docs()
+    docnames = await docs.aadd_many(
+        paths,
+        settings=settings,
+        llm_model=CitationLLMModel(),
+        embedding_model=CountingEmbeds(),
+        embedding_batch_size=10_000,
+    )
+    assert docnames[1] is None, "Empty document should be skipped"
+    assert (docnames[0] is None) != (docnames[3] is None), "Expected one duplicate"
+    added = [d for d in docnames if d is not None]
+    assert len(added) == len(set(added)) == len(docs.docs) == 3
+    assert set(added) == docs.docnames
+    assert {t.name.split(" ")[0] for t in docs.texts} == docs.docnames
+    assert len(embedded) == 1, "Chunks should be embedded across documents"
+    assert all(t.embedding is not None for t in docs.texts)
+
+    # Already added documents are skipped before parsing
+    assert await docs.aadd_many(
+        paths[2:3], settings=settings, llm_model=CitationLLMModel()
+    ) == [None]
+
+    # Smaller batches split embedding across requests
+    embedded.clear()
+    docs = Docs()
+    await docs.aadd_many(
+        paths,
+        settings=settings,
+        llm_model=CitationLLMModel(),
+        embedding_model=CountingEmbeds(),
+        embedding_batch_size=1,
+    )
+    assert len(embedded) == len(docs.docs) == 3
+
+    # A failing stage cancels the others, instead of them blocking on full queues
+    with (
+        patch.object(
+            Docs, "aadd_texts", AsyncMock(side_effect=RuntimeError("Failed adding"))
+        ),
+        pytest.raises(RuntimeError, match="Failed adding"),
+    ):
+        await asyncio.wait_for(
+            Docs().aadd_many(
+                paths,
+                settings=settings,
+                llm_model=CitationLLMModel(),
+                embedding_model=CountingEmbeds(),
+                embedding_batch_size=1,
+                queue_size=1,
+            ),
+            timeout=30,
+        )
+
+
 @pytest.mark.vcr
 @pytest.mark.parametrize("defer_embeddings", [True, False])
 @pytest.mark.asyncio
@@ -1124,6 +2727,72 @@ async def test_parser_only_reader(stub_data_dir: Path):
     )
 
 
+@pytest.mark.asyncio
+async def test_pdf_parsing_pool(stub_data_dir: Path) -> None:
+    doc_path = stub_data_dir / "paper.pdf"
+    pool = PDFParsingPool(max_workers=2, max_tasks_per_child=1)
+    try:
+        doc = Doc(docname="foo", citation="Foo et al, 2002", dockey="1")
+        parsed_texts = await asyncio.gather(
+            *(
+                read_doc(doc_path, doc, parsed_text_only=True, pdf_parsing_pool=pool)
+                for _ in range(3)
+            )
+        )
+        assert all(
+            parsed_text.content == parse_pdf_to_pages(doc_path).content
+            for parsed_text in parsed_texts
+        ), "Expected process parsing to match thread parsing"
+
+        pool.timeout = 1e-6
+        with pytest.raises(ImpossibleParsingError, match="timeout"):
+            await pool.parse(doc_path)
+        pool.timeout = None
+        reparsed_text = await pool.parse(doc_path)
+        assert (
+            reparsed_text.content == parsed_texts[0].content
+        ), "Expected the pool to recover after a timeout killed its workers"
+    finally:
+        pool.shutdown()
+
+    pool = PDFParsingPool(max_workers=2)
+    try:
+        # Queueing more PDFs than workers shouldn't count against the timeout
+        pool.timeout = 60
+        await asyncio.gather(*(pool.parse(doc_path) for _ in range(6)))
+        assert len(pool._workers) == 2
+        idle_worker, timed_out_worker = pool._idle_workers
+        pool.timeout = 1e-6
+        with pytest.raises(ImpossibleParsingError, match="timeout"):
+            await pool.parse(doc_path)
+        assert pool._workers == {idle_worker}, "Only the timed out worker is killed"
+        os.kill(cast("int", idle_worker.pid), 0)  # Raises if the worker died
+        assert timed_out_worker not in pool._workers
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pdf_parsing_pool_page_ranges(stub_data_dir: Path) -> None:
+    doc_path = stub_data_dir / "paper.pdf"
+    serial = parse_pdf_to_pages(doc_path)
+    pool = PDFParsingPool(max_workers=2, pages_per_task=3)
+    try:
+        parsed_text = await pool.parse(doc_path)
+        assert list(parsed_text.content) == list(serial.content), "Expected page order"
+        assert parsed_text.content == serial.content
+        assert (
+            parsed_text.metadata.total_parsed_text_length
+            == serial.metadata.total_parsed_text_length
+        )
+        with pytest.raises(ImpossibleParsingError, match="char limit"):
+            await pool.parse(doc_path, page_size_limit=10)
+        # The other page ranges got cancelled, not left parsing in their workers
+        assert set(pool._idle_workers) == pool._workers
+    finally:
+        pool.shutdown()
+
+
 @pytest.mark.asyncio
 async def test_chunk_metadata_reader(stub_data_dir: Path) -> None:
     doc_path = stub_data_dir / "paper.pdf"
@@ -1176,6 +2845,71 @@ async def test_chunk_metadata_reader(stub_data_dir: Path) -> None:
     assert metadata.total_parsed_text_length // 3000 <= len(chunk_text)
 
 
+def test_chunk_offsets() -> None:
+    doc = Doc(docname="foo", citation="Foo et al, 2002", dockey="1")
+    metadata = ParsedMetadata(parsing_libraries=[], total_parsed_text_length=16)
+    pdf = ParsedText(
+        content={"1": "abcdef", "2": "gh", "3": "ijklmnop"}, metadata=metadata
+    )
+    assert [
+        (t.text, t.name) for t in chunk_pdf(pdf, doc, chunk_chars=4, overlap=1)
+    ] == [
+        ("abcd", "foo pages 1-1"),
+        ("defg", "foo pages 1-2"),
+        ("ghij", "foo pages 2-3"),
+        ("jklm", "foo pages 3-3"),
+        ("mnop", "foo pages 3-3"),
+    ]
+
+    code = ParsedText(content=["ab\n", "cdef\n", "g\n"], metadata=metadata)
+    assert [
+        (t.text, t.name) for t in chunk_code_text(code, doc, chunk_chars=4, overlap=1)
+    ] == [
+        ("ab\nc", "foo lines 0-1"),
+        ("cdef", "foo lines 1-1"),
+        ("f\ng\n", "foo lines 1-2"),
+    ]
+
+
+def test_peek_first_chunk() -> None:
+    metadata = ParsedMetadata(parsing_libraries=[], total_parsed_text_length=2000)
+    parse_config = ParsingSettings(chunk_size=30, overlap=5)
+    for path, parsed_text in (
+        (
+            "book.pdf",
+            ParsedText(
+                content={str(i): f"page {i} text. " * 2 for i in range(1, 101)},
+                metadata=metadata,
+            ),
+        ),
+        (
+            "script.py",
+            ParsedText(
+                content=[f"line = {i}\n" for i in range(200)], metadata=metadata
+            ),
+        ),
+    ):
+        full_texts, _ = chunk_parsed_text(
+            parsed_text,
+            path,
+            Doc(docname="", citation="", dockey="1"),
+            chunk_chars=parse_config.chunk_size,
+            overlap=parse_config.overlap,
+        )
+        with patch(
+            "paperqa.readers.chunk_parsed_text", wraps=chunk_parsed_text
+        ) as mock_chunk:
+            first_chunk = peek_first_chunk(
+                parsed_text,
+                path,
+                "1",
+                chunk_chars=parse_config.chunk_size,
+                overlap=parse_config.overlap,
+            )
+        assert first_chunk == full_texts[0].text
+        assert len(mock_chunk.call_args.args[0].content) < 10, "Expected a few pages"
+
+
 @pytest.mark.asyncio
 async def test_code() -> None:
     settings = Settings.from_name("fast")